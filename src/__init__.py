@@ -1,22 +1,50 @@
+import sys as _sys
+from typing import Any, List, Tuple
+
 from .functions import *
 from .selector_handler import *
+from .selector_handler.functions import close
 from .logger import logger
 from .var import var
 from .messages import *
+from .cli import command
+from .stats import stop
+from .screen import screen
 
 
-def main() -> int:
-    "Main function"
-    logger.info(f"Main function started.")
-    logger.was_called(main)
-
+def __interactive() -> int:
+    "Runs the interactive menu until the user exits."
     while True:
         clear_terminal()
         prt(PRT_MAIN_MENU, i=f"{var.extra_message}\n")
 
         user_selection: str = inp(INP_ENTER_MAIN_MENU_CHOICE)
-        if selector(user_selection) or user_selection == "5":
+        if selector(user_selection) or user_selection == "12":
             prt("\nExiting...")
             break
 
+    screen.finish()
+
     return 0
+
+
+def __profiled() -> None:
+    "Ends the `--profile` run, if any, and prints what it recorded to stderr."
+    profile_file: str | None = var.profile_file if var.profile else None
+    rows: List[Tuple[Any, ...]] = stop()
+    if profile_file is None:
+        return
+    print(PRT_INIT_STATS(rows) if rows else PRT_INIT_STATS_EMPTY, file=_sys.stderr)
+    if profile_file:
+        print(PRT_INIT_STATS_PROFILE_SAVED(profile_file), file=_sys.stderr)
+
+
+def main() -> int:
+    "Main function"
+    logger.info(f"Main function started.")
+    logger.was_called(main)
+    try:
+        return command(_sys.argv[1:], interactive=__interactive)
+    finally:
+        close()
+        __profiled()
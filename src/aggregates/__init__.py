@@ -0,0 +1,221 @@
+__all__ = ["Aggregates", "RunningSum", "recompute"]
+
+import heapq as _heapq
+import math as _math
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from src.logger import logger as logger
+import src.money as _money
+
+_Item = Tuple[str, float]
+_Summary = Dict[str, Any]
+
+
+def recompute(
+    names: Sequence[str],
+    amounts: Sequence[float],
+    top: int,
+    units: Sequence[int] | None = None,
+) -> _Summary:
+    """
+    The function `recompute` computes the summary of a budget from scratch, as a check of the
+    incrementally maintained one. When NumPy is installed the amounts are read through a zero-copy
+    view and reduced with vectorized (pairwise) operations; otherwise `math.fsum` and `heapq` are
+    used. The total is computed exactly from the minor units when they are given.
+
+    @param names The `names` parameter is the sequence of item names.
+    @param amounts The `amounts` parameter is the sequence of amounts, sharing positions with `names`.
+    @param top The `top` parameter is the number of largest items to report.
+    @param units The `units` parameter is the column of amounts in minor units (see `src.money`),
+    sharing positions with `names`.
+
+    @return The function returns the summary: count, total, mean, min, max and top items.
+    """
+    logger.was_called(recompute, top)
+    count: int = len(amounts)
+    if count == 0:
+        return {
+            "count": 0,
+            "total": 0.0,
+            "mean": 0.0,
+            "min": None,
+            "max": None,
+            "top": [],
+        }
+    np: Any = _money._numpy()
+    if np is not None:
+        column = np.asarray(amounts, dtype=np.float64)
+        total: float = float(column.sum())
+        low: int = int(column.argmin())
+        n: int = min(max(top, 1), count)
+        candidates = np.argpartition(column, count - n)[count - n :]
+        order: List[int] = [int(i) for i in candidates[np.argsort(-column[candidates])]]
+    else:
+        total = _math.fsum(amounts)
+        low = min(range(count), key=amounts.__getitem__)
+        order = _heapq.nlargest(max(top, 1), range(count), key=amounts.__getitem__)
+    if units is not None:
+        total = _money.to_amount(_money.total(units))
+    largest: List[_Item] = [(names[i], amounts[i]) for i in order]
+    return {
+        "count": count,
+        "total": total,
+        "mean": total / count,
+        "min": (names[low], amounts[low]),
+        "max": largest[0],
+        "top": largest[:top],
+    }
+
+
+class RunningSum:
+    """
+    The class `RunningSum` adds up amounts exactly, as integer minor units (see `src.money`), so
+    adding and subtracting amounts many times never makes the total drift. Amounts are rounded to
+    the precision of the budget, which is how they are stored.
+    """
+
+    def __init__(self) -> None:
+        self.__scale: int = _money.scale()
+        self.__units: int = 0
+
+    def add(self, amount: float) -> None:
+        """
+        Adds an amount to the sum; subtract by adding its negation.
+
+        @param amount The `amount` parameter is the amount to add.
+        """
+        self.__units += round(amount * self.__scale)
+
+    @property
+    def value(self) -> float:
+        "The current sum."
+        return self.__units / self.__scale
+
+
+class Aggregates:
+    """
+    The class `Aggregates` keeps the summary of a budget up to date as items are added, changed and
+    removed, so reading it does not scan the items. The total is a `RunningSum`; the smallest and
+    largest items are kept in heaps whose outdated entries are discarded lazily, checking them
+    against the current amount of the item.
+    """
+
+    def __init__(self, items: Iterable[_Item], current: Callable[[str], float | None]):
+        """
+        Computes the aggregates of the given items.
+
+        @param items The `items` parameter is an iterable of (name, amount) tuples.
+        @param current The `current` parameter returns the current amount of an item, or None if it
+        was removed; it is used to discard outdated heap entries.
+        """
+        logger.was_called(Aggregates)
+        self.__current = current
+        self.__count: int = 0
+        self.__total: RunningSum = RunningSum()
+        self.__low: List[Tuple[float, str]] = []
+        self.__high: List[Tuple[float, str]] = []
+        for name, amount in items:
+            self.__count += 1
+            self.__total.add(amount)
+            self.__low.append((amount, name))
+            self.__high.append((-amount, name))
+        _heapq.heapify(self.__low)
+        _heapq.heapify(self.__high)
+
+    def __push(self, name: str, amount: float) -> None:
+        _heapq.heappush(self.__low, (amount, name))
+        _heapq.heappush(self.__high, (-amount, name))
+        if len(self.__low) > 2 * self.__count + 1024:
+            # Too many outdated entries: keep only the current ones.
+            self.__low = [(a, n) for a, n in self.__low if self.__current(n) == a]
+            self.__high = [(a, n) for a, n in self.__high if self.__current(n) == -a]
+            _heapq.heapify(self.__low)
+            _heapq.heapify(self.__high)
+
+    def add(self, name: str, amount: float) -> None:
+        """
+        Accounts for a new item.
+
+        @param name The `name` parameter is the name of the item.
+        @param amount The `amount` parameter is the amount of the item.
+        """
+        self.__count += 1
+        self.__total.add(amount)
+        self.__push(name, amount)
+
+    def update(self, name: str, old: float, new: float) -> None:
+        """
+        Accounts for a change of the amount of an item.
+
+        @param name The `name` parameter is the name of the item.
+        @param old The `old` parameter is the previous amount of the item.
+        @param new The `new` parameter is the new amount of the item.
+        """
+        self.__total.add(new)
+        self.__total.add(-old)
+        self.__push(name, new)
+
+    def remove(self, name: str, amount: float) -> None:
+        """
+        Accounts for the removal of an item. Its heap entries are discarded lazily.
+
+        @param name The `name` parameter is the name of the item.
+        @param amount The `amount` parameter is the amount the item had.
+        """
+        self.__count -= 1
+        self.__total.add(-amount)
+
+    def __valid(self, heap: List[Tuple[float, str]], sign: int) -> None:
+        while heap and self.__current(heap[0][1]) != sign * heap[0][0]:
+            _heapq.heappop(heap)
+
+    def top(self, n: int) -> List[_Item]:
+        """
+        Returns the largest items.
+
+        @param n The `n` parameter is the number of items to return.
+
+        @return A list of (name, amount) tuples, largest first.
+        """
+        found: List[Tuple[float, str]] = []
+        seen: set[str] = set()
+        while self.__high and len(found) < n:
+            self.__valid(self.__high, -1)
+            if not self.__high:
+                break
+            entry: Tuple[float, str] = _heapq.heappop(self.__high)
+            if entry[1] not in seen:
+                seen.add(entry[1])
+                found.append(entry)
+        for entry in found:
+            _heapq.heappush(self.__high, entry)
+        return [(name, -amount) for amount, name in found]
+
+    def summary(self, top: int) -> _Summary:
+        """
+        Returns the summary of the budget.
+
+        @param top The `top` parameter is the number of largest items to report.
+
+        @return The summary: count, total, mean, min, max and top items.
+        """
+        total: float = self.__total.value
+        if self.__count == 0:
+            return {
+                "count": 0,
+                "total": 0.0,
+                "mean": 0.0,
+                "min": None,
+                "max": None,
+                "top": [],
+            }
+        self.__valid(self.__low, 1)
+        largest: List[_Item] = self.top(max(top, 1))
+        return {
+            "count": self.__count,
+            "total": total,
+            "mean": total / self.__count,
+            "min": (self.__low[0][1], self.__low[0][0]),
+            "max": largest[0],
+            "top": largest[:top],
+        }
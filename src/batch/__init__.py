@@ -0,0 +1,407 @@
+__all__ = ["run", "apply"]
+
+import sys as _sys
+import time as _time
+from typing import Any, Callable, Dict, IO, List, Tuple
+
+from src.var import var
+import src.money as _money
+from src.logger import logger as logger
+from src.messages import *
+from src.selector_handler.functions import *
+from src.transaction import Transaction
+
+_Command = Callable[[str], bool]
+
+
+def __split_amount(args: str) -> Tuple[str, float, str | None]:
+    """
+    The function `__split_amount` splits the arguments of a command into an item name, an amount and
+    an optional category. The category is a last token starting with '@' ('@' alone for none); the
+    amount is the last whitespace-separated token before it, so names may contain spaces, and it is
+    parsed with the same rules as the interactive menu (`src.money.read`).
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns a tuple with the item name, its amount and its category (None if
+    not given).
+
+    @raise ValueError If the name is empty or the amount is invalid.
+    """
+    category: str | None = None
+    rest, _, last = args.rpartition(" ")
+    if last.startswith("@") and rest:
+        args, category = rest, last[1:]
+    name, _, amount = args.rpartition(" ")
+    name = name.strip()
+    if not name:
+        raise ValueError(PRT_INIT_TRANSACTION_INVALID_NAME)
+    try:
+        return name, _money.read(amount), category
+    except ValueError as e:
+        raise ValueError(PRT_INIT_TRANSACTION_INVALID_AMOUNT(name)) from e
+
+
+def __warn() -> None:
+    """
+    The function `__warn` prints the budget rule warnings a change left after its message in
+    `var.extra_message` on stderr, since successful changes are not reported otherwise.
+    """
+    for warning in var.extra_message.split("\n")[1:]:
+        print(warning, file=_sys.stderr)
+
+
+def __register(args: str) -> bool:
+    """
+    The function `__register` runs `register NAME AMOUNT [@CATEGORY]`: it registers a new item
+    and prints the warnings of the budget rules it exceeded.
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns True if the item was registered, otherwise False (invalid
+    name or amount, or existing item).
+    """
+    try:
+        name, amount, category = __split_amount(args)
+    except ValueError as e:
+        var.extra_message = str(e)
+        return False
+    if item_exists(name):
+        return False
+    register(name, amount, category or "")
+    __warn()
+    return True
+
+
+def __search(args: str) -> bool:
+    """
+    The function `__search` runs `search NAME` and prints the item found.
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns True if the item exists, otherwise False.
+    """
+    if not item_exists(args):
+        return False
+    search(args)
+    print(var.extra_message)
+    return True
+
+
+def __find(args: str) -> bool:
+    """
+    The function `__find` runs `find QUERY` and prints the first page of the items whose name
+    contains the query.
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns True if any item matched, otherwise False.
+    """
+    total, items = find(args)
+    if not total:
+        var.extra_message = PRT_INIT_ITEM_NOT_FOUND(args)
+        return False
+    print(PRT_INIT_SEARCH_RESULTS((total, args, 1, -(-total // var.search_page_size))))
+    for item in items:
+        print(PRT_INIT_SEARCH_RESULT(item))
+    return True
+
+
+def __edit(args: str) -> bool:
+    """
+    The function `__edit` runs `edit NAME AMOUNT [@CATEGORY]`: it changes the amount (and
+    category) of an item and prints the warnings of the budget rules it exceeded.
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns True if the item was edited, otherwise False (invalid
+    amount or missing item).
+    """
+    try:
+        name, amount, category = __split_amount(args)
+    except ValueError as e:
+        var.extra_message = str(e)
+        return False
+    if not item_exists(name):
+        return False
+    edit(name, amount, category)
+    __warn()
+    return True
+
+
+def __delete(args: str) -> bool:
+    """
+    The function `__delete` runs `delete NAME` and prints the warnings of the budget rules the
+    deletion exceeded.
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns True if the item was deleted, otherwise False.
+    """
+    if not item_exists(args):
+        return False
+    delete(args)
+    __warn()
+    return True
+
+
+def __summary(args: str) -> bool:
+    """
+    The function `__summary` runs `summary` and prints the totals of the budget.
+
+    @param args The `args` parameter is ignored.
+
+    @return The function always returns True.
+    """
+    totals: Dict[str, Any] = summary()
+    print(PRT_INIT_SUMMARY(totals) if totals["count"] else PRT_INIT_SUMMARY_EMPTY)
+    return True
+
+
+def __categories(args: str) -> bool:
+    """
+    The function `__categories` runs `categories` and prints the item count and total of every
+    category.
+
+    @param args The `args` parameter is ignored.
+
+    @return The function always returns True.
+    """
+    groups: List[Tuple[str, int, float]] = categories()
+    print(PRT_INIT_CATEGORIES(len(groups)))
+    for group in groups:
+        print(PRT_INIT_CATEGORY(group))
+    return True
+
+
+def __category(args: str) -> bool:
+    """
+    The function `__category` runs `category NAME` and prints the items of a category.
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns True if the category has items, otherwise False.
+    """
+    items: List[Tuple[str, float]] = category_items(args)
+    if not items:
+        var.extra_message = PRT_INIT_CATEGORY_NOT_FOUND(args)
+        return False
+    print(PRT_INIT_CATEGORY_ITEMS(args))
+    for item in items:
+        print(PRT_INIT_SEARCH_RESULT(item))
+    return True
+
+
+def __history(args: str) -> bool:
+    """
+    The function `__history` runs `history [PERIOD]`: it prints the monthly totals, or the
+    transactions of a period.
+
+    @param args The `args` parameter is the text following the command name.
+
+    @return The function returns True if the period is valid, otherwise False.
+    """
+    if not args:
+        print(PRT_INIT_HISTORY_ROLLUPS("month"))
+        for month in rollups():
+            print(PRT_INIT_HISTORY_ROLLUP(month))
+        return True
+    try:
+        count, change, transactions = history(args)
+    except ValueError:
+        var.extra_message = PRT_INIT_HISTORY_INVALID_PERIOD(args)
+        return False
+    print(PRT_INIT_HISTORY_PERIOD((args, count, change)))
+    for transaction in transactions:
+        print(PRT_INIT_HISTORY_TRANSACTION(transaction))
+    return True
+
+
+def __undo(args: str) -> bool:
+    """
+    The function `__undo` runs `undo` and prints the change it reverted.
+
+    @param args The `args` parameter is ignored.
+
+    @return The function returns True if a change was undone, otherwise False.
+    """
+    if not undo():
+        return False
+    print(var.extra_message)
+    return True
+
+
+def __redo(args: str) -> bool:
+    """
+    The function `__redo` runs `redo` and prints the change it applied again.
+
+    @param args The `args` parameter is ignored.
+
+    @return The function returns True if a change was redone, otherwise False.
+    """
+    if not redo():
+        return False
+    print(var.extra_message)
+    return True
+
+
+__commands: Dict[str, _Command] = {
+    "register": __register,
+    "search": __search,
+    "find": __find,
+    "edit": __edit,
+    "delete": __delete,
+    "summary": __summary,
+    "categories": __categories,
+    "category": __category,
+    "history": __history,
+    "undo": __undo,
+    "redo": __redo,
+}
+"""
+The dictionary __commands maps batch command names to the functions executing them. Each function
+receives the rest of the line and returns whether the command succeeded, leaving the reason of a
+failure in `var.extra_message` as the interactive handlers do.
+"""
+
+
+def __execute(lines: IO[str]) -> Tuple[int, int]:
+    """
+    The function `__execute` runs every command read from `lines`. Blank lines and lines starting
+    with '#' are skipped; failures are reported on stderr and do not stop the batch.
+
+    @param lines The `lines` parameter is the text stream holding one command per line.
+
+    @return The function returns a tuple with the number of commands run and the number that failed.
+    """
+    count: int = 0
+    failed: int = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, _, args = line.partition(" ")
+        count += 1
+        f: _Command | None = __commands.get(name.lower())
+        if f is None:
+            var.extra_message = PRT_INIT_RUN_UNKNOWN_COMMAND(name)
+        elif f(args.strip()):
+            continue
+        failed += 1
+        print(PRT_INIT_RUN_FAILED_LINE((number, var.extra_message)), file=_sys.stderr)
+    return count, failed
+
+
+def __stage(transaction: Transaction, command: str, args: str) -> None:
+    """
+    The function `__stage` stages a `register`, `edit` or `delete` command in a transaction.
+
+    @param transaction The `transaction` parameter is the transaction.
+    @param command The `command` parameter is the name of the command.
+    @param args The `args` parameter is the text following the command name.
+
+    @raise ValueError If the command is not a change or is invalid.
+    """
+    if command == "delete":
+        transaction.delete(args)
+        return
+    if command not in ("register", "edit"):
+        raise ValueError(PRT_INIT_RUN_NOT_ATOMIC(command))
+    name, amount, category = __split_amount(args)
+    if command == "register":
+        transaction.register(name, amount, category or "")
+    else:
+        transaction.edit(name, amount, category)
+
+
+def __transaction(lines: IO[str]) -> Transaction:
+    """
+    The function `__transaction` stages every command read from `lines` in a transaction. Blank lines
+    and lines starting with '#' are skipped.
+
+    @param lines The `lines` parameter is the text stream holding one command per line.
+
+    @return The function returns the transaction.
+
+    @raise ValueError If any command could not be staged, listing every failed line.
+    """
+    transaction: Transaction = Transaction()
+    failures: List[str] = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, _, args = line.partition(" ")
+        try:
+            __stage(transaction, name.lower(), args.strip())
+        except ValueError as e:
+            failures.append(PRT_INIT_RUN_FAILED_LINE((number, e)))
+    if failures:
+        raise ValueError(
+            PRT_INIT_TRANSACTION_REJECTED((len(failures), "\n".join(failures)))
+        )
+    return transaction
+
+
+def apply(path: str = "-") -> Tuple[int, List[str]]:
+    """
+    The function `apply` applies a script of `register`, `edit` and `delete` commands atomically: every
+    command is checked first, and the changes are only committed, with a single save, if none of
+    them failed.
+
+    @param path The `path` parameter is the script to apply, or '-' to read commands from stdin.
+
+    @return The function returns a tuple with the number of changes committed and the warnings of
+    the budget rules they exceeded.
+
+    @raise ValueError If a command failed, in which case nothing was changed.
+    @raise OSError If the script could not be read or the changes could not be written.
+    """
+    logger.was_called(apply, path)
+    if path == "-":
+        transaction: Transaction = __transaction(_sys.stdin)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            transaction = __transaction(f)
+    count: int = len(transaction)
+    return count, transaction.commit()
+
+
+def run(path: str = "-", atomic: bool = False) -> int:
+    """
+    The function `run` executes a script of `register`, `search`, `edit` and `delete` commands without
+    the interactive menu. Persistence is deferred while the script runs and all changes are written
+    with a single save at the end, after which the throughput is reported.
+
+    @param path The `path` parameter is the script to run, or '-' to read commands from stdin.
+    @param atomic The `atomic` parameter tells whether to `apply` the script as a single transaction
+    instead, which changes nothing if any command fails.
+
+    @return The function returns 0 if every command succeeded, otherwise 1.
+    """
+    logger.was_called(run, path, atomic)
+    if atomic:
+        start: float = _time.perf_counter()
+        try:
+            count, warnings = apply(path)
+        except ValueError as e:
+            print(e, file=_sys.stderr)
+            return 1
+        for warning in warnings:
+            print(warning, file=_sys.stderr)
+        print(PRT_INIT_TRANSACTION_COMMITTED((count, _time.perf_counter() - start)))
+        return 0
+    autosave: bool = var.autosave
+    var.autosave = False
+    start = _time.perf_counter()
+    try:
+        if path == "-":
+            count, failed = __execute(_sys.stdin)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                count, failed = __execute(f)
+    finally:
+        save()
+        var.autosave = autosave
+    print(PRT_INIT_RUN_SUMMARY((count, failed, _time.perf_counter() - start)))
+    return 1 if failed else 0
@@ -0,0 +1,153 @@
+__all__ = ["main"]
+
+import argparse as _argparse
+from typing import List
+
+from src.var import var
+from src.storage import STORAGES
+from src.durable import LEVELS
+from .compare import compare
+from .loadgen import run_loadgen
+from .scenarios import DESCRIPTIONS, SCENARIOS
+from .stress import run_stress
+from .suite import run_suite, save_results
+
+# Budget sizes run when none are given; `--large` adds `LARGE_SIZES`, which take minutes.
+DEFAULT_SIZES: List[int] = [1_000, 10_000]
+LARGE_SIZES: List[int] = [100_000, 1_000_000]
+
+
+def __parser() -> _argparse.ArgumentParser:
+    """
+    The function `__parser` builds the parser for `benchmark.py`.
+
+    @return The function returns the argument parser.
+    """
+    parser = _argparse.ArgumentParser(
+        prog="benchmark.py", description="Budget Tracker CLI benchmarks."
+    )
+    parser.add_argument(
+        "--storage", choices=list(STORAGES), default=var.storage, help="storage backend"
+    )
+    parser.add_argument(
+        "--journal", action="store_true", help="enable the JSON storage journal"
+    )
+    parser.add_argument(
+        "--durability",
+        choices=list(LEVELS),
+        default=var.durability,
+        help="durability of saves",
+    )
+    parser.add_argument(
+        "--large",
+        action="store_true",
+        help=f"when no sizes are given, also run {LARGE_SIZES} (takes minutes)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    suite = commands.add_parser(
+        "suite", help="time the core operations and save the results as JSON"
+    )
+    suite.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    suite.add_argument(
+        "--ops", type=int, default=1_000, help="timed calls per operation"
+    )
+    suite.add_argument(
+        "--repeat", type=int, default=3, help="timed loads and saves per size"
+    )
+    suite.add_argument("--warmup", type=int, default=100, help="untimed calls first")
+    suite.add_argument(
+        "--only", nargs="+", default=[], metavar="OP", help="operations to run"
+    )
+    suite.add_argument("-o", "--output", help="file to save the results to")
+
+    diff = commands.add_parser(
+        "compare", help="compare two saved runs and flag slowdowns"
+    )
+    diff.add_argument("old", help="baseline results")
+    diff.add_argument("new", help="results to check")
+    diff.add_argument(
+        "--threshold", type=float, default=10.0, help="tolerated change in percent"
+    )
+    diff.add_argument(
+        "--metric",
+        default="p50_us",
+        choices=["mean_us", "p50_us", "p90_us", "p99_us", "max_us"],
+    )
+
+    stress = commands.add_parser(
+        "stress",
+        help="concurrent processes mutating one budget (fails if an update is lost)",
+    )
+    stress.add_argument("--processes", type=int, default=4)
+    stress.add_argument("--ops", type=int, default=500, help="mutations per process")
+    stress.add_argument(
+        "--batch", type=int, default=1, help="mutations saved at once (1: autosave)"
+    )
+
+    load = commands.add_parser(
+        "loadgen", help="requests/s and p99 latency of the JSON server over loopback"
+    )
+    load.add_argument("--connections", type=int, default=8)
+    load.add_argument("--requests", type=int, default=50_000, help="total requests")
+    load.add_argument(
+        "--pipeline", type=int, default=16, help="requests in flight per connection"
+    )
+    load.add_argument(
+        "--writes", type=float, default=0.1, help="fraction of requests that are edits"
+    )
+    load.add_argument(
+        "--size", type=int, default=100_000, help="items of the synthetic budget"
+    )
+    load.add_argument(
+        "--connect",
+        metavar="HOST:PORT",
+        help="use a running `main.py serve` instead of starting one on a synthetic budget",
+    )
+
+    for name in SCENARIOS:
+        command = commands.add_parser(name, help=DESCRIPTIONS[name])
+        command.add_argument("sizes", type=int, nargs="*", default=DEFAULT_SIZES)
+
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    """
+    The function `main` runs the benchmark command given on the command line: the `suite`, the
+    `compare` of two saved suites, the multi-process `stress` test, the server `loadgen`, or one of the named `SCENARIOS`.
+
+    @param argv The `argv` parameter is the list of command line arguments.
+
+    @return The function returns the process exit status.
+    """
+    args: _argparse.Namespace = __parser().parse_args(argv)
+    var.storage = args.storage
+    var.journal = args.journal
+    var.durability = args.durability
+    if args.large and "sizes" in args and args.sizes is DEFAULT_SIZES:
+        args.sizes = DEFAULT_SIZES + LARGE_SIZES
+    if args.command == "compare":
+        return compare(args.old, args.new, args.threshold, args.metric)
+    if args.command == "stress":
+        return 0 if run_stress(args.processes, args.ops, args.batch) else 1
+    if args.command == "loadgen":
+        return (
+            0
+            if run_loadgen(
+                args.connections,
+                args.requests,
+                args.pipeline,
+                args.writes,
+                args.size,
+                args.connect,
+            )
+            else 1
+        )
+    if args.command == "suite":
+        print(f"{'op':>13} {'size':>9} {'p50 (us)':>11} {'p99 (us)':>11} {'ops/s':>13}")
+        results = run_suite(args.sizes, args.ops, args.repeat, args.warmup, args.only)
+        if args.output:
+            save_results(results, args.output)
+        return 0
+    return 1 if SCENARIOS[args.command](args.sizes) is False else 0
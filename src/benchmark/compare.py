@@ -0,0 +1,53 @@
+__all__ = ["compare"]
+
+import json as _json
+from typing import Any, Dict, Tuple
+
+_Key = Tuple[str, int]
+
+
+def __load(path: str) -> Dict[_Key, Dict[str, Any]]:
+    """
+    The function `__load` reads the results saved by `save_results`, keyed by operation and size.
+
+    @param path The `path` parameter is the results file.
+
+    @return The function returns a dictionary mapping (operation, size) to its result.
+    """
+    with open(path, "r") as f:
+        results: Dict[str, Any] = _json.load(f)
+    return {(r["op"], r["size"]): r for r in results["results"]}
+
+
+def compare(old: str, new: str, threshold: float, metric: str = "p50_us") -> int:
+    """
+    The function `compare` prints, for every operation and size present in both runs, how `metric`
+    changed between the `old` and the `new` results, flagging changes beyond `threshold` percent.
+
+    @param old The `old` parameter is the baseline results file.
+    @param new The `new` parameter is the results file to check.
+    @param threshold The `threshold` parameter is the tolerated change, in percent.
+    @param metric The `metric` parameter is the latency field to compare.
+
+    @return The function returns 1 if any operation got slower than the threshold, otherwise 0.
+    """
+    before: Dict[_Key, Dict[str, Any]] = __load(old)
+    after: Dict[_Key, Dict[str, Any]] = __load(new)
+    slower: int = 0
+    print(f"{'op':>13} {'size':>9} {'old':>11} {'new':>11} {'change':>9}")
+    for key in sorted(before.keys() & after.keys(), key=lambda k: (k[1], k[0])):
+        old_value: float = before[key][metric]
+        new_value: float = after[key][metric]
+        change: float = (new_value / old_value - 1) * 100 if old_value else 0.0
+        flag: str = ""
+        if change > threshold:
+            flag = "SLOWER"
+            slower += 1
+        elif change < -threshold:
+            flag = "faster"
+        print(
+            f"{key[0]:>13} {key[1]:>9} {old_value:>11.2f} {new_value:>11.2f}"
+            f" {change:>+8.1f}% {flag}"
+        )
+    print(f"\n{slower} slowdown(s) beyond {threshold:g}% on {metric}.")
+    return 1 if slower else 0
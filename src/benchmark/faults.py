@@ -0,0 +1,252 @@
+__all__ = ["run_faults"]
+
+import multiprocessing as _multiprocessing
+import os as _os
+import random as _random
+import shutil as _shutil
+import tempfile as _tempfile
+import time as _time
+from typing import Callable, Dict, List, Set, Tuple
+
+import src.const as const
+import src.durable as durable
+from src.selector_handler import functions as _functions
+from src.storage import Storage, open_storage
+from src.var import var
+from .synthetic import use_synthetic
+
+# Times a process saving the budget is killed at a random point, per size and durability level.
+KILLS: int = 5
+
+_Paths = Dict[str, str]
+
+
+def __paths() -> _Paths:
+    "Returns the storage files `const` points at, to point a saving process at the same ones."
+    return {
+        "JSON_FILE": const.JSON_FILE,
+        "JOURNAL_FILE": const.JOURNAL_FILE,
+        "LOCK_FILE": const.LOCK_FILE,
+    }
+
+
+def __amounts() -> Tuple[int, Set[float]]:
+    """
+    The function `__amounts` opens the budget as a new process would.
+
+    @return The function returns the number of items and the set of their amounts.
+    """
+    storage: Storage = open_storage("json")
+    try:
+        return len(storage), {amount for _, amount, _ in storage.rows()}
+    finally:
+        storage.close()
+
+
+def __saved(names: List[str], *amounts: float) -> None:
+    """
+    The function `__saved` forgets the files of the budget, then saves it once with every item at
+    each of `amounts` in turn, so the file holds the last amount and its backup the one before.
+
+    @param names The `names` parameter is the list of item names.
+    @param amounts The `amounts` parameter is the amounts to save.
+    """
+    _functions.close()
+    for suffix in ("", durable.BACKUP_SUFFIX, ".corrupt", ".tmp"):
+        if _os.path.exists(const.JSON_FILE + suffix):
+            _os.remove(const.JSON_FILE + suffix)
+    storage: Storage = open_storage("json")
+    try:
+        for amount in amounts:
+            storage.replace((name, amount, "") for name in names)
+    finally:
+        storage.close()
+
+
+def __damage(path: str, f: Callable[[bytes], bytes]) -> None:
+    "Rewrites a file with what `f` returns for its contents."
+    with open(path, "rb") as file:
+        data: bytes = file.read()
+    with open(path, "wb") as file:
+        file.write(f(data))
+
+
+def __flip(data: bytes) -> bytes:
+    "Changes a digit of the amounts in the middle of a file, which leaves it valid JSON."
+    position: int = data.index(b'"amount":', len(data) // 2) + len(b'"amount":')
+    digit: int = data[position] - ord("0")
+    return data[:position] + str((digit + 1) % 10).encode() + data[position + 1 :]
+
+
+def __cases(names: List[str]) -> List[Tuple[str, bool]]:
+    """
+    The function `__cases` damages the files of the budget the ways a crash or the disk could, and
+    checks what a new process reads each time: the last save, or the save before it from the backup,
+    with every item, and never an empty or partial budget.
+
+    @param names The `names` parameter is the list of item names.
+
+    @return The function returns the (case, passed) tuples.
+    """
+    size: int = len(names)
+    results: List[Tuple[str, bool]] = []
+
+    __saved(names, 1.0, 2.0)
+    __damage(const.JSON_FILE, lambda data: data[: len(data) // 2])
+    results.append(("truncated file", __amounts() == (size, {1.0})))
+
+    __saved(names, 1.0, 2.0)
+    __damage(const.JSON_FILE, __flip)
+    results.append(("flipped digit", __amounts() == (size, {1.0})))
+
+    # A crash between moving the file to its backup and moving the new file in its place.
+    __saved(names, 1.0, 2.0)
+    _os.remove(const.JSON_FILE)
+    results.append(("missing file", __amounts() == (size, {1.0})))
+
+    # A crash while the new file was written next to the old one.
+    __saved(names, 1.0, 2.0)
+    with open(const.JSON_FILE + ".tmp", "wb") as f:
+        f.write(b'{"version":2,"precision":2,"items":[{"na')
+    results.append(("leftover temporary file", __amounts() == (size, {2.0})))
+
+    __saved(names, 1.0, 2.0)
+    __damage(const.JSON_FILE, lambda data: data[: len(data) // 2])
+    __damage(const.JSON_FILE + durable.BACKUP_SUFFIX, __flip)
+    try:
+        __amounts()
+        refused: bool = False
+    except ValueError:
+        refused = _os.path.exists(const.JSON_FILE + ".corrupt")
+    results.append(("file and backup corrupted", refused))
+
+    # A write failing half-way, e.g. on a full disk, must leave the file as it was.
+    durability: str = var.durability
+    for level in durable.LEVELS:
+        __saved(names, 1.0, 2.0)
+        var.durability = level
+        try:
+            with durable.replace(const.JSON_FILE) as f:
+                f.write(b'{"version":2,')
+                raise OSError("injected write failure")
+        except OSError:
+            pass
+        results.append(
+            (
+                f"failed write ({level})",
+                __amounts() == (size, {2.0})
+                and not _os.path.exists(const.JSON_FILE + ".tmp"),
+            )
+        )
+    var.durability = durability
+
+    # A batch of journal records cut short is ignored as a whole, and cut off the journal.
+    __saved(names, 1.0)
+    journal: bool = var.journal
+    var.journal = True
+    try:
+        storage: Storage = open_storage("json")
+        autosave: bool = var.autosave
+        var.autosave = False
+        try:
+            for name in names[: max(size // 10, 2)]:
+                storage.apply({"op": "edit", "name": name, "amount": 2.0})
+            storage.save()
+        finally:
+            var.autosave = autosave
+            storage.close()
+        __damage(const.JOURNAL_FILE, lambda data: data[: len(data) - 10])
+        results.append(("torn journal batch", __amounts() == (size, {1.0})))
+        # A record appended after the torn batch must not be lost with it.
+        storage = open_storage("json")
+        try:
+            storage.apply({"op": "edit", "name": names[0], "amount": 3.0})
+        finally:
+            storage.close()
+        results.append(("append after torn journal", __amounts() == (size, {1.0, 3.0})))
+    finally:
+        var.journal = journal
+        if _os.path.exists(const.JOURNAL_FILE):
+            _os.remove(const.JOURNAL_FILE)
+    return results
+
+
+def _saver(paths: _Paths, durability: str, names: List[str]) -> None:
+    """
+    The function `_saver` runs in its own process and saves the budget over and over, with every
+    item at the same amount, one more each time, until it is killed.
+
+    @param paths The `paths` parameter is the storage files to use (see `__paths`).
+    @param durability The `durability` parameter is the `var.durability` to save with.
+    @param names The `names` parameter is the list of item names.
+    """
+    for key, path in paths.items():
+        setattr(const, key, path)
+    var.storage, var.journal, var.durability = "json", False, durability
+    storage: Storage = open_storage("json")
+    amount: float = 0.0
+    while True:
+        amount += 1
+        storage.replace((name, amount, "") for name in names)
+
+
+def __killed(names: List[str], level: str) -> bool:
+    """
+    The function `__killed` kills a process saving the budget at random points, `KILLS` times, and
+    checks each time that a new process reads a budget saved as a whole.
+
+    @param names The `names` parameter is the list of item names.
+    @param level The `level` parameter is the durability level the process saves with.
+
+    @return The function returns True if every kill left a whole budget, otherwise False.
+    """
+    start: float = _time.perf_counter()
+    __saved(names, 0.0)
+    save: float = _time.perf_counter() - start
+    ok: bool = True
+    for _ in range(KILLS):
+        process: _multiprocessing.Process = _multiprocessing.Process(
+            target=_saver, args=(__paths(), level, names)
+        )
+        process.start()
+        # Let it open the budget and save a few times, then kill it at any point of a save.
+        _time.sleep(save * _random.uniform(2, 6))
+        process.kill()
+        process.join()
+        count, amounts = __amounts()
+        ok = ok and count == len(names) and len(amounts) == 1
+    return ok
+
+
+def run_faults(sizes: List[int]) -> bool:
+    """
+    The function `run_faults` injects faults into the saves of the JSON storage (see `__cases`) and
+    kills processes in the middle of saves at every durability level, failing if a new process then
+    reads a budget that is empty, partial, or mixes two saves, or wipes a budget it cannot read.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to test.
+
+    @return The function returns True if every case passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    storage, durability = var.storage, var.durability
+    var.storage = "json"
+    ok: bool = True
+    try:
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            results: List[Tuple[str, bool]] = __cases(names)
+            for level in durable.LEVELS:
+                var.durability = level
+                results.append((f"killed mid-save ({level})", __killed(names, level)))
+            var.durability = durability
+            for case, passed in results:
+                print(f"{size:>10} {case:<28} {'ok' if passed else 'FAIL'}")
+                ok = ok and passed
+    finally:
+        var.storage, var.durability = storage, durability
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: a fault left the budget lost, partial or mixed")
+    return ok
@@ -0,0 +1,173 @@
+__all__ = ["run_loadgen"]
+
+import asyncio as _asyncio
+import json as _json
+import multiprocessing as _multiprocessing
+import random as _random
+import shutil as _shutil
+import tempfile as _tempfile
+import time as _time
+from typing import Any, Dict, List, Tuple
+
+import src.const as const
+from src.logger import logger
+from src.server import serve
+from src.var import var
+from .synthetic import synthetic_names, use_synthetic
+
+
+def _server(directory: str, settings: Tuple[str, bool], size: int, port: Any) -> None:
+    """
+    The function `_server` runs in its own process: it serves a synthetic budget of `size` items and
+    puts the port it listens on in `port`.
+
+    @param directory The `directory` parameter is the temporary directory that holds the budget.
+    @param settings The `settings` parameter is the (storage, journal) tuple to run with.
+    @param size The `size` parameter is the number of items of the budget.
+    @param port The `port` parameter is the queue to put the port in.
+    """
+    var.storage, var.journal = settings
+    use_synthetic(directory, size)
+    serve(const.SERVER_HOST, 0, port.put)
+
+
+async def __client(
+    host: str,
+    port: int,
+    requests: List[bytes],
+    pipeline: int,
+    latencies: List[int],
+) -> int:
+    """
+    The function `__client` sends `requests` over one connection, keeping up to `pipeline` of them
+    in flight, and records the latency of each.
+
+    @param host The `host` parameter is the address of the server.
+    @param port The `port` parameter is the port of the server.
+    @param requests The `requests` parameter is the list of encoded request lines to send.
+    @param pipeline The `pipeline` parameter is the number of requests sent without waiting.
+    @param latencies The `latencies` parameter is the list the latencies are appended to, in ns.
+
+    @return The function returns the number of failed requests.
+    """
+    reader, writer = await _asyncio.open_connection(host, port)
+    window: _asyncio.Semaphore = _asyncio.Semaphore(pipeline)
+    sent: List[int] = []
+
+    async def send() -> None:
+        for line in requests:
+            await window.acquire()
+            sent.append(_time.perf_counter_ns())
+            writer.write(line)
+            if window.locked():
+                await writer.drain()
+        await writer.drain()
+
+    sender: _asyncio.Task[None] = _asyncio.create_task(send())
+    failed: int = 0
+    for i in range(len(requests)):
+        response: Dict[str, Any] = _json.loads(await reader.readline())
+        latencies.append(_time.perf_counter_ns() - sent[i])
+        window.release()
+        failed += not response["ok"]
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return failed
+
+
+async def __load(
+    host: str, port: int, connections: int, batches: List[List[bytes]], pipeline: int
+) -> Tuple[float, List[int], int]:
+    """
+    The function `__load` runs one client per connection at once.
+
+    @param host The `host` parameter is the address of the server.
+    @param port The `port` parameter is the port of the server.
+    @param connections The `connections` parameter is the number of concurrent connections.
+    @param batches The `batches` parameter is the list of request lines of each connection.
+    @param pipeline The `pipeline` parameter is the number of requests in flight per connection.
+
+    @return The function returns the elapsed seconds, the sorted latencies and the failure count.
+    """
+    latencies: List[int] = []
+    start: float = _time.perf_counter()
+    failed: List[int] = await _asyncio.gather(
+        *(__client(host, port, b, pipeline, latencies) for b in batches[:connections])
+    )
+    elapsed: float = _time.perf_counter() - start
+    latencies.sort()
+    return elapsed, latencies, sum(failed)
+
+
+def run_loadgen(
+    connections: int,
+    requests: int,
+    pipeline: int,
+    writes: float,
+    size: int,
+    address: str | None = None,
+) -> bool:
+    """
+    The function `run_loadgen` sends `requests` requests to a budget server over `connections`
+    connections, each keeping `pipeline` requests in flight, and prints the requests per second and
+    the p50/p99 latencies. A fraction `writes` of the requests are edits, the others searches. Unless
+    `address` is given, a server is started in another process on a synthetic budget of `size`
+    items, in a temporary directory.
+
+    @param connections The `connections` parameter is the number of concurrent connections.
+    @param requests The `requests` parameter is the total number of requests.
+    @param pipeline The `pipeline` parameter is the number of requests in flight per connection.
+    @param writes The `writes` parameter is the fraction of requests that are edits.
+    @param size The `size` parameter is the number of items the requests pick names from.
+    @param address The `address` parameter is the HOST:PORT of a running server.
+
+    @return The function returns True if every request succeeded, otherwise False.
+    """
+    logger.was_called(run_loadgen, connections, requests, pipeline, writes, size)
+    names: List[str] = synthetic_names(size)
+    rng: _random.Random = _random.Random(0)
+    batches: List[List[bytes]] = [[] for _ in range(connections)]
+    for i in range(requests):
+        request: Dict[str, Any] = {"id": i, "op": "search", "name": rng.choice(names)}
+        if rng.random() < writes:
+            request.update(op="edit", amount=float(rng.randrange(1_000_000)))
+        batches[i % connections].append(_json.dumps(request).encode() + b"\n")
+
+    directory: str | None = None
+    server: _multiprocessing.Process | None = None
+    if address is None:
+        directory = _tempfile.mkdtemp(prefix="budget-loadgen-")
+        ports: Any = _multiprocessing.Queue()
+        server = _multiprocessing.Process(
+            target=_server,
+            args=(directory, (var.storage, var.journal), size, ports),
+            daemon=True,
+        )
+        server.start()
+        host, port = const.SERVER_HOST, ports.get(timeout=120)
+    else:
+        host, _, text = address.rpartition(":")
+        port = int(text)
+    try:
+        elapsed, latencies, failed = _asyncio.run(
+            __load(host, port, connections, batches, pipeline)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+        if directory is not None:
+            _shutil.rmtree(directory, ignore_errors=True)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] / 1e3
+
+    print(
+        f"{requests:,} requests over {connections} connection(s), pipeline {pipeline},"
+        f" {writes:.0%} writes: {requests / elapsed:,.0f} req/s,"
+        f" p50 {percentile(50):,.0f} us, p99 {percentile(99):,.0f} us"
+    )
+    if failed:
+        print(f"FAIL: {failed} request(s) failed")
+    return not failed
@@ -0,0 +1,1117 @@
+__all__ = ["SCENARIOS", "DESCRIPTIONS"]
+
+import compileall as _compileall
+import io as _io
+import json as _json
+import math as _math
+import logging as _logging
+import os as _os
+import random as _random
+import shutil as _shutil
+import statistics as _statistics
+import subprocess as _subprocess
+import sys as _sys
+import tempfile as _tempfile
+import threading as _threading
+import time as _time
+import tracemalloc as _tracemalloc
+from array import array as _array
+from typing import Any, Callable, Dict, List, Tuple
+
+import src.const as const
+import src.durable as durable
+import src.history as _history
+import src.money as _money
+from src.exporter import export_file
+from src.logger import logger
+from src.selector_handler import functions as _functions
+from src.storage import STORAGES, Storage, reshard
+from src.screen import Screen
+from src.transaction import Transaction, statistics
+from src.undo import OperationLog
+from src.var import var
+from .faults import run_faults
+from .synthetic import use_synthetic
+
+# A scenario receives the budget sizes to use; scenarios acting as a guard return False on failure.
+_Bench = Callable[[List[int]], bool | None]
+
+LOOKUPS: int = 1_000
+MUTATIONS: int = 20
+LOG_CALLS: int = 100_000
+STARTUP_RUNS: int = 10
+CATEGORIES: int = 20
+HISTORY_YEARS: int = 5
+# Number of amounts `bench_amounts` adds up.
+SUM_SIZE: int = 10_000_000
+# Edits of the transaction of `bench_transactions`, and its threads and commits per thread.
+BULK_EDITS: int = 10_000
+COMMIT_THREADS: int = 8
+THREAD_COMMITS: int = 25
+# Saves and journal appends timed at each durability level by `bench_durability`.
+DURABLE_SAVES: int = 5
+DURABLE_APPENDS: int = 200
+# Upper bound for the cumulative import time of `src`, as reported by `-X importtime`: about 20%
+# over the slowest runs measured (40-54 ms), so that any eager import of a backend fails it.
+STARTUP_BUDGET_MS: float = 65.0
+
+
+def __per_call_us(
+    f: Callable[[str], Any], names: List[str], calls: int = LOOKUPS
+) -> float:
+    """
+    The function `__per_call_us` times `f` over a random sample of names.
+
+    @param f The `f` parameter is the operation to measure; it receives an item name.
+    @param names The `names` parameter is the list of names to sample from.
+    @param calls The `calls` parameter is the number of calls to time.
+
+    @return The function returns the mean latency per call, in microseconds.
+    """
+    sample: List[str] = _random.choices(names, k=calls)
+    start: int = _time.perf_counter_ns()
+    for name in sample:
+        f(name)
+    return (_time.perf_counter_ns() - start) / calls / 1_000
+
+
+def bench_index(sizes: List[int]) -> None:
+    """
+    The function `bench_index` measures `item_exists` and `search` latency across budget sizes. With
+    the name index both should stay flat as the budget grows.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    try:
+        print(f"{'items':>10} {'item_exists (us)':>18} {'search (us)':>14}")
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            exists_us: float = __per_call_us(_functions.item_exists, names)
+            search_us: float = __per_call_us(_functions.search, names)
+            print(f"{size:>10} {exists_us:>18.2f} {search_us:>14.2f}")
+    finally:
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_journal(sizes: List[int]) -> None:
+    """
+    The function `bench_journal` measures `edit` latency across budget sizes with full snapshot saves
+    and with the append-only journal. Journaled edits should not depend on the budget size.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    journal: bool = var.journal
+    try:
+        print(f"{'items':>10} {'snapshot edit (us)':>20} {'journal edit (us)':>19}")
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            edit: Callable[[str], None] = lambda name: _functions.edit(name, 1.0)
+            var.journal = False
+            snapshot_us: float = __per_call_us(edit, names, MUTATIONS)
+            var.journal = True
+            journal_us: float = __per_call_us(edit, names, LOOKUPS)
+            print(f"{size:>10} {snapshot_us:>20.2f} {journal_us:>19.2f}")
+    finally:
+        var.journal = journal
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_storage(sizes: List[int]) -> None:
+    """
+    The function `bench_storage` measures the time to open the budget and the latency of `search` and
+    `edit` for every storage backend across budget sizes.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    storage: str = var.storage
+    try:
+        print(
+            f"{'storage':>8} {'items':>10} {'open (ms)':>10} {'search (us)':>12}"
+            f" {'edit (us)':>10}"
+        )
+        for kind in STORAGES:
+            var.storage = kind
+            for size in sizes:
+                names: List[str] = use_synthetic(directory, size)
+                start: int = _time.perf_counter_ns()
+                _functions.reload()
+                open_ms: float = (_time.perf_counter_ns() - start) / 1_000_000
+                search_us: float = __per_call_us(_functions.search, names)
+                edit: Callable[[str], None] = lambda name: _functions.edit(name, 1.0)
+                edit_us: float = __per_call_us(edit, names, MUTATIONS)
+                print(
+                    f"{kind:>8} {size:>10} {open_ms:>10.2f} {search_us:>12.2f}"
+                    f" {edit_us:>10.2f}"
+                )
+    finally:
+        var.storage = storage
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+def __traced_bytes(f: Callable[[], Any]) -> int:
+    """
+    The function `__traced_bytes` measures the memory still allocated by `f` once it returned, which
+    includes whatever the returned value keeps alive.
+
+    @param f The `f` parameter is the function building the structure to measure.
+
+    @return The function returns the number of bytes allocated.
+    """
+    _tracemalloc.start()
+    try:
+        before: int = _tracemalloc.get_traced_memory()[0]
+        kept: Any = f()
+        after: int = _tracemalloc.get_traced_memory()[0]
+        del kept
+        return after - before
+    finally:
+        _tracemalloc.stop()
+
+
+def bench_memory(sizes: List[int]) -> None:
+    """
+    The function `bench_memory` compares the bytes per item of the JSON storage with the list of
+    dictionaries (plus name index) it used to keep, both loaded from the same file.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    storage: str = var.storage
+    var.storage = "json"
+
+    def dicts() -> Any:
+        with open(const.JSON_FILE, "r") as f:
+            data: List[Dict[str, Any]] = _json.load(f)
+        return data, {item["name"]: i for i, item in enumerate(data)}
+
+    try:
+        print(f"{'items':>10} {'dicts (B/item)':>15} {'columns (B/item)':>17}")
+        for size in sizes:
+            use_synthetic(directory, size)
+            before: int = __traced_bytes(dicts)
+            after: int = __traced_bytes(STORAGES["json"])
+            print(f"{size:>10} {before / size:>15.1f} {after / size:>17.1f}")
+    finally:
+        var.storage = storage
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_logger(sizes: List[int]) -> None:
+    """
+    The function `bench_logger` measures the overhead of one `logger.was_called` call: eagerly
+    formatted and written synchronously (as the logger used to), queued to the writer thread with the
+    DEBUG level enabled, and gated off at the INFO level. The budget sizes are not used.
+
+    @param sizes The `sizes` parameter is ignored.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    data: Tuple[Any, ...] = ("groceries", 120.5)
+
+    def per_call_us(f: Callable[[], None]) -> float:
+        start: int = _time.perf_counter_ns()
+        for _ in range(LOG_CALLS):
+            f()
+        return (_time.perf_counter_ns() - start) / LOG_CALLS / 1_000
+
+    eager: _logging.Logger = _logging.getLogger(f"{__name__}.eager")
+    eager.propagate = False
+    eager.setLevel(_logging.DEBUG)
+    handler = _logging.FileHandler(_os.path.join(directory, "eager.log"), mode="w")
+    handler.setFormatter(
+        _logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    )
+    eager.addHandler(handler)
+    try:
+        eager_us: float = per_call_us(
+            lambda: eager.info(
+                f"Function '{bench_logger.__name__}' at <{id(bench_logger)}> was"
+                f" called with the following data:\n{data}"
+            )
+        )
+        logger.set_level("DEBUG")
+        queued_us: float = per_call_us(lambda: logger.was_called(bench_logger, *data))
+        logger.set_level("INFO")
+        gated_us: float = per_call_us(lambda: logger.was_called(bench_logger, *data))
+        print(f"{'logging':>22} {'per call (us)':>14}")
+        print(f"{'eager, synchronous':>22} {eager_us:>14.2f}")
+        print(f"{'queued, DEBUG':>22} {queued_us:>14.2f}")
+        print(f"{'gated, INFO':>22} {gated_us:>14.2f}")
+    finally:
+        handler.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_startup(sizes: List[int]) -> bool:
+    """
+    The function `bench_startup` imports the package in fresh interpreters with `-X importtime`,
+    from an empty working directory, and reports the median cumulative import time of `src` and the
+    slowest modules. It fails if the import time exceeds `STARTUP_BUDGET_MS` or if importing created
+    any file or directory. The budget sizes are not used.
+
+    @param sizes The `sizes` parameter is ignored.
+
+    @return The function returns True if the startup stayed within its budget, otherwise False.
+    """
+    # Stale bytecode would be compiled again by every run where caches are not written, e.g. with
+    # PYTHONDONTWRITEBYTECODE, so it is compiled first to measure importing alone.
+    _compileall.compile_dir(
+        _os.path.join(const.ABSOLUTE_PATH, "src"), quiet=1, workers=0
+    )
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    env: Dict[str, str] = dict(_os.environ, PYTHONPATH=const.ABSOLUTE_PATH)
+    totals: List[float] = []
+    modules: Dict[str, List[float]] = {}
+    try:
+        for _ in range(STARTUP_RUNS):
+            stderr: str = _subprocess.run(
+                [_sys.executable, "-X", "importtime", "-c", "import src"],
+                cwd=directory,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stderr
+            for line in stderr.splitlines():
+                if not line.startswith("import time:") or "|" not in line:
+                    continue
+                _, cumulative, name = line.split("|")
+                if not cumulative.strip().isdigit():
+                    continue
+                ms: float = int(cumulative) / 1_000
+                modules.setdefault(name.strip(), []).append(ms)
+                if name.strip() == "src":
+                    totals.append(ms)
+        side_effects: List[str] = _os.listdir(directory)
+    finally:
+        _shutil.rmtree(directory, ignore_errors=True)
+
+    total: float = _statistics.median(totals)
+    print(f"{'module':>40} {'cumulative (ms)':>16}")
+    slowest = sorted(modules.items(), key=lambda m: -_statistics.median(m[1]))
+    for name, times in slowest[:15]:
+        print(f"{name:>40} {_statistics.median(times):>16.2f}")
+    print(f"\nimport src: {total:.2f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+    if side_effects:
+        print(f"FAIL: importing created {side_effects}")
+    if total > STARTUP_BUDGET_MS:
+        print("FAIL: startup is over budget")
+    return not side_effects and total <= STARTUP_BUDGET_MS
+
+
+def bench_find(sizes: List[int]) -> None:
+    """
+    The function `bench_find` measures the time to build the name index and the latency of prefix,
+    substring and short substring queries (first page only) across budget sizes.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    queries: Dict[str, str] = {
+        "prefix": "item-0001*",
+        "substring": "00123",
+        "short": "99",
+    }
+    try:
+        print(
+            f"{'items':>10} {'build (ms)':>11}"
+            + "".join(f" {q + ' (ms)':>16}" for q in queries)
+        )
+        for size in sizes:
+            use_synthetic(directory, size)
+            start: int = _time.perf_counter_ns()
+            _functions.find("")
+            line: str = f"{size:>10} {(_time.perf_counter_ns() - start) / 1e6:>11.2f}"
+            for query in queries.values():
+                start = _time.perf_counter_ns()
+                for _ in range(MUTATIONS):
+                    _functions.find(query)
+                line += f" {(_time.perf_counter_ns() - start) / MUTATIONS / 1e6:>16.3f}"
+            print(line)
+    finally:
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_summary(sizes: List[int]) -> bool:
+    """
+    The function `bench_summary` measures the time to compute the running totals, the latency of
+    `summary` after random registrations, edits and deletions, and the time of a full recomputation,
+    across budget sizes. It fails if the running totals do not match the recomputation.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    autosave: bool = var.autosave
+    var.autosave = False
+    ok: bool = True
+    try:
+        print(
+            f"{'items':>10} {'build (ms)':>11} {'summary (us)':>13}"
+            f" {'recompute (ms)':>15} {'check':>6}"
+        )
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            start: int = _time.perf_counter_ns()
+            _functions.summary()
+            build: float = (_time.perf_counter_ns() - start) / 1e6
+            summary_us: float = 0.0
+            for i in range(LOOKUPS):
+                name: str = _random.choice(names)
+                op: int = i % 3
+                if op == 0:
+                    _functions.edit(name, _random.uniform(0, 1e6))
+                elif op == 1 and _functions.item_exists(name):
+                    _functions.delete(name)
+                else:
+                    _functions.register(name, _random.uniform(0, 1e6))
+                start = _time.perf_counter_ns()
+                _functions.summary()
+                summary_us += (_time.perf_counter_ns() - start) / 1_000
+            start = _time.perf_counter_ns()
+            mismatches: List[str] = _functions.verify_summary()
+            recompute: float = (_time.perf_counter_ns() - start) / 1e6
+            ok = ok and not mismatches
+            print(
+                f"{size:>10} {build:>11.2f} {summary_us / LOOKUPS:>13.2f}"
+                f" {recompute:>15.2f} {', '.join(mismatches) or 'ok':>6}"
+            )
+    finally:
+        var.autosave = autosave
+        _functions.reload()
+        _shutil.rmtree(directory, ignore_errors=True)
+    return ok
+
+
+def bench_categories(sizes: List[int]) -> bool:
+    """
+    The function `bench_categories` spreads the items over `CATEGORIES` categories, then measures
+    the per-category group-by from the category index against opening the storage again and
+    grouping a full scan of its items, across budget sizes. It fails if both disagree.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    autosave: bool = var.autosave
+    var.autosave = False
+    ok: bool = True
+    try:
+        print(
+            f"{'items':>10} {'build (ms)':>11} {'group-by (us)':>14} {'scan (ms)':>10}"
+        )
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            for i, name in enumerate(names):
+                _functions.edit(name, float(i), f"category-{i % CATEGORIES}")
+            _functions.save()
+            _functions.reload()
+            start: int = _time.perf_counter_ns()
+            _functions.categories()
+            build: float = (_time.perf_counter_ns() - start) / 1e6
+            start = _time.perf_counter_ns()
+            for _ in range(MUTATIONS):
+                groups: List[Tuple[str, int, float]] = _functions.categories()
+            group_by: float = (_time.perf_counter_ns() - start) / MUTATIONS / 1_000
+            start = _time.perf_counter_ns()
+            scanned: Dict[str, List[float]] = {}
+            storage: Storage = STORAGES[var.storage]()
+            for _, amount, category in storage.rows():
+                scanned.setdefault(category, []).append(amount)
+            storage.close()
+            scan: float = (_time.perf_counter_ns() - start) / 1e6
+            ok = ok and [(c, n) for c, n, _ in groups] == sorted(
+                (c, len(a)) for c, a in scanned.items()
+            )
+            print(f"{size:>10} {build:>11.2f} {group_by:>14.2f} {scan:>10.2f}")
+    finally:
+        var.autosave = autosave
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: the category index does not match a full scan")
+    return ok
+
+
+def bench_history(sizes: List[int]) -> bool:
+    """
+    The function `bench_history` writes a synthetic history of `size` transactions spread over
+    `HISTORY_YEARS` years, then measures loading it, querying a month (from the rollups) and a
+    date range (from the running sums), against summing the same range with a full scan. It fails
+    if the answers disagree.
+
+    @param sizes The `sizes` parameter is the list of history sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    ok: bool = True
+    try:
+        print(
+            f"{'transactions':>12} {'load (ms)':>10} {'month (us)':>11}"
+            f" {'range (us)':>11} {'scan (ms)':>10}"
+        )
+        for size in sizes:
+            use_synthetic(directory, 1)
+            start_ts: float = _time.time() - HISTORY_YEARS * 365 * 86_400
+            step: float = HISTORY_YEARS * 365 * 86_400 / size
+            with open(const.HISTORY_FILE, "w") as f:
+                for i in range(size):
+                    f.write(
+                        _json.dumps(
+                            [
+                                start_ts + i * step,
+                                "edit",
+                                f"item-{i % 1000:08d}",
+                                float(i % 100),
+                                float(i % 7 - 3),
+                            ],
+                            separators=(",", ":"),
+                        )
+                        + "\n"
+                    )
+            _functions.close()
+            month: str = _time.strftime(
+                "%Y-%m", _time.localtime(start_ts + 86_400 * 400)
+            )
+            period: str = f"{month}-03..{month}-20"
+            start: int = _time.perf_counter_ns()
+            _functions.rollups()
+            load: float = (_time.perf_counter_ns() - start) / 1e6
+            timings: List[float] = []
+            for query in (month, period):
+                start = _time.perf_counter_ns()
+                for _ in range(MUTATIONS):
+                    count, change, _ = _functions.history(query, 1)
+                timings.append((_time.perf_counter_ns() - start) / MUTATIONS / 1_000)
+            start = _time.perf_counter_ns()
+            low, high = _history.period_range(period)
+            scanned: List[float] = [t[4] for t in _history.load() if low <= t[0] < high]
+            scan: float = (_time.perf_counter_ns() - start) / 1e6
+            ok = (
+                ok
+                and count == len(scanned)
+                and _math.isclose(change, _math.fsum(scanned), abs_tol=1e-6)
+            )
+            print(
+                f"{size:>12} {load:>10.2f} {timings[0]:>11.2f}"
+                f" {timings[1]:>11.2f} {scan:>10.2f}"
+            )
+    finally:
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: the time index does not match a full scan")
+    return ok
+
+
+def bench_undo(sizes: List[int]) -> bool:
+    """
+    The function `bench_undo` edits `LOOKUPS` random items, then measures undoing and redoing every
+    edit and the memory the operation log needs per step, across budget sizes. Both should stay flat
+    as the budget grows. It fails if undoing everything does not restore the original amounts.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    autosave, depth = var.autosave, var.undo_depth
+    var.autosave, var.undo_depth = False, LOOKUPS
+    ok: bool = True
+    try:
+        print(f"{'items':>10} {'undo (us)':>10} {'redo (us)':>10} {'bytes/step':>11}")
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            sample: List[str] = _random.choices(names, k=LOOKUPS)
+            log: OperationLog = OperationLog(LOOKUPS)
+            step_bytes: float = __traced_bytes(
+                lambda: [
+                    log.push(n, (float(i), ""), (float(i + 1), ""))
+                    for i, n in enumerate(sample)
+                ]
+            )
+            step_bytes /= LOOKUPS
+            for name in sample:
+                _functions.edit(name, -1.0)
+            timings: List[float] = []
+            for step in (_functions.undo, _functions.redo, _functions.undo):
+                start: int = _time.perf_counter_ns()
+                for _ in range(LOOKUPS):
+                    step()
+                timings.append((_time.perf_counter_ns() - start) / LOOKUPS / 1_000)
+            # Synthetic amounts are never negative, so any -1.0 left means an edit was not undone.
+            ok = ok and _functions.summary()["min"][1] >= 0
+            print(
+                f"{size:>10} {timings[0]:>10.2f} {timings[1]:>10.2f} {step_bytes:>11.0f}"
+            )
+    finally:
+        var.autosave, var.undo_depth = autosave, depth
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: undoing every edit did not restore the budget")
+    return ok
+
+
+def bench_shards(sizes: List[int]) -> bool:
+    """
+    The function `bench_shards` measures the cold load time of the JSON storage and the latency of a
+    saved edit with the budget split into 1, 2, 4... shards, up to the number of cores, across budget
+    sizes. Loading should get faster with more shards on large budgets, and an edit only rewrites the
+    shard holding the item. It fails if a sharded budget does not load every item back.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    storage: str = var.storage
+    var.storage = "json"
+    counts: List[int] = [1]
+    while counts[-1] * 2 <= max(_os.cpu_count() or 1, 2):
+        counts.append(counts[-1] * 2)
+    ok: bool = True
+    try:
+        print(f"{_os.cpu_count()} core(s)")
+        print(f"{'items':>10} {'shards':>7} {'load (ms)':>10} {'edit (ms)':>10}")
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            _functions.close()
+            for count in counts:
+                reshard(count)
+                loads: List[float] = []
+                for _ in range(3):
+                    start: int = _time.perf_counter_ns()
+                    budget: Storage = STORAGES["json"]()
+                    loads.append((_time.perf_counter_ns() - start) / 1_000_000)
+                    ok = ok and len(budget) == size
+                start = _time.perf_counter_ns()
+                for name in _random.choices(names, k=MUTATIONS):
+                    budget.apply({"op": "edit", "name": name, "amount": 1.0})
+                edit_ms: float = (_time.perf_counter_ns() - start) / MUTATIONS / 1e6
+                budget.close()
+                print(f"{size:>10} {count:>7} {min(loads):>10.1f} {edit_ms:>10.2f}")
+            reshard(1)
+    finally:
+        var.storage = storage
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: a sharded budget did not load every item")
+    return ok
+
+
+def bench_snapshot(sizes: List[int]) -> bool:
+    """
+    The function `bench_snapshot` compares opening the budget from JSON with mapping the binary
+    snapshot, with and without checking its checksum, along with the memory kept by the opened
+    storage and the lookup latency, across budget sizes. Mapping should take about the same time
+    whatever the size. It fails if the snapshot does not hold the same items as the JSON file.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    storage, verify = var.storage, var.snapshot_verify
+    ok: bool = True
+    try:
+        print(
+            f"{'items':>10} {'format':>14} {'open (ms)':>10} {'kept (B)':>12}"
+            f" {'get (us)':>9}"
+        )
+        for size in sizes:
+            var.storage = "binary"
+            names: List[str] = use_synthetic(directory, size)
+            _functions.close()
+            for label, kind, check in (
+                ("json", "json", True),
+                ("binary", "binary", False),
+                ("binary+verify", "binary", True),
+            ):
+                var.snapshot_verify = check
+                start: int = _time.perf_counter_ns()
+                budget: Storage = STORAGES[kind]()
+                open_ms: float = (_time.perf_counter_ns() - start) / 1_000_000
+                kept: int = __traced_bytes(lambda: STORAGES[kind]())
+                get_us: float = __per_call_us(budget.get, names)
+                ok = ok and len(budget) == size
+                ok = ok and all(budget.get(n) == float(int(n[5:])) for n in names[:100])
+                budget.close()
+                # Free it now rather than while timing the next format.
+                del budget
+                print(
+                    f"{size:>10} {label:>14} {open_ms:>10.2f} {kept:>12,}"
+                    f" {get_us:>9.2f}"
+                )
+    finally:
+        var.storage, var.snapshot_verify = storage, verify
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: the snapshot does not hold the same items as the JSON budget")
+    return ok
+
+
+def bench_profile(sizes: List[int]) -> None:
+    """
+    The function `bench_profile` measures the overhead `src.stats` adds to `lookup`: the undecorated
+    function, the timed one with `var.profile` disabled (the default), and with it enabled.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    bare: Callable[[str], Any] = _functions.lookup.__wrapped__  # type: ignore[attr-defined]
+    try:
+        print(
+            f"{'items':>10} {'bare (us)':>10} {'disabled (us)':>14} {'enabled (us)':>13}"
+        )
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            bare(names[0])
+            bare_us: float = __per_call_us(bare, names, LOG_CALLS)
+            disabled_us: float = __per_call_us(_functions.lookup, names, LOG_CALLS)
+            var.profile = True
+            try:
+                enabled_us: float = __per_call_us(_functions.lookup, names, LOG_CALLS)
+            finally:
+                var.profile = False
+            print(
+                f"{size:>10} {bare_us:>10.3f} {disabled_us:>14.3f} {enabled_us:>13.3f}"
+            )
+    finally:
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+class _Terminal(_io.StringIO):
+    "A stream that claims to be a terminal, so that `Screen` draws on it with escape sequences."
+
+    def isatty(self) -> bool:
+        return True
+
+
+def bench_screen(sizes: List[int]) -> None:
+    """
+    The function `bench_screen` measures the List Items screen: the latency of reading a page of
+    items at a random position once the name index is built, and the time and bytes taken to draw
+    that page on a terminal, redrawing only the changed lines, compared with running the shell
+    command the menu used to clear the screen with.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    page: int = 25
+    try:
+        start: int = _time.perf_counter_ns()
+        for _ in range(10):
+            _os.system("clear >/dev/null 2>&1" if _os.name != "nt" else "cls >nul")
+        clear_us: float = (_time.perf_counter_ns() - start) / 10 / 1_000
+        print(
+            f"{'items':>10} {'index (ms)':>11} {'page (us)':>10} {'draw (us)':>10}"
+            f" {'bytes/page':>11} {'clear cmd (us)':>15}"
+        )
+        for size in sizes:
+            use_synthetic(directory, size)
+            build_ms: float = _time.perf_counter()
+            _functions.list_items(0, page)
+            build_ms = (_time.perf_counter() - build_ms) * 1_000
+            positions: List[int] = [_random.randrange(size) for _ in range(LOOKUPS)]
+            start = _time.perf_counter_ns()
+            pages: List[List[Any]] = [
+                _functions.list_items(p, page)[1] for p in positions
+            ]
+            page_us: float = (_time.perf_counter_ns() - start) / LOOKUPS / 1_000
+            terminal: _Terminal = _Terminal()
+            screen: Screen = Screen(terminal)
+            start = _time.perf_counter_ns()
+            for rows in pages:
+                screen.clear()
+                screen.add("\n".join(f"  {n:<32} {a:>16,.2f}  {c}" for n, a, c in rows))
+            draw_us: float = (_time.perf_counter_ns() - start) / LOOKUPS / 1_000
+            print(
+                f"{size:>10} {build_ms:>11.1f} {page_us:>10.1f} {draw_us:>10.1f}"
+                f" {len(terminal.getvalue()) / LOOKUPS:>11,.0f} {clear_us:>15.0f}"
+            )
+    finally:
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_export(sizes: List[int]) -> bool:
+    """
+    The function `bench_export` measures the rows per second of `export_file` across budget sizes:
+    unsorted, sorted by amount in memory, sorted with an external merge sort (a memory budget of a
+    tenth of the rows) and the 100 largest items. It fails if the external sort or the top-N do not
+    write the same file as the in-memory sort.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every export matched, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    output: str = _os.path.join(directory, "export")
+    ok: bool = True
+    stderr: Any = _sys.stderr
+
+    def rate(**options: Any) -> Tuple[float, bytes]:
+        _sys.stderr = _io.StringIO()
+        try:
+            start: float = _time.perf_counter()
+            export_file(output, "csv", **options)
+            elapsed: float = _time.perf_counter() - start
+        finally:
+            _sys.stderr = stderr
+        with open(output, "rb") as f:
+            return size / elapsed, f.read()
+
+    try:
+        print(
+            f"{'items':>10} {'unsorted':>12} {'sorted':>12} {'external':>12}"
+            f" {'top 100':>12}  (rows read/s)"
+        )
+        for size in sizes:
+            use_synthetic(directory, size)
+            plain, _ = rate()
+            memory, expected = rate(sort="amount", descending=True)
+            # About 100 bytes per row: the runs hold a tenth of the rows each.
+            external, written = rate(
+                sort="amount", descending=True, memory=max(size * 10, 1)
+            )
+            top, best = rate(top=100)
+            print(
+                f"{size:>10} {plain:>12,.0f} {memory:>12,.0f} {external:>12,.0f}"
+                f" {top:>12,.0f}"
+            )
+            if written != expected:
+                print(f"FAIL: the external sort of {size} items differs")
+                ok = False
+            if best.splitlines() != expected.splitlines()[:101]:
+                print(
+                    f"FAIL: the top 100 of {size} items differ from the sorted export"
+                )
+                ok = False
+    finally:
+        _shutil.rmtree(directory, ignore_errors=True)
+    return ok
+
+
+def bench_rules(sizes: List[int]) -> bool:
+    """
+    The function `bench_rules` spreads the items over `CATEGORIES` categories and adds a total cap,
+    a cap on every item, and a cap and a share rule per category. It then measures the latency of
+    `LOOKUPS` random edits without and with the rules, and the time a full rescan of the budget
+    takes, which is what checking the rules on each change would cost without running totals. The
+    edit latency should stay flat as the budget grows. It fails if the rules checked from the
+    running totals disagree with the rules checked from the saved budget.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    autosave, rules_file = var.autosave, const.RULES_FILE
+    var.autosave = False
+    ok: bool = True
+    try:
+        print(
+            f"{'items':>10} {'rules':>6} {'edit (us)':>10} {'with rules (us)':>16}"
+            f" {'rescan (ms)':>12}"
+        )
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            const.RULES_FILE = _os.path.join(directory, f"rules_{size}.json")
+            for i, name in enumerate(names):
+                _functions.edit(name, float(i), f"category-{i % CATEGORIES}")
+            _functions.save()
+            edit: float = __per_call_us(
+                lambda name: _functions.edit(name, _random.random() * size), names
+            )
+            _functions.add_rule("total", "", size * size / 4)
+            _functions.add_rule("item", "*", size * 0.9)
+            for c in range(CATEGORIES):
+                _functions.add_rule("category", f"category-{c}", size * size / 50)
+                _functions.add_rule("share", f"category-{c}", 100 / CATEGORIES + 1)
+            count: int = len(_functions.rules())
+            # The first edit loads the rules and computes their totals.
+            _functions.edit(names[0], 0.0)
+            checked: float = __per_call_us(
+                lambda name: _functions.edit(name, _random.random() * size), names
+            )
+            incremental: List[str] = _functions.check_rules()
+            _functions.reload()
+            start: int = _time.perf_counter_ns()
+            rescanned: List[str] = _functions.check_rules()
+            rescan: float = (_time.perf_counter_ns() - start) / 1e6
+            ok = ok and incremental == rescanned
+            print(
+                f"{size:>10} {count:>6} {edit:>10.2f} {checked:>16.2f} {rescan:>12.2f}"
+            )
+    finally:
+        var.autosave, const.RULES_FILE = autosave, rules_file
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: the rules checked from running totals do not match a full scan")
+    return ok
+
+
+def __compensated(amounts: Any) -> float:
+    "Adds up floats with Neumaier summation, as `RunningSum` did before amounts were integers."
+    total: float = 0.0
+    compensation: float = 0.0
+    for amount in amounts:
+        t: float = total + amount
+        if abs(total) >= abs(amount):
+            compensation += (total - t) + amount
+        else:
+            compensation += (amount - t) + total
+        total = t
+    return total + compensation
+
+
+def __sums(size: int) -> None:
+    """
+    The function `__sums` adds up `size` random amounts with two decimals in the ways compared by
+    `bench_amounts`, and prints the time and the error of each.
+
+    @param size The `size` parameter is the number of amounts.
+    """
+    getrandbits: Callable[[int], int] = _random.getrandbits
+    units: _array = _array("q", (getrandbits(27) for _ in range(size)))
+    amounts: _array = _array("d", map((100).__rtruediv__, units))
+    exact: int = sum(units)
+    print(f"Adding up {size:,} amounts (total {exact / 100:,.2f}):")
+    print(f"{'method':>28} {'time (ms)':>10} {'error':>10}")
+    methods: List[Tuple[str, Callable[[], float]]] = [
+        ("sum(array('d'))", lambda: sum(amounts)),
+        ("math.fsum(array('d'))", lambda: _math.fsum(amounts)),
+        ("compensated loop", lambda: __compensated(amounts)),
+        ("money.total(array('q'))", lambda: _money.total(units) / 100),
+        ("sum(array('q'))", lambda: sum(units) / 100),
+    ]
+    for name, f in methods:
+        start: int = _time.perf_counter_ns()
+        result: float = f()
+        elapsed: float = (_time.perf_counter_ns() - start) / 1e6
+        print(f"{name:>28} {elapsed:>10.1f} {result - exact / 100:>10.2g}")
+
+
+def bench_amounts(sizes: List[int]) -> bool:
+    """
+    The function `bench_amounts` adds up `SUM_SIZE` random amounts with two decimals, as floats in
+    an `array('d')` (`sum`, `math.fsum` and the compensated loop `RunningSum` used before) and as
+    integer minor units in an `array('q')` (`src.money.total`, with NumPy when it is installed, and
+    `sum`), reporting the time and the error of each against the exact total. It then converts
+    synthetic budgets with two-decimal amounts from the previous JSON format, with float amounts,
+    and fails if saving them in the current format and reading them back changed any amount.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to convert.
+
+    @return The function returns True if every conversion was lossless, otherwise False.
+    """
+    __sums(SUM_SIZE)
+    getrandbits: Callable[[int], int] = _random.getrandbits
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    storage, precision = var.storage, var.precision
+    var.storage, var.precision = "json", 2
+    ok: bool = True
+    try:
+        print(
+            f"{'items':>10} {'load v1 (ms)':>13} {'load v2 (ms)':>13} {'lossless':>9}"
+        )
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            expected: List[Tuple[str, float, str]] = [
+                (name, getrandbits(27) / 100, "") for name in names
+            ]
+            with open(const.JSON_FILE, "w") as f:
+                _json.dump([{"name": n, "amount": a} for n, a, _ in expected], f)
+            timings: List[float] = []
+            for _ in range(2):
+                start: int = _time.perf_counter_ns()
+                _functions.reload()
+                timings.append((_time.perf_counter_ns() - start) / 1e6)
+                lossless: bool = list(_functions.rows()) == expected
+                ok = ok and lossless
+                # Editing an item to its own amount rewrites the file in the current format.
+                _functions.edit(names[0], expected[0][1])
+            print(f"{size:>10} {timings[0]:>13.2f} {timings[1]:>13.2f} {lossless!s:>9}")
+    finally:
+        var.storage, var.precision = storage, precision
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: converting the budget to minor units changed some amounts")
+    return ok
+
+
+def __grouped(names: List[str]) -> Tuple[float, int, int]:
+    """
+    The function `__grouped` commits `THREAD_COMMITS` single-edit transactions from each of
+    `COMMIT_THREADS` threads at the same time.
+
+    @param names The `names` parameter is the list of names to edit.
+
+    @return The function returns the time taken in seconds, and the number of transactions
+    committed and of saves they took.
+    """
+    before: Tuple[int, int] = statistics()
+
+    def commit(thread: int) -> None:
+        for i in range(THREAD_COMMITS):
+            with Transaction() as transaction:
+                transaction.edit(names[(thread * THREAD_COMMITS + i) % len(names)], i)
+
+    threads: List[_threading.Thread] = [
+        _threading.Thread(target=commit, args=(t,)) for t in range(COMMIT_THREADS)
+    ]
+    start: float = _time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed: float = _time.perf_counter() - start
+    after: Tuple[int, int] = statistics()
+    return elapsed, after[0] - before[0], after[1] - before[1]
+
+
+def bench_transactions(sizes: List[int]) -> bool:
+    """
+    The function `bench_transactions` compares `MUTATIONS` edits saved one by one with a transaction
+    of `BULK_EDITS` edits saved at once, whose throughput should only be bounded by its single save,
+    then commits transactions from `COMMIT_THREADS` threads at once and reports how many saves they
+    were grouped into. It fails if a transaction rejected when committing changed the budget, if a
+    committed one is not found after reloading the budget, or if a grouped commit was lost.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+
+    @return The function returns True if every check passed, otherwise False.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    autosave: bool = var.autosave
+    ok: bool = True
+    try:
+        print(
+            f"{'items':>10} {'saved edits/s':>14} {'transaction edits/s':>20}"
+            f" {'commits':>8} {'saves':>6} {'commits/s':>10}"
+        )
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            var.autosave = True
+            single: float = __per_call_us(
+                lambda name: _functions.edit(name, 1.0), names, MUTATIONS
+            )
+            sample: List[str] = _random.choices(names, k=BULK_EDITS)
+            start: float = _time.perf_counter()
+            with Transaction() as transaction:
+                for i, name in enumerate(sample):
+                    transaction.edit(name, float(i))
+            bulk: float = BULK_EDITS / (_time.perf_counter() - start)
+            expected: List[Tuple[str, float, str]] = sorted(_functions.rows())
+
+            # Deleting an edited item once staged makes the commit check fail.
+            rejected: Transaction = Transaction()
+            for name in names[:MUTATIONS]:
+                rejected.edit(name, -1.0)
+            _functions.delete(names[MUTATIONS - 1])
+            expected = [row for row in expected if row[0] != names[MUTATIONS - 1]]
+            try:
+                rejected.commit()
+                ok = False
+            except ValueError:
+                pass
+            _functions.reload()
+            ok = ok and sorted(_functions.rows()) == expected
+
+            elapsed, commits, saves = __grouped(names[MUTATIONS:])
+            ok = ok and commits == COMMIT_THREADS * THREAD_COMMITS
+            print(
+                f"{size:>10} {1e6 / single:>14,.0f} {bulk:>20,.0f}"
+                f" {commits:>8} {saves:>6} {commits / elapsed:>10,.0f}"
+            )
+    finally:
+        var.autosave = autosave
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        print("FAIL: a transaction was not committed or rolled back as a whole")
+    return ok
+
+
+def bench_durability(sizes: List[int]) -> None:
+    """
+    The function `bench_durability` measures the latency of an edit saved by rewriting the JSON file
+    and of an edit appended to the journal, at every level of `var.durability`: "none" rewrites the
+    file in place, "flush" writes a temporary file renamed over it and "fsync" also syncs the file,
+    the directory and every journal append to the disk.
+
+    @param sizes The `sizes` parameter is the list of budget sizes to measure.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    durability, journal = var.durability, var.journal
+    try:
+        print(f"{'items':>10} {'durability':>10} {'save (ms)':>10} {'append (us)':>12}")
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            edit: Callable[[str], None] = lambda name: _functions.edit(name, 1.0)
+            for level in durable.LEVELS:
+                var.durability = level
+                var.journal = False
+                save: float = __per_call_us(edit, names, DURABLE_SAVES) / 1e3
+                var.journal = True
+                append: float = __per_call_us(edit, names, DURABLE_APPENDS)
+                print(f"{size:>10} {level:>10} {save:>10.2f} {append:>12.2f}")
+    finally:
+        var.durability, var.journal = durability, journal
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
+
+
+SCENARIOS: Dict[str, _Bench] = {
+    "index": bench_index,
+    "journal": bench_journal,
+    "storage": bench_storage,
+    "memory": bench_memory,
+    "logger": bench_logger,
+    "startup": bench_startup,
+    "find": bench_find,
+    "summary": bench_summary,
+    "categories": bench_categories,
+    "history": bench_history,
+    "undo": bench_undo,
+    "shards": bench_shards,
+    "snapshot": bench_snapshot,
+    "profile": bench_profile,
+    "screen": bench_screen,
+    "export": bench_export,
+    "rules": bench_rules,
+    "amounts": bench_amounts,
+    "transactions": bench_transactions,
+    "durability": bench_durability,
+    "faults": run_faults,
+}
+DESCRIPTIONS: Dict[str, str] = {
+    "index": "item_exists/search latency as the budget grows",
+    "journal": "edit latency with snapshot saves vs. the journal",
+    "storage": "open/search/edit latency of every storage backend",
+    "memory": "bytes per item of the JSON storage vs. a list of dicts",
+    "logger": "per-call overhead of logger.was_called",
+    "find": "name index build time and prefix/substring query latency",
+    "summary": "running totals vs. full recomputation (fails on mismatch)",
+    "categories": "per-category group-by from the index vs. a full scan",
+    "history": "month/date-range queries over the transaction history vs. a full scan",
+    "undo": "undo/redo latency and operation log memory per step",
+    "shards": "cold load and edit latency of the JSON storage split into shards",
+    "snapshot": "JSON load vs. memory-mapped binary snapshot open time and memory",
+    "profile": "lookup latency undecorated vs. timed with --profile off and on",
+    "screen": "List Items page latency and redraw cost vs. the clear command",
+    "export": "rows/s of unsorted, sorted, external-sorted and top-N exports (fails on mismatch)",
+    "rules": "edit latency with budget rules checked from running totals vs. a rescan",
+    "amounts": "exact integer sums of 10M amounts vs. float sums, and lossless conversion",
+    "transactions": "bulk edits in one transaction vs. one save per edit, and group commit",
+    "durability": "save and journal append latency at each durability level",
+    "faults": "damaged files and processes killed mid-save (fails if the budget is lost)",
+    "startup": "import time and side effects of 'import src' (fails over budget)",
+}
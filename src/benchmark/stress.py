@@ -0,0 +1,153 @@
+__all__ = ["run_stress"]
+
+import multiprocessing as _multiprocessing
+import os as _os
+import random as _random
+import shutil as _shutil
+import tempfile as _tempfile
+import time as _time
+from typing import Any, Dict, List, Tuple
+
+import src.const as const
+from src.logger import logger
+from src.selector_handler import functions as _functions
+from src.storage import Storage, open_storage
+from src.var import var
+
+# Number of items each worker plays with, so the same items are edited and deleted many times.
+ITEMS_PER_WORKER: int = 50
+
+_Expected = Dict[str, Tuple[float, str]]
+
+
+def __point_at(directory: str) -> None:
+    """
+    The function `__point_at` points the storage files at `directory`.
+
+    @param directory The `directory` parameter is the directory shared by the workers.
+    """
+    const.JSON_FILE = _os.path.join(directory, "budget.json")
+    const.JOURNAL_FILE = _os.path.join(directory, "budget.journal")
+    const.LOCK_FILE = _os.path.join(directory, "budget.lock")
+    const.SQLITE_FILE = _os.path.join(directory, "budget.sqlite3")
+    const.BINARY_FILE = _os.path.join(directory, "budget.bin")
+    const.HISTORY_FILE = _os.path.join(directory, "budget.history.jsonl")
+
+
+def _worker(
+    directory: str,
+    settings: Tuple[str, bool, int],
+    worker: int,
+    ops: int,
+    start: Any,
+    results: Any,
+) -> None:
+    """
+    The function `_worker` runs in its own process: once `start` is set it makes `ops` random
+    mutations on items only it uses, then puts the state they should be left in, and when it started
+    and finished, in `results`.
+
+    @param directory The `directory` parameter is the directory shared by the workers.
+    @param settings The `settings` parameter is the (storage, journal, batch) tuple to run with.
+    @param worker The `worker` parameter is the number of the worker.
+    @param ops The `ops` parameter is the number of mutations to make.
+    @param start The `start` parameter is the event that starts every worker at once.
+    @param results The `results` parameter is the queue to put the results in.
+    """
+    __point_at(directory)
+    var.storage, var.journal, batch = settings
+    var.autosave = batch <= 1
+    rng: _random.Random = _random.Random(worker)
+    names: List[str] = [f"w{worker:03d}-{i:03d}" for i in range(ITEMS_PER_WORKER)]
+    expected: _Expected = {}
+    _functions.reload()
+    start.wait()
+    began: float = _time.time()
+    for i in range(ops):
+        name: str = rng.choice(names)
+        amount: float = float(rng.randrange(1, 1_000_000))
+        if name not in expected:
+            category: str = f"c{rng.randrange(5)}"
+            _functions.register(name, amount, category)
+            expected[name] = (amount, category)
+        elif rng.random() < 0.2:
+            _functions.delete(name)
+            del expected[name]
+        else:
+            _functions.edit(name, amount)
+            expected[name] = (amount, expected[name][1])
+        if batch > 1 and (i + 1) % batch == 0:
+            _functions.save()
+    _functions.close()
+    results.put((worker, expected, began, _time.time()))
+
+
+def run_stress(processes: int, ops: int, batch: int) -> bool:
+    """
+    The function `run_stress` starts `processes` processes sharing one budget, each making `ops`
+    random mutations (registers, edits and deletes) on items of its own, then checks that the budget
+    holds exactly the items every process expects: an update lost to a concurrent write shows up as
+    a missing, extra or wrong item. It prints the aggregate throughput.
+
+    @param processes The `processes` parameter is the number of processes to start.
+    @param ops The `ops` parameter is the number of mutations made by each process.
+    @param batch The `batch` parameter is the number of mutations saved at once; 1 saves each one.
+
+    @return The function returns True if no update was lost, otherwise False.
+    """
+    logger.was_called(run_stress, processes, ops, batch)
+    directory: str = _tempfile.mkdtemp(prefix="budget-stress-")
+    settings: Tuple[str, bool, int] = (var.storage, var.journal, batch)
+    start: Any = _multiprocessing.Event()
+    results: Any = _multiprocessing.Queue()
+    workers: List[_multiprocessing.Process] = [
+        _multiprocessing.Process(
+            target=_worker, args=(directory, settings, i, ops, start, results)
+        )
+        for i in range(processes)
+    ]
+    try:
+        for process in workers:
+            process.start()
+        start.set()
+        finished: List[Tuple[int, _Expected, float, float]] = [
+            results.get() for _ in workers
+        ]
+        for process in workers:
+            process.join()
+        failed: List[int] = [p.exitcode for p in workers if p.exitcode]
+        if failed:
+            print(f"FAIL: {len(failed)} process(es) exited with an error")
+            return False
+
+        __point_at(directory)
+        storage: Storage = open_storage(var.storage)
+        budget: _Expected = {
+            name: (amount, category) for name, amount, category in storage.rows()
+        }
+        storage.close()
+        expected: _Expected = {}
+        for _, items, _, _ in finished:
+            expected.update(items)
+        lost: List[str] = sorted(
+            name
+            for name in expected.keys() | budget.keys()
+            if expected.get(name) != budget.get(name)
+        )
+        elapsed: float = max(f[3] for f in finished) - min(f[2] for f in finished)
+        total: int = processes * ops
+        print(
+            f"{processes} process(es) x {ops} ops ({var.storage}"
+            f"{', journal' if var.journal else ''}, batch {batch}): "
+            f"{total / elapsed:,.0f} ops/s aggregate, {len(budget)} items"
+        )
+        if lost:
+            print(f"FAIL: {len(lost)} item(s) lost an update, e.g. {lost[:5]}")
+            return False
+        return True
+    finally:
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+        _functions.close()
+        _shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,233 @@
+__all__ = ["run_suite", "save_results"]
+
+import json as _json
+import platform as _platform
+import random as _random
+import shutil as _shutil
+import tempfile as _tempfile
+import time as _time
+import tracemalloc as _tracemalloc
+from typing import Any, Callable, Dict, Iterator, List
+
+from src.functions import numeric_only
+import src.money as _money
+from src.logger import logger
+from src.selector_handler import functions as _functions
+from src.var import var
+from .synthetic import use_synthetic
+
+_Result = Dict[str, Any]
+# An operation is a factory returning the callables to time, one per sample.
+_Operation = Callable[[List[str], int], Iterator[Callable[[], Any]]]
+
+
+def __percentile(samples: List[int], p: float) -> float:
+    """
+    The function `__percentile` returns the `p` percentile of sorted samples (nearest rank).
+
+    @param samples The `samples` parameter is the sorted list of latencies, in nanoseconds.
+    @param p The `p` parameter is the percentile, between 0 and 100.
+
+    @return The function returns the percentile, in microseconds.
+    """
+    rank: int = min(len(samples) - 1, max(0, round(p / 100 * len(samples)) - 1))
+    return samples[rank] / 1_000
+
+
+def __measure(calls: Iterator[Callable[[], Any]], warmup: int, count: int) -> _Result:
+    """
+    The function `__measure` runs `warmup` calls untimed, then times `count` calls one by one.
+
+    @param calls The `calls` parameter is the iterator of callables to run.
+    @param warmup The `warmup` parameter is the number of untimed calls.
+    @param count The `count` parameter is the number of timed calls.
+
+    @return The function returns the latency percentiles (in microseconds) and the throughput.
+    """
+    for _ in range(warmup):
+        next(calls)()
+    samples: List[int] = []
+    clock: Callable[[], int] = _time.perf_counter_ns
+    for _ in range(count):
+        call: Callable[[], Any] = next(calls)
+        start: int = clock()
+        call()
+        samples.append(clock() - start)
+    samples.sort()
+    total: int = sum(samples)
+    return {
+        "samples": count,
+        "mean_us": total / count / 1_000,
+        "p50_us": __percentile(samples, 50),
+        "p90_us": __percentile(samples, 90),
+        "p99_us": __percentile(samples, 99),
+        "max_us": samples[-1] / 1_000,
+        "ops_per_s": count / (total / 1e9) if total else 0.0,
+    }
+
+
+def __register(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    i: int = 0
+    while True:
+        yield lambda i=i: _functions.register(f"bench-{size}-{i}", 1.0)
+        i += 1
+
+
+def __search(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    while True:
+        yield lambda name=_random.choice(names): _functions.search(name)
+
+
+def __edit(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    while True:
+        yield lambda name=_random.choice(names): _functions.edit(name, 2.0)
+
+
+def __delete(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    # Removes the items added by the register operation, so the budget keeps its size.
+    i: int = 0
+    while True:
+        yield lambda i=i: _functions.delete(f"bench-{size}-{i}")
+        i += 1
+
+
+def __load(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    while True:
+        yield _functions.reload
+
+
+def __save(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    def save() -> None:
+        _functions.edit(_random.choice(names), 3.0)
+        _functions.save()
+
+    while True:
+        yield save
+
+
+def __numeric_only(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    while True:
+        yield lambda s=f"${_random.random() * 1e6:,.2f}": numeric_only(s, _money.amount)
+
+
+def __log(names: List[str], size: int) -> Iterator[Callable[[], Any]]:
+    while True:
+        yield lambda: logger.was_called(__log, "groceries", 120.5)
+
+
+# Operations timed per call, and operations whose cost grows with the budget (timed fewer times).
+__fast: Dict[str, _Operation] = {
+    "register": __register,
+    "search": __search,
+    "edit": __edit,
+    "delete": __delete,
+    "numeric_only": __numeric_only,
+    "logger": __log,
+}
+__slow: Dict[str, _Operation] = {
+    "load": __load,
+    "save": __save,
+}
+
+
+def __peak_load_bytes() -> int:
+    """
+    The function `__peak_load_bytes` reloads the budget with `tracemalloc` enabled.
+
+    @return The function returns the peak memory allocated while loading, in bytes.
+    """
+    _tracemalloc.start()
+    try:
+        _functions.reload()
+        return _tracemalloc.get_traced_memory()[1]
+    finally:
+        _tracemalloc.stop()
+
+
+def __max_rss_bytes() -> int | None:
+    """
+    The function `__max_rss_bytes` returns the peak resident set size of the process.
+
+    @return The function returns the peak RSS in bytes, or None where `resource` is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if _platform.system() == "Darwin" else rss * 1024
+
+
+def run_suite(
+    sizes: List[int], ops: int, repeat: int, warmup: int, operations: List[str]
+) -> _Result:
+    """
+    The function `run_suite` runs the core budget operations against synthetic budgets of every size.
+    Mutations are kept in memory (`var.autosave` disabled) so their latency is not dominated by the
+    save, which is measured on its own as the "save" operation, together with "load".
+
+    @param sizes The `sizes` parameter is the list of budget sizes to generate.
+    @param ops The `ops` parameter is the number of timed calls of each per-call operation.
+    @param repeat The `repeat` parameter is the number of timed loads and saves.
+    @param warmup The `warmup` parameter is the number of untimed calls made before timing.
+    @param operations The `operations` parameter is the list of operations to run (empty for all).
+
+    @return The function returns the results, ready to be saved as JSON.
+    """
+    directory: str = _tempfile.mkdtemp(prefix="budget-bench-")
+    autosave: bool = var.autosave
+    selected: List[str] = operations or [*__fast, *__slow]
+    results: List[_Result] = []
+    memory: List[_Result] = []
+    try:
+        for size in sizes:
+            names: List[str] = use_synthetic(directory, size)
+            var.autosave = False
+            for name in selected:
+                fast: bool = name in __fast
+                operation: _Operation = (__fast if fast else __slow)[name]
+                result: _Result = __measure(
+                    operation(names, size),
+                    warmup if fast else min(warmup, 1),
+                    ops if fast else repeat,
+                )
+                results.append({"op": name, "size": size, **result})
+                print(
+                    f"{name:>13} {size:>9} {result['p50_us']:>11.2f}"
+                    f" {result['p99_us']:>11.2f} {result['ops_per_s']:>13,.0f}"
+                )
+            _functions.save()
+            var.autosave = autosave
+            memory.append(
+                {
+                    "size": size,
+                    "peak_load_bytes": __peak_load_bytes(),
+                    "max_rss_bytes": __max_rss_bytes(),
+                }
+            )
+    finally:
+        var.autosave = autosave
+        _shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "meta": {
+            "created": _time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": _platform.python_version(),
+            "platform": _platform.platform(),
+            "storage": var.storage,
+            "journal": var.journal,
+            "sizes": sizes,
+        },
+        "results": results,
+        "memory": memory,
+    }
+
+
+def save_results(results: _Result, path: str) -> None:
+    """
+    The function `save_results` writes the results of `run_suite` as JSON.
+
+    @param results The `results` parameter is the dictionary returned by `run_suite`.
+    @param path The `path` parameter is the file to write.
+    """
+    with open(path, "w") as f:
+        _json.dump(results, f, indent=2)
@@ -0,0 +1,52 @@
+__all__ = ["synthetic_names", "use_synthetic"]
+
+import json as _json
+import os as _os
+from typing import List
+
+import src.const as const
+from src.selector_handler import functions as _functions
+from src.storage import migrate
+from src.var import var
+
+
+def synthetic_names(size: int) -> List[str]:
+    """
+    The function `synthetic_names` generates deterministic item names for a synthetic budget.
+
+    @param size The `size` parameter is the number of names to generate.
+
+    @return The function returns a list of unique item names.
+    """
+    return [f"item-{i:08d}" for i in range(size)]
+
+
+def use_synthetic(directory: str, size: int) -> List[str]:
+    """
+    The function `use_synthetic` writes a synthetic budget of `size` items into `directory`, points
+    `const.JSON_FILE` at it and reloads the store so the benchmark never touches the real budget.
+
+    @param directory The `directory` parameter is the temporary directory that holds the budget.
+    @param size The `size` parameter is the number of items to generate.
+
+    @return The function returns the names of the generated items.
+    """
+    names: List[str] = synthetic_names(size)
+    # Flush the previous budget to its own files before pointing `const` at the new ones.
+    _functions.close()
+    const.JSON_FILE = _os.path.join(directory, f"budget_{size}.json")
+    const.JOURNAL_FILE = _os.path.join(directory, f"budget_{size}.journal")
+    const.LOCK_FILE = _os.path.join(directory, f"budget_{size}.lock")
+    const.SQLITE_FILE = _os.path.join(directory, f"budget_{size}.sqlite3")
+    const.BINARY_FILE = _os.path.join(directory, f"budget_{size}.bin")
+    const.HISTORY_FILE = _os.path.join(directory, f"budget_{size}.history.jsonl")
+    with open(const.JSON_FILE, "w") as f:
+        _json.dump(
+            [{"name": n, "amount": float(i)} for i, n in enumerate(names)],
+            f,
+            separators=(",", ":"),
+        )
+    if var.storage != "json":
+        migrate("json", var.storage)
+    _functions.reload()
+    return names
@@ -0,0 +1,86 @@
+__all__ = ["CategoryIndex"]
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+from src.logger import logger as logger
+from src.aggregates import RunningSum
+
+_Row = Tuple[str, float, str]
+_Group = Tuple[str, int, float]
+
+
+class CategoryIndex:
+    """
+    The class `CategoryIndex` is a secondary index from each category to the names of its items,
+    with the sum of their amounts kept alongside. Group-by queries therefore take time proportional
+    to the number of categories, not to the number of items. Items without a category are grouped
+    under the empty category.
+    """
+
+    def __init__(self, rows: Iterable[_Row]):
+        """
+        Indexes the given items.
+
+        @param rows The `rows` parameter is an iterable of (name, amount, category) tuples.
+        """
+        logger.was_called(CategoryIndex)
+        self.__members: Dict[str, Set[str]] = {}
+        self.__totals: Dict[str, RunningSum] = {}
+        for name, amount, category in rows:
+            self.add(name, amount, category)
+
+    def add(self, name: str, amount: float, category: str) -> None:
+        """
+        Adds an item to its category.
+
+        @param name The `name` parameter is the name of the item.
+        @param amount The `amount` parameter is the amount of the item.
+        @param category The `category` parameter is the category of the item.
+        """
+        members: Set[str] | None = self.__members.get(category)
+        if members is None:
+            members = self.__members[category] = set()
+            self.__totals[category] = RunningSum()
+        members.add(name)
+        self.__totals[category].add(amount)
+
+    def remove(self, name: str, amount: float, category: str) -> None:
+        """
+        Removes an item from its category, dropping the category once it is empty.
+
+        @param name The `name` parameter is the name of the item.
+        @param amount The `amount` parameter is the amount the item had.
+        @param category The `category` parameter is the category the item had.
+        """
+        members: Set[str] | None = self.__members.get(category)
+        if members is None or name not in members:
+            return
+        members.discard(name)
+        if not members:
+            del self.__members[category], self.__totals[category]
+            return
+        self.__totals[category].add(-amount)
+
+    def groups(self) -> List[_Group]:
+        """
+        Returns the number of items and the total amount of every category.
+
+        @return A list of (category, count, total) tuples, sorted by category.
+        """
+        return [
+            (category, len(self.__members[category]), self.__totals[category].value)
+            for category in sorted(self.__members)
+        ]
+
+    def members(self, category: str) -> List[str]:
+        """
+        Returns the names of the items of a category.
+
+        @param category The `category` parameter is the category to look up.
+
+        @return The sorted list of item names, empty if the category does not exist.
+        """
+        return sorted(self.__members.get(category, ()))
+
+    def __len__(self) -> int:
+        return len(self.__members)
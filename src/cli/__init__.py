@@ -0,0 +1,554 @@
+__all__ = ["command"]
+
+import argparse as _argparse
+import importlib as _importlib
+import sys as _sys
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import src.const as const
+from src.var import var
+from src.logger import LEVELS, logger as logger
+from src.messages import *
+from src.storage import STORAGES, migrate, reshard
+from src.stats import load, report, reset, start
+from src.selector_handler.functions import (
+    categories,
+    category_items,
+    history,
+    rollups,
+    undo,
+    redo,
+    summary,
+    verify_summary,
+    rules,
+    add_rule,
+    remove_rule,
+    check_rules,
+)
+from src.rules import KINDS
+import src.durable as _durable
+
+
+def __run(args: _argparse.Namespace) -> int:
+    # Imported here so that other commands do not pay for importing it.
+    from src.batch import run
+
+    try:
+        return run(args.script, args.atomic)
+    except OSError as e:
+        print(e, file=_sys.stderr)
+        return 2
+
+
+def __import(args: _argparse.Namespace) -> int:
+    # Imported here so that other commands do not pay for importing it.
+    from src.importer import import_file
+
+    try:
+        import_file(
+            args.file,
+            args.format,
+            args.chunk_size,
+            args.name_column,
+            args.amount_column,
+            args.category_column,
+        )
+    except (OSError, ValueError) as e:
+        print(e, file=_sys.stderr)
+        return 2
+    return 0
+
+
+def __export(args: _argparse.Namespace) -> int:
+    # Imported here so that other commands do not pay for importing it.
+    from src.exporter import export_file
+
+    try:
+        export_file(
+            args.file,
+            args.format,
+            args.sort,
+            args.descending,
+            args.top,
+            args.memory_mb * 1024 * 1024 if args.memory_mb else None,
+        )
+    except (OSError, ValueError) as e:
+        print(e, file=_sys.stderr)
+        return 2
+    return 0
+
+
+def __migrate(args: _argparse.Namespace) -> int:
+    if args.target == var.storage:
+        print(PRT_INIT_MIGRATE_SAME_STORAGE(args.target), file=_sys.stderr)
+        return 2
+    count: int = migrate(var.storage, args.target)
+    print(PRT_INIT_MIGRATE_MIGRATED_SUCCESSFULLY((count, args.target)))
+    return 0
+
+
+def __reshard(args: _argparse.Namespace) -> int:
+    if var.storage != "json":
+        print(PRT_INIT_RESHARD_JSON_ONLY(var.storage), file=_sys.stderr)
+        return 2
+    try:
+        count: int = reshard(args.shards)
+    except (OSError, ValueError) as e:
+        print(e, file=_sys.stderr)
+        return 2
+    print(PRT_INIT_RESHARD_RESHARDED((count, max(args.shards, 1))))
+    return 0
+
+
+def __summary(args: _argparse.Namespace) -> int:
+    totals: Dict[str, Any] = summary(args.top)
+    print(PRT_INIT_SUMMARY(totals) if totals["count"] else PRT_INIT_SUMMARY_EMPTY)
+    if not args.verify:
+        return 0
+    mismatches: List[str] = verify_summary(args.top)
+    if mismatches:
+        print(PRT_INIT_SUMMARY_MISMATCH(mismatches), file=_sys.stderr)
+        return 1
+    print(PRT_INIT_SUMMARY_VERIFIED)
+    return 0
+
+
+def __categories(args: _argparse.Namespace) -> int:
+    if args.category is None:
+        groups: List[Tuple[str, int, float]] = categories()
+        print(PRT_INIT_CATEGORIES(len(groups)))
+        for group in groups:
+            print(PRT_INIT_CATEGORY(group))
+        return 0
+    items: List[Tuple[str, float]] = category_items(args.category)
+    if not items:
+        print(PRT_INIT_CATEGORY_NOT_FOUND(args.category), file=_sys.stderr)
+        return 1
+    print(PRT_INIT_CATEGORY_ITEMS(args.category))
+    for item in items:
+        print(PRT_INIT_SEARCH_RESULT(item))
+    return 0
+
+
+def __history(args: _argparse.Namespace) -> int:
+    if args.period is None:
+        periods: List[Tuple[str, int, float]] = rollups(args.weekly)
+        if not periods:
+            print(PRT_INIT_HISTORY_EMPTY)
+            return 0
+        print(PRT_INIT_HISTORY_ROLLUPS("week" if args.weekly else "month"))
+        for period in periods:
+            print(PRT_INIT_HISTORY_ROLLUP(period))
+        return 0
+    try:
+        count, change, transactions = history(args.period, args.limit)
+    except ValueError:
+        print(PRT_INIT_HISTORY_INVALID_PERIOD(args.period), file=_sys.stderr)
+        return 2
+    print(PRT_INIT_HISTORY_PERIOD((args.period, count, change)))
+    for transaction in transactions:
+        print(PRT_INIT_HISTORY_TRANSACTION(transaction))
+    return 0
+
+
+def __undo(args: _argparse.Namespace) -> int:
+    step: Callable[[], bool] = redo if args.command == "redo" else undo
+    for _ in range(max(args.steps, 1)):
+        if not step():
+            print(var.extra_message, file=_sys.stderr)
+            return 1
+        print(var.extra_message)
+    return 0
+
+
+def __stats(args: _argparse.Namespace) -> int:
+    if args.reset:
+        reset()
+        print(PRT_INIT_STATS_RESET)
+        return 0
+    try:
+        rows: List[Tuple[Any, ...]] = report(load())
+    except (OSError, ValueError) as e:
+        print(e, file=_sys.stderr)
+        return 2
+    print(PRT_INIT_STATS(rows) if rows else PRT_INIT_STATS_EMPTY)
+    return 0
+
+
+def __rules(args: _argparse.Namespace) -> int:
+    if args.action == "add":
+        try:
+            number: int = add_rule(
+                args.kind, " ".join(args.values[:-1]), float(args.values[-1])
+            )
+        except ValueError as e:
+            print(e, file=_sys.stderr)
+            return 2
+        print(PRT_INIT_RULES_ADDED(number))
+        return 0
+    if args.action == "remove":
+        if not remove_rule(args.number):
+            print(PRT_INIT_RULES_NOT_FOUND(args.number), file=_sys.stderr)
+            return 1
+        print(PRT_INIT_RULES_REMOVED(args.number))
+        return 0
+    if args.action == "check":
+        warnings: List[str] = check_rules()
+        for warning in warnings:
+            print(warning)
+        if not warnings:
+            print(PRT_INIT_RULES_RESPECTED)
+        return 1 if warnings else 0
+    saved: List[Tuple[str, str, float]] = rules()
+    if not saved:
+        print(PRT_INIT_RULES_EMPTY)
+        return 0
+    print(PRT_INIT_RULES(len(saved)))
+    for number, rule in enumerate(saved, 1):
+        print(PRT_INIT_RULES_RULE((number, *rule)))
+    return 0
+
+
+def __serve(args: _argparse.Namespace) -> int:
+    # Imported here so that other commands do not pay for importing asyncio.
+    from src.server import serve
+
+    try:
+        return serve(args.host, args.port)
+    except OSError as e:
+        print(e, file=_sys.stderr)
+        return 2
+
+
+class _Choices:
+    """
+    The class `_Choices` holds the choices of an option, read from an attribute of a module that is
+    only imported when `argparse` checks a value given to the option or prints the choices, so
+    building the parser does not import the module of every command. Options using it need a
+    `metavar`, as `argparse` otherwise lists the choices when the option is added.
+    """
+
+    def __init__(self, module: str, attribute: str) -> None:
+        self.__module: str = module
+        self.__attribute: str = attribute
+
+    def __choices(self) -> List[str]:
+        "Imports the module and returns the choices."
+        module: Any = _importlib.import_module(self.__module)
+        return list(getattr(module, self.__attribute))
+
+    def __contains__(self, value: object) -> bool:
+        return value in self.__choices()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__choices())
+
+
+def __parser() -> _argparse.ArgumentParser:
+    """
+    The function `__parser` builds the parser for the non-interactive commands of `main.py`.
+
+    @return The function returns the argument parser.
+    """
+
+    parser = _argparse.ArgumentParser(
+        prog="main.py",
+        description="Budget Tracker CLI. Run without a command for the interactive menu.",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=list(STORAGES),
+        default=var.storage,
+        help=f"storage backend (default: {var.storage})",
+    )
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        default=var.journal,
+        help="append changes to a journal instead of rewriting the JSON file",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=list(_durable.LEVELS),
+        default=var.durability,
+        help="how saves survive crashes: none rewrites files in place, flush writes them to a"
+        " temporary file renamed over the old one, fsync also syncs them to the disk"
+        f" (default: {var.durability})",
+    )
+    parser.add_argument(
+        "--verify-snapshot",
+        action="store_true",
+        default=var.snapshot_verify,
+        help="check the checksum of the whole binary snapshot when opening it, not only its"
+        " header and size",
+    )
+    parser.add_argument(
+        "--precision",
+        type=int,
+        choices=range(10),
+        metavar="{0..9}",
+        default=var.precision,
+        help="decimal digits amounts are kept with, as exact integers (default:"
+        f" {var.precision}); a budget saved with another precision is converted",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=LEVELS,
+        type=str.upper,
+        help="minimum level written to the log file (default: $BUDGET_LOG_LEVEL or"
+        " INFO); DEBUG traces every function call",
+    )
+    parser.add_argument(
+        "--undo-depth",
+        type=int,
+        default=var.undo_depth,
+        help=f"number of changes that can be undone (default: {var.undo_depth})",
+    )
+    parser.add_argument(
+        "--persist-undo",
+        action="store_true",
+        default=var.undo_persist,
+        help="keep the changes that can be undone across sessions",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time the operations, storage and I/O calls and print a report at exit",
+    )
+    parser.add_argument(
+        "--pstats",
+        metavar="FILE",
+        default="",
+        help="with --profile, also run cProfile and dump its statistics to FILE",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser(
+        "run", help="execute register/search/edit/delete commands from a script"
+    )
+    run.add_argument(
+        "script", nargs="?", default="-", help="command script, or '-' for stdin"
+    )
+    run.add_argument(
+        "--atomic",
+        action="store_true",
+        help="apply the register/edit/delete commands of the script as one transaction,"
+        " changing nothing if any of them fails",
+    )
+    run.set_defaults(f=__run)
+
+    imp = commands.add_parser(
+        "import", help="stream items from a CSV or JSON Lines file into the budget"
+    )
+    imp.add_argument("file", help="file to import")
+    imp.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        default="",
+        help="file format (default: taken from the file extension)",
+    )
+    imp.add_argument(
+        "--chunk-size",
+        type=int,
+        default=var.import_chunk,
+        help=f"items per chunk and progress report (default: {var.import_chunk})",
+    )
+    imp.add_argument("--name-column", default="name", help="column/key of the name")
+    imp.add_argument(
+        "--amount-column", default="amount", help="column/key of the amount"
+    )
+    imp.add_argument(
+        "--category-column",
+        default="category",
+        help="column/key of the optional category",
+    )
+    imp.set_defaults(f=__import)
+
+    exp = commands.add_parser(
+        "export", help="stream the budget to a CSV, JSON Lines or JSON file"
+    )
+    exp.add_argument("file", help="file to write, or '-' for stdout")
+    exp.add_argument(
+        "--format",
+        choices=_Choices("src.exporter", "FORMATS"),
+        metavar="FORMAT",
+        default="",
+        help="file format: csv, jsonl or json (default: taken from the file extension, csv for"
+        " stdout)",
+    )
+    exp.add_argument(
+        "--sort",
+        choices=_Choices("src.exporter", "KEYS"),
+        metavar="KEY",
+        default="",
+        help="sort the items by this key: name or amount",
+    )
+    exp.add_argument(
+        "--descending", action="store_true", help="sort in descending order"
+    )
+    exp.add_argument(
+        "--top",
+        type=int,
+        default=0,
+        help="only export the first N items of the sort order (by default the N largest)",
+    )
+    exp.add_argument(
+        "--memory-mb",
+        type=int,
+        default=0,
+        help="megabytes of items sorted in memory before spilling sorted runs to"
+        f" disk (default: {var.export_memory // (1024 * 1024)})",
+    )
+    exp.set_defaults(f=__export)
+
+    mig = commands.add_parser(
+        "migrate", help="copy every item from the --storage backend into another one"
+    )
+    mig.add_argument("target", choices=list(STORAGES), help="backend to migrate to")
+    mig.set_defaults(f=__migrate)
+
+    shard = commands.add_parser(
+        "reshard",
+        help="split the JSON budget into shard files loaded in parallel, or merge them",
+    )
+    shard.add_argument(
+        "shards", type=int, help="number of shards (1 for a single JSON file)"
+    )
+    shard.set_defaults(f=__reshard)
+
+    summ = commands.add_parser(
+        "summary", help="show the number of items, total, mean and largest items"
+    )
+    summ.add_argument(
+        "--top",
+        type=int,
+        default=var.summary_top,
+        help=f"number of largest items listed (default: {var.summary_top})",
+    )
+    summ.add_argument(
+        "--verify",
+        action="store_true",
+        help="recompute the summary from every item and check it matches",
+    )
+    summ.set_defaults(f=__summary)
+
+    cat = commands.add_parser(
+        "categories", help="show the item count and total of every category"
+    )
+    cat.add_argument(
+        "category", nargs="?", help="list the items of this category instead"
+    )
+    cat.set_defaults(f=__categories)
+
+    hist = commands.add_parser(
+        "history", help="show the transactions of a period, or the totals per month"
+    )
+    hist.add_argument(
+        "period",
+        nargs="?",
+        help="YYYY, YYYY-MM, YYYY-Www, YYYY-MM-DD or a FROM..TO range of them",
+    )
+    hist.add_argument(
+        "--weekly", action="store_true", help="show the totals per ISO week"
+    )
+    hist.add_argument(
+        "--limit",
+        type=int,
+        default=var.search_page_size,
+        help=f"number of latest transactions listed (default: {var.search_page_size})",
+    )
+    hist.set_defaults(f=__history)
+
+    rule = commands.add_parser(
+        "rules",
+        help="list, add or remove the budget rules checked by every change",
+    )
+    rule.set_defaults(f=__rules, action="list")
+    actions = rule.add_subparsers(dest="action")
+    actions.add_parser("list", help="list the rules (default)")
+    add = actions.add_parser(
+        "add",
+        help="add a rule, e.g. 'total 5000', 'item rent 1200', 'category food 400' or"
+        " 'share food 30'",
+    )
+    add.add_argument("kind", choices=list(KINDS), help="kind of rule")
+    add.add_argument(
+        "values",
+        nargs="+",
+        metavar="[TARGET] LIMIT",
+        help="the item or category ('*' for all of them), then the largest amount, or"
+        " percentage of the total for 'share'",
+    )
+    remove = actions.add_parser("remove", help="remove a rule")
+    remove.add_argument("number", type=int, help="number of the rule, as listed")
+    actions.add_parser(
+        "check", help="check every rule against the whole budget (exit 1 if exceeded)"
+    )
+
+    srv = commands.add_parser(
+        "serve", help="keep the budget loaded and answer JSON requests over TCP"
+    )
+    srv.add_argument(
+        "--host",
+        default=const.SERVER_HOST,
+        help=f"address to listen on (default: {const.SERVER_HOST})",
+    )
+    srv.add_argument(
+        "--port",
+        type=int,
+        default=const.SERVER_PORT,
+        help=f"port to listen on, 0 for any free port (default: {const.SERVER_PORT})",
+    )
+    srv.set_defaults(f=__serve)
+
+    stat = commands.add_parser(
+        "stats", help="show the calls recorded by the runs made with --profile"
+    )
+    stat.add_argument(
+        "--reset", action="store_true", help="forget the recorded calls instead"
+    )
+    stat.set_defaults(f=__stats)
+
+    for name, verb in (
+        ("undo", "undo the latest changes"),
+        ("redo", "redo undone changes"),
+    ):
+        step = commands.add_parser(
+            name, help=f"{verb} saved by a previous --persist-undo session"
+        )
+        step.add_argument(
+            "steps", type=int, nargs="?", default=1, help="number of changes"
+        )
+        step.set_defaults(f=__undo)
+
+    return parser
+
+
+def command(argv: List[str], interactive: Callable[[], int]) -> int:
+    """
+    The function `command` parses the command line arguments, applies the global options to `var` and
+    runs the selected command, or the interactive menu if no command was given. With `--profile`,
+    the caller must call `src.stats.stop` once the storage is closed.
+
+    @param argv The `argv` parameter is the list of command line arguments, without the program name.
+    @param interactive The `interactive` parameter is the function running the interactive menu.
+
+    @return The function returns the exit status of the command.
+    """
+    logger.was_called(command, *argv)
+    args: _argparse.Namespace = __parser().parse_args(argv)
+    var.storage = args.storage
+    var.journal = args.journal
+    var.precision = args.precision
+    var.durability = args.durability
+    var.snapshot_verify = args.verify_snapshot
+    var.undo_depth = args.undo_depth
+    # Undoing from the command line only makes sense with the steps of a previous session.
+    var.undo_persist = args.persist_undo or args.command in ("undo", "redo")
+    if args.log_level:
+        logger.set_level(args.log_level)
+    if args.profile or args.pstats:
+        start(args.pstats)
+    if args.command is None:
+        return interactive()
+    return args.f(args)
@@ -2,16 +2,26 @@ __all__ = [
     "ABSOLUTE_PATH",
     "JSON_PATH",
     "JSON_FILE",
+    "JOURNAL_FILE",
+    "LOCK_FILE",
+    "SQLITE_FILE",
+    "BINARY_FILE",
+    "HISTORY_FILE",
+    "UNDO_FILE",
+    "STATS_FILE",
+    "RULES_FILE",
     "LOGGER_PATH",
     "LOGGER_FILE",
     "SHARED_FILE",
+    "SERVER_HOST",
+    "SERVER_PORT",
+    "ensure_parent",
 ]
 
 import os as os
 import sys as sys
-from typing import List, Any
-from pathlib import Path
-from datetime import datetime as dt
+import time as time
+from typing import List, Any, Set
 
 
 def __mkdirs(*paths: str) -> List[Any]:
@@ -25,6 +35,8 @@ def __mkdirs(*paths: str) -> List[Any]:
     @return The function `__mkdirs` returns a list of absolute paths that have been created.
     If no directories were created, an empty list is returned.
     """
+    from pathlib import Path
+
     absolute_paths: List[Any] = []
     for p in paths:
         absolute_path: str = str(Path(p).resolve())
@@ -37,13 +49,36 @@ def __mkdirs(*paths: str) -> List[Any]:
 ABSOLUTE_PATH: str = os.path.abspath(os.path.dirname(sys.argv[0])).replace("\\", "/")
 JSON_PATH: str = f"{ABSOLUTE_PATH}/json"
 JSON_FILE: str = f"{JSON_PATH}/budget_data.json"
+JOURNAL_FILE: str = f"{JSON_PATH}/budget_data.journal"
+LOCK_FILE: str = f"{JSON_PATH}/budget_data.lock"
+SQLITE_FILE: str = f"{JSON_PATH}/budget_data.sqlite3"
+BINARY_FILE: str = f"{JSON_PATH}/budget_data.bin"
+HISTORY_FILE: str = f"{JSON_PATH}/budget_history.jsonl"
+UNDO_FILE: str = f"{JSON_PATH}/budget_undo.json"
+STATS_FILE: str = f"{JSON_PATH}/budget_stats.json"
+RULES_FILE: str = f"{JSON_PATH}/budget_rules.json"
 LOGGER_PATH: str = f"{ABSOLUTE_PATH}/log"
-LOGGER_FILE: str = f"{LOGGER_PATH}/{dt.now().strftime('%Y-%m-%d-%H-%M-%S')}.log"
+LOGGER_FILE: str = f"{LOGGER_PATH}/{time.strftime('%Y-%m-%d-%H-%M-%S')}.log"
 SHARED_FILE: str = f"{ABSOLUTE_PATH}/src/bin/random64" + (
     ".dll" if os.name == "nt" else ".so"
 )
+SERVER_HOST: str = "127.0.0.1"
+SERVER_PORT: int = 8765
 
-__mkdirs(
-    JSON_PATH,
-    LOGGER_PATH,
-)
+__created: Set[str] = set()
+
+
+def ensure_parent(file: str) -> str:
+    """
+    The function `ensure_parent` creates the directory holding `file` the first time a file in it is
+    needed, so importing the package does not touch the disk.
+
+    @param file The `file` parameter is the path of a file about to be opened.
+
+    @return The function `ensure_parent` returns `file` unchanged.
+    """
+    directory: str = os.path.dirname(file)
+    if directory not in __created:
+        __mkdirs(directory)
+        __created.add(directory)
+    return file
@@ -0,0 +1,103 @@
+__all__ = ["LEVELS", "BACKUP_SUFFIX", "replace", "remove", "sync", "sync_directory"]
+
+import contextlib as _contextlib
+import os as _os
+from typing import IO, Dict, Iterator
+
+import src.const as const
+from src.var import var
+from src.logger import logger as logger
+
+# Durability levels of `var.durability`, and what a save guarantees at each of them.
+LEVELS: Dict[str, str] = {
+    "none": "files are rewritten in place; a crash mid-save falls back to the backup, losing"
+    " the save",
+    "flush": "files are written to a temporary file renamed over the old one; survives a crash"
+    " of the process",
+    "fsync": "like flush, and every write is fsynced, with the directory after a rename;"
+    " survives a crash of the operating system or a power loss",
+}
+# Suffix of the previous version of a file, kept by `replace` to fall back to.
+BACKUP_SUFFIX: str = ".bak"
+
+
+def sync(f: IO[bytes] | IO[str]) -> None:
+    """
+    The function `sync` makes what was written to `f` as durable as `var.durability` requires: it
+    is handed to the operating system, so other processes see it, and with "fsync" written to the
+    disk.
+
+    @param f The `f` parameter is the open file.
+    """
+    f.flush()
+    if var.durability == "fsync":
+        _os.fsync(f.fileno())
+
+
+def sync_directory(path: str) -> None:
+    """
+    The function `sync_directory` writes the entries of the directory holding `path` to the disk
+    with "fsync" durability, so that a file renamed into it survives a power loss. It does nothing
+    where directories cannot be opened, e.g. on Windows.
+
+    @param path The `path` parameter is the path of a file in the directory.
+    """
+    if var.durability != "fsync" or not hasattr(_os, "O_DIRECTORY"):
+        return
+    descriptor: int = _os.open(
+        _os.path.dirname(_os.path.abspath(path)), _os.O_RDONLY | _os.O_DIRECTORY
+    )
+    try:
+        _os.fsync(descriptor)
+    finally:
+        _os.close(descriptor)
+
+
+@_contextlib.contextmanager
+def replace(path: str, backup: bool = True) -> Iterator[IO[bytes]]:
+    """
+    The function `replace` opens a file to be rewritten as a whole, in binary mode. With "flush" and
+    "fsync" durability, the new contents are written to `path` + ".tmp", which is only renamed over
+    `path` once it is complete, so `path` always holds a complete version. With "none", `path` is
+    written in place. Either way, the previous version is kept as `path` + `BACKUP_SUFFIX` unless
+    `backup` is False. If writing fails, the previous version is left as it was.
+
+    @param path The `path` parameter is the path of the file.
+    @param backup The `backup` parameter tells whether to keep the previous version.
+
+    @return The function returns a context manager yielding the file to write to.
+    """
+    logger.was_called(replace, path)
+    const.ensure_parent(path)
+    in_place: bool = var.durability == "none"
+    temporary: str = path if in_place else f"{path}.tmp"
+    existed: bool = _os.path.exists(path)
+    moved: bool = in_place and backup and existed
+    if moved:
+        _os.replace(path, path + BACKUP_SUFFIX)
+    try:
+        with open(temporary, "wb") as f:
+            yield f
+            sync(f)
+    except BaseException:
+        if moved:
+            _os.replace(path + BACKUP_SUFFIX, path)
+        elif (not in_place or not existed) and _os.path.exists(temporary):
+            _os.remove(temporary)
+        raise
+    if not in_place:
+        if backup and existed:
+            _os.replace(path, path + BACKUP_SUFFIX)
+        _os.replace(temporary, path)
+    sync_directory(path)
+
+
+def remove(path: str) -> None:
+    """
+    The function `remove` deletes a file written by `replace` and its backup, if they exist.
+
+    @param path The `path` parameter is the path of the file.
+    """
+    for file in (path, path + BACKUP_SUFFIX):
+        if _os.path.exists(file):
+            _os.remove(file)
@@ -0,0 +1,302 @@
+__all__ = ["FORMATS", "KEYS", "export_file"]
+
+import csv as _csv
+import heapq as _heapq
+import itertools as _itertools
+import json as _json
+import marshal as _marshal
+import os as _os
+import sys as _sys
+import time as _time
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from src.var import var
+from src.logger import logger as logger
+from src.messages import *
+from src.selector_handler.functions import rows as _rows
+
+_Row = Tuple[str, float, str]
+_Writer = Callable[[IO[str], Iterable[_Row]], int]
+_Key = Callable[[_Row], Any]
+
+# Sort keys of `export_file`.
+KEYS: Dict[str, _Key] = {
+    "name": lambda row: row[0],
+    "amount": lambda row: row[1],
+}
+# Bytes taken by the float of a row, which `sys.getsizeof` of the tuple does not include.
+_FLOAT_BYTES: int = _sys.getsizeof(0.0)
+
+
+class __Counters:
+    "The class `__Counters` keeps the statistics of the export in progress."
+
+    read: int = 0
+    runs: int = 0
+
+
+def __write_csv(f: IO[str], rows: Iterable[_Row]) -> int:
+    """
+    The function `__write_csv` writes rows as CSV, with a name,amount,category header line.
+
+    @param f The `f` parameter is the file to write to.
+    @param rows The `rows` parameter is the iterable of (name, amount, category) tuples.
+
+    @return The function returns the number of rows written.
+    """
+    writer = _csv.writer(f, lineterminator="\n")
+    writer.writerow(("name", "amount", "category"))
+    count: int = 0
+    for chunk in __chunks(rows):
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+
+def __write_jsonl(f: IO[str], rows: Iterable[_Row]) -> int:
+    """
+    The function `__write_jsonl` writes rows as JSON Lines, one {"name", "amount", "category"}
+    object per line, as `import` reads them.
+
+    @param f The `f` parameter is the file to write to.
+    @param rows The `rows` parameter is the iterable of (name, amount, category) tuples.
+
+    @return The function returns the number of rows written.
+    """
+    count: int = 0
+    dumps: Callable[..., str] = _json.dumps
+    for chunk in __chunks(rows):
+        f.write(
+            "".join(
+                f'{{"name": {dumps(n)}, "amount": {dumps(a)}, "category": {dumps(c)}}}\n'
+                for n, a, c in chunk
+            )
+        )
+        count += len(chunk)
+    return count
+
+
+def __write_json(f: IO[str], rows: Iterable[_Row]) -> int:
+    """
+    The function `__write_json` writes rows as a JSON array of {"name", "amount", "category"}
+    objects, one per line, without holding the array in memory.
+
+    @param f The `f` parameter is the file to write to.
+    @param rows The `rows` parameter is the iterable of (name, amount, category) tuples.
+
+    @return The function returns the number of rows written.
+    """
+    f.write("[")
+    separator: str = "\n"
+    count: int = 0
+    dumps: Callable[..., str] = _json.dumps
+    for chunk in __chunks(rows):
+        for n, a, c in chunk:
+            f.write(
+                f'{separator}{{"name": {dumps(n)}, "amount": {dumps(a)},'
+                f' "category": {dumps(c)}}}'
+            )
+            separator = ",\n"
+        count += len(chunk)
+    f.write("\n]\n" if count else "]\n")
+    return count
+
+
+FORMATS: Dict[str, _Writer] = {
+    "csv": __write_csv,
+    "jsonl": __write_jsonl,
+    "json": __write_json,
+}
+
+
+def __chunks(rows: Iterable[_Row], size: int = 4096) -> Iterator[List[_Row]]:
+    """
+    The function `__chunks` groups rows so that they are written with one call per chunk.
+
+    @param rows The `rows` parameter is the iterable of rows.
+    @param size The `size` parameter is the maximum number of rows per chunk.
+
+    @return The function returns an iterator of chunks.
+    """
+    iterator: Iterator[_Row] = iter(rows)
+    while chunk := list(_itertools.islice(iterator, size)):
+        yield chunk
+
+
+def __count(rows: Iterable[_Row]) -> Iterator[_Row]:
+    """
+    The function `__count` counts the rows read from the storage as they flow through.
+
+    @param rows The `rows` parameter is the iterable of rows.
+
+    @return The function returns an iterator of the same rows.
+    """
+    for chunk in __chunks(rows):
+        __Counters.read += len(chunk)
+        yield from chunk
+
+
+def __spill(run: List[_Row], directory: str) -> str:
+    """
+    The function `__spill` writes a sorted run to a temporary file, in `marshal` blocks of rows,
+    which are much faster to write and read back than text.
+
+    @param run The `run` parameter is the sorted list of rows.
+    @param directory The `directory` parameter is the directory of the temporary files.
+
+    @return The function returns the path of the file.
+    """
+    logger.was_called(__spill, len(run))
+    path: str = _os.path.join(directory, f"run-{__Counters.runs:05d}")
+    __Counters.runs += 1
+    with open(path, "wb") as f:
+        for chunk in __chunks(run):
+            _marshal.dump(chunk, f)
+    return path
+
+
+def __read_run(path: str) -> Iterator[_Row]:
+    """
+    The function `__read_run` streams back a run written by `__spill`.
+
+    @param path The `path` parameter is the path of the run.
+
+    @return The function returns an iterator of rows.
+    """
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunk: List[_Row] = _marshal.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def __sorted(
+    rows: Iterable[_Row], key: _Key, reverse: bool, memory: int, directory: str
+) -> Iterator[_Row]:
+    """
+    The function `__sorted` sorts rows in memory while they fit in `memory` bytes. Beyond that, it
+    sorts them by runs of that size, spills every run to a temporary file and merges the runs with
+    `heapq.merge`, reading them back one row at a time. The sort is stable in both cases.
+
+    @param rows The `rows` parameter is the iterable of rows.
+    @param key The `key` parameter is the sort key.
+    @param reverse The `reverse` parameter tells whether to sort in descending order.
+    @param memory The `memory` parameter is the number of bytes of rows held at once, roughly.
+    @param directory The `directory` parameter is the directory of the temporary files.
+
+    @return The function returns an iterator of the sorted rows.
+    """
+    runs: List[str] = []
+    run: List[_Row] = []
+    size: int = 0
+    getsizeof: Callable[[Any], int] = _sys.getsizeof
+    for row in rows:
+        run.append(row)
+        size += getsizeof(row) + getsizeof(row[0]) + _FLOAT_BYTES
+        if size >= memory:
+            run.sort(key=key, reverse=reverse)
+            runs.append(__spill(run, directory))
+            run, size = [], 0
+    run.sort(key=key, reverse=reverse)
+    if not runs:
+        return iter(run)
+    if run:
+        runs.append(__spill(run, directory))
+    del run
+    return _heapq.merge(*map(__read_run, runs), key=key, reverse=reverse)
+
+
+def __top(rows: Iterable[_Row], key: _Key, reverse: bool, top: int) -> List[_Row]:
+    """
+    The function `__top` keeps the first `top` rows of the sort order with a heap of `top` rows.
+
+    @param rows The `rows` parameter is the iterable of rows.
+    @param key The `key` parameter is the sort key.
+    @param reverse The `reverse` parameter tells whether the sort is descending.
+    @param top The `top` parameter is the number of rows to keep.
+
+    @return The function returns the rows, sorted.
+    """
+    pick: Callable[..., List[_Row]] = _heapq.nlargest if reverse else _heapq.nsmallest
+    return pick(top, rows, key=key)
+
+
+def export_file(
+    path: str,
+    file_format: str = "",
+    sort: str = "",
+    descending: bool = False,
+    top: int = 0,
+    memory: int | None = None,
+) -> int:
+    """
+    The function `export_file` streams the budget to a CSV, JSON Lines or JSON file. Rows flow from
+    the storage through a generator pipeline to the writer, so an unsorted export holds a few
+    thousand rows at a time. A sorted export is sorted in memory up to `memory` bytes of rows, and
+    with an external merge sort over temporary files beyond that. `top` only keeps the first rows of
+    the sort order, with a heap. The number of rows read per second is reported on stderr.
+
+    @param path The `path` parameter is the file to write, "-" for stdout.
+    @param file_format The `file_format` parameter is "csv", "jsonl" or "json"; when empty it is
+    taken from the file extension, and CSV is used for stdout.
+    @param sort The `sort` parameter is the key to sort by, "name" or "amount", "" for the storage
+    order; `top` sorts by amount by default.
+    @param descending The `descending` parameter tells whether to sort in descending order; `top`
+    without `sort` keeps the largest amounts.
+    @param top The `top` parameter is the number of rows to keep, 0 for all of them.
+    @param memory The `memory` parameter is the number of bytes of rows sorted in memory (default:
+    `var.export_memory`).
+
+    @return The function returns the number of exported rows.
+    """
+    logger.was_called(export_file, path, file_format, sort, descending, top)
+    if not file_format:
+        file_format = "csv" if path == "-" else path.rpartition(".")[2]
+    file_format = file_format.lower()
+    if file_format not in FORMATS:
+        raise ValueError(PRT_INIT_EXPORT_UNKNOWN_FORMAT(file_format))
+    if top > 0 and not sort:
+        sort, descending = "amount", True
+    if sort and sort not in KEYS:
+        raise ValueError(PRT_INIT_EXPORT_UNKNOWN_SORT(sort))
+
+    # Imported here so that other commands do not pay for importing it.
+    import tempfile as _tempfile
+
+    __Counters.read = __Counters.runs = 0
+    start: float = _time.perf_counter()
+    with _tempfile.TemporaryDirectory(prefix="budget-export-") as directory:
+        rows: Iterable[_Row] = __count(_rows())
+        if top > 0:
+            rows = __top(rows, KEYS[sort], descending, top)
+        elif sort:
+            rows = __sorted(
+                rows,
+                KEYS[sort],
+                descending,
+                var.export_memory if memory is None else memory,
+                directory,
+            )
+        if path == "-":
+            count: int = FORMATS[file_format](_sys.stdout, rows)
+            _sys.stdout.flush()
+        else:
+            f: IO[str]
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                count = FORMATS[file_format](f, rows)
+    elapsed: float = _time.perf_counter() - start
+    print(
+        PRT_INIT_EXPORT_EXPORTED(
+            (
+                count,
+                path,
+                elapsed,
+                __Counters.read / max(elapsed, 1e-9),
+                __Counters.runs,
+            )
+        ),
+        file=_sys.stderr,
+    )
+    return count
@@ -5,18 +5,20 @@ __all__ = [
     "numeric_only",
 ]
 
-import os as _os
 import re as _re
 from typing import Callable
 
 from src.logger import logger as logger
 from src.var import var
+from src.stats import timed
+from src.screen import screen
 
 
+@timed("io.prt")
 def prt(*s: str, i: str = "") -> None:
     """
     The function `prt` logs a function call with the provided arguments and prints the given strings
-    with an optional string as a separator.
+    with an optional string as a separator, through the screen of the interactive menu.
 
     @param *s The `*s` parameter in the `prt` function is a variable number of string arguments
     that will be printed.
@@ -24,13 +26,14 @@ def prt(*s: str, i: str = "") -> None:
     in the printed output.
     """
     logger.was_called(prt, *s, i)
-    return print(*s, i)
+    screen.add(" ".join(map(str, (*s, i))))
 
 
+@timed("io.inp")
 def inp(s: str = "") -> str:
     """
     The function `inp` logs a function call with the provided argument and prompts the user for input,
-    displaying the provided string as a prompt.
+    displaying the provided string as a prompt on the screen of the interactive menu.
 
     @param s The `s` parameter in the `inp` function is an optional string argument used as a prompt
     for the user input.
@@ -38,20 +41,22 @@ def inp(s: str = "") -> str:
     @return str The function `inp` returns the user input as a string.
     """
     logger.was_called(inp, s)
-    return input(f"{s}\n> ")
+    return screen.ask(s)
 
 
+@timed("io.clear_terminal")
 def clear_terminal() -> int:
     """
-    The function `clear_terminal` clears the terminal screen by calling the appropriate system command
-    based on the operating system. If the operating system is Windows, it executes the command "cls";
-    otherwise, it executes the command "clear".
+    The function `clear_terminal` starts a new frame of the screen (see `src.screen`). Nothing is
+    erased until the frame is drawn by `prt` and `inp`, which then only rewrite the lines that
+    changed, without running the "clear" or "cls" command.
 
-    @return The function `clear_terminal` returns an integer representing the exit status of the system
-    command execution.
+    @return The function `clear_terminal` returns 0, the exit status the system command used to
+    return.
     """
     logger.was_called(clear_terminal)
-    return _os.system("cls" if _os.name == "nt" else "clear")
+    screen.clear()
+    return 0
 
 
 def numeric_only(
@@ -66,10 +71,13 @@ def numeric_only(
     contains alphanumeric characters. This parameter is sanitized to remove any non-numeric characters
     before processing.
     @param instance The `instance` parameter in the `numeric_only` function is a callable object that
-    accepts a string argument and returns either an integer or a float value.
+    accepts a string argument and returns either an integer or a float value, such as
+    `src.money.amount` for amounts.
 
     @return The function `numeric_only` returns either an integer or a float value, depending on the
-    result of calling the provided instance function with the sanitized input string.
+    result of calling the provided instance function with the sanitized input string. If the instance
+    function raises a ValueError, e.g. for an amount out of range, it returns `var.limit` and leaves
+    the error message in `var.extra_message`.
     """
     logger.was_called(numeric_only, input_string, instance)
     input_string = _re.sub(r"[^0-9.]", "", input_string)
@@ -77,6 +85,7 @@ def numeric_only(
         return var.limit
     try:
         return instance(input_string)
-    except ValueError:
+    except ValueError as e:
         logger.exc(c=numeric_only, default=True)
+        var.extra_message = str(e)
         return var.limit
@@ -0,0 +1,593 @@
+__all__ = [
+    "record",
+    "flush",
+    "load",
+    "index",
+    "period_range",
+    "TimeIndex",
+]
+
+import bisect as _bisect
+import datetime as _datetime
+import gc as _gc
+import itertools as _itertools
+import json as _json
+import math as _math
+import os as _os
+import sys as _sys
+import time as _time
+import zlib as _zlib
+from array import array as _array
+from json.encoder import encode_basestring_ascii as _encode_string
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Tuple
+
+import src.const as const
+import src.durable as durable
+from src.var import var
+from src.logger import logger as logger
+from src.aggregates import RunningSum
+from src.stats import timed
+
+# (timestamp, op, name, amount after the change, change of the budget total)
+_Transaction = Tuple[float, str, str, float, float]
+_Rollup = Tuple[str, int, float]
+_Period = Tuple[float, float]
+
+# Number of transactions decoded and turned into columns at a time when loading the history.
+_LOAD_CHUNK: int = 10_000
+# Number of transactions decoded past the last checkpoint of the index that make `index` write a
+# new one, and number of bytes before its offset whose checksum tells the history file is the same.
+_CHECKPOINT_ROWS: int = 10_000
+_CHECKPOINT_BYTES: int = 4096
+
+
+class __History:
+    "The class `__History` keeps the append handle of the history file and unwritten transactions."
+
+    handle: IO[str] | None = None
+    path: str = ""
+    pending: List[str] = []
+    last: float = 0.0
+
+
+def __handle() -> IO[str]:
+    """
+    The function `__handle` returns an append handle to `const.HISTORY_FILE`, reopening it if the
+    configured path changed since the last call.
+
+    @return The function returns the open history file handle.
+    """
+    if __History.handle is None or __History.path != const.HISTORY_FILE:
+        if __History.handle is not None:
+            __History.handle.close()
+        __History.path = const.HISTORY_FILE
+        __History.handle = open(
+            const.ensure_parent(__History.path), "a", encoding="utf-8"
+        )
+    return __History.handle
+
+
+def record(op: str, name: str, amount: float, change: float) -> _Transaction:
+    """
+    The function `record` timestamps a mutation and appends it to the history file, or keeps it
+    until `flush()` while `var.autosave` is disabled. Timestamps never go backwards, so the history
+    stays sorted by time even if the clock does.
+
+    @param op The `op` parameter is the mutation: "register", "edit" or "delete".
+    @param name The `name` parameter is the name of the item.
+    @param amount The `amount` parameter is the amount of the item after the mutation (0 if deleted).
+    @param change The `change` parameter is the change of the budget total caused by the mutation.
+
+    @return The function returns the transaction as a (timestamp, op, name, amount, change) tuple.
+    """
+    ts: float = max(_time.time(), __History.last)
+    __History.last = ts
+    __History.pending.append(
+        f'[{ts!r},"{op}",{_encode_string(name)},{amount!r},{change!r}]\n'
+    )
+    if var.autosave:
+        flush()
+    return ts, op, name, amount, change
+
+
+@timed("io.history")
+def flush() -> int:
+    """
+    The function `flush` writes the transactions kept while `var.autosave` was disabled with a single
+    write.
+
+    @return The function returns the number of transactions written.
+    """
+    if not __History.pending:
+        return 0
+    f: IO[str] = __handle()
+    f.write("".join(__History.pending))
+    f.flush()
+    written: int = len(__History.pending)
+    __History.pending.clear()
+    return written
+
+
+def __decode(lines: List[bytes]) -> List[Any]:
+    """
+    The function `__decode` decodes a chunk of history lines with a single call to the JSON decoder,
+    falling back to one line at a time to skip the unreadable ones if the chunk does not decode.
+
+    @param lines The `lines` parameter is the list of lines to decode.
+
+    @return The function returns the list of transactions, as lists.
+    """
+    try:
+        return _json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        pass
+    rows: List[Any] = []
+    for line in lines:
+        try:
+            rows.append(_json.loads(line))
+        except ValueError:
+            logger.exc(f"Ignoring unreadable history record: {line!r}")
+    return rows
+
+
+def __rows(f: IO[bytes]) -> Iterator[_Transaction]:
+    """
+    The function `__rows` yields the transactions of the history file from the current position of
+    `f`. Lines are decoded in chunks, and unreadable ones are logged and ignored.
+
+    @param f The `f` parameter is the history file, opened in binary mode.
+
+    @return The function returns an iterator of (timestamp, op, name, amount, change) sequences.
+    """
+    while lines := list(_itertools.islice(f, _LOAD_CHUNK)):
+        for row in __decode(lines):
+            if isinstance(row, list) and len(row) == 5:
+                yield row
+            else:
+                logger.info(f"Ignoring malformed history record: {row!r}")
+
+
+def load() -> Iterator[_Transaction]:
+    """
+    The function `load` yields the transactions stored in the history file, in the order they were
+    written, after writing pending ones. Each line of the file is a JSON array [timestamp, op, name,
+    amount, change]; lines are decoded in chunks, and unreadable ones are logged and ignored.
+
+    @return The function returns an iterator of (timestamp, op, name, amount, change) sequences.
+    """
+    logger.was_called(load)
+    flush()
+    if not _os.path.exists(const.HISTORY_FILE):
+        return
+    with open(const.HISTORY_FILE, "rb") as f:
+        yield from __rows(f)
+
+
+def __check(f: IO[bytes], offset: int) -> int:
+    "Returns the checksum of the `_CHECKPOINT_BYTES` bytes of the history file before `offset`."
+    start: int = max(offset - _CHECKPOINT_BYTES, 0)
+    f.seek(start)
+    return _zlib.crc32(f.read(offset - start))
+
+
+def __read_index(f: IO[bytes]) -> Tuple[int, "TimeIndex"] | None:
+    """
+    The function `__read_index` reads the checkpoint of the index written by `__write_index`, if it
+    still matches the history file.
+
+    @param f The `f` parameter is the history file, opened in binary mode.
+
+    @return The function returns a tuple with the offset of the history file the checkpoint covers
+    and its time index, or None if there is no usable checkpoint.
+    """
+    path: str = const.HISTORY_FILE + ".idx"
+    if not _os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as index:
+            header: Dict[str, Any] = _json.loads(index.readline())
+            offset: int = header["offset"]
+            if offset > _os.fstat(f.fileno()).st_size or header["check"] != __check(
+                f, offset
+            ):
+                logger.info(f"Ignoring outdated history index: {path!r}")
+                return None
+            return offset, TimeIndex.restore(index)
+    except (OSError, ValueError, KeyError, TypeError, EOFError):
+        logger.exc(c=__read_index, default=True)
+        return None
+
+
+def __write_index(f: IO[bytes], offset: int, timeline: "TimeIndex") -> None:
+    """
+    The function `__write_index` saves the time index as a checkpoint covering the history file up
+    to `offset`. Failing to write it is logged and ignored, as it is only read to load faster.
+
+    @param f The `f` parameter is the history file, opened in binary mode.
+    @param offset The `offset` parameter is the offset where the transactions of the index end.
+    @param timeline The `timeline` parameter is the time index.
+    """
+    header: Dict[str, Any] = {"offset": offset, "check": __check(f, offset)}
+    try:
+        with durable.replace(const.HISTORY_FILE + ".idx", backup=False) as index:
+            index.write(_json.dumps(header).encode() + b"\n")
+            timeline.dump(index)
+    except OSError:
+        logger.exc(c=__write_index, default=True)
+
+
+@timed("io.history_index")
+def index() -> "TimeIndex":
+    """
+    The function `index` returns the time index of the history, after writing pending transactions.
+    The columns and rollups saved by the last checkpoint in `const.HISTORY_FILE` + ".idx" are read as
+    they are, so only the transactions appended since are decoded; once they are `_CHECKPOINT_ROWS`
+    or more, a new checkpoint is written. A checkpoint that no longer matches the history file, e.g.
+    because it was removed or rewritten, is ignored.
+
+    @return The function returns the time index.
+    """
+    logger.was_called(index)
+    flush()
+    if not _os.path.exists(const.HISTORY_FILE):
+        return TimeIndex(())
+    with open(const.HISTORY_FILE, "rb") as f:
+        checkpoint: Tuple[int, TimeIndex] | None = __read_index(f)
+        offset, timeline = checkpoint or (0, TimeIndex(()))
+        f.seek(offset)
+        read: int = len(timeline)
+        timeline.extend(__rows(f))
+        read = len(timeline) - read
+        end: int = f.tell()
+        if read >= _CHECKPOINT_ROWS:
+            f.seek(end - 1)
+            # A torn last line is decoded again next time, so the checkpoint must not cover it.
+            if f.read(1) == b"\n":
+                __write_index(f, end, timeline)
+    return timeline
+
+
+def __midnight(year: int, month: int, day: int) -> float:
+    "Returns the local timestamp of midnight of a date; out of range days and months roll over."
+    return _time.mktime((year, month, day, 0, 0, 0, 0, 0, -1))
+
+
+def _month(ts: float) -> Tuple[str, float, float]:
+    "Returns the key (YYYY-MM), start and end of the month holding a timestamp."
+    t: _time.struct_time = _time.localtime(ts)
+    return (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}",
+        __midnight(t.tm_year, t.tm_mon, 1),
+        __midnight(t.tm_year, t.tm_mon + 1, 1),
+    )
+
+
+def _week(ts: float) -> Tuple[str, float, float]:
+    "Returns the key (YYYY-Www, ISO 8601), start and end of the week holding a timestamp."
+    t: _time.struct_time = _time.localtime(ts)
+    monday: int = t.tm_mday - t.tm_wday
+    return (
+        _time.strftime("%G-W%V", t),
+        __midnight(t.tm_year, t.tm_mon, monday),
+        __midnight(t.tm_year, t.tm_mon, monday + 7),
+    )
+
+
+def period_range(text: str) -> _Period:
+    """
+    The function `period_range` converts a period into the local timestamps where it starts and ends.
+    A period is a year (YYYY), a month (YYYY-MM), an ISO week (YYYY-Www), a day (YYYY-MM-DD) or a
+    range of them (FROM..TO, both included).
+
+    @param text The `text` parameter is the period to convert.
+
+    @return The function returns a (start, end) tuple, the end being excluded.
+
+    @raise ValueError If the text is not a period.
+    """
+    text = text.strip()
+    if ".." in text:
+        first, _, last = text.partition("..")
+        return period_range(first)[0], period_range(last)[1]
+    parts: List[str] = text.split("-")
+    try:
+        year: int = int(parts[0])
+        if len(parts) == 1:
+            return __midnight(year, 1, 1), __midnight(year + 1, 1, 1)
+        if len(parts) == 2 and parts[1][:1] in ("W", "w"):
+            week: int = int(parts[1][1:])
+            # Raises ValueError for week 53 of a year that has 52.
+            _datetime.date.fromisocalendar(year, week, 1)
+            # ISO week 1 is the week holding January 4th.
+            jan4: int = _time.localtime(__midnight(year, 1, 4)).tm_wday
+            monday: int = 4 - jan4 + (week - 1) * 7
+            return __midnight(year, 1, monday), __midnight(year, 1, monday + 7)
+        month: int = int(parts[1])
+        if not 1 <= month <= 12:
+            raise ValueError(text)
+        if len(parts) == 2:
+            return __midnight(year, month, 1), __midnight(year, month + 1, 1)
+        day: int = int(parts[2])
+        if len(parts) == 3:
+            # `mktime` would roll an impossible date such as 2026-02-31 over to March.
+            _datetime.date(year, month, day)
+            return __midnight(year, month, day), __midnight(year, month, day + 1)
+    except (ValueError, IndexError, OverflowError):
+        pass
+    raise ValueError(text)
+
+
+class _Rollups:
+    """
+    The class `_Rollups` keeps the number of transactions and the total change of every period of
+    one kind (months or weeks). Transactions arrive sorted by time, so the period of the last one is
+    cached and the calendar is only consulted when a transaction crosses into a new period.
+    """
+
+    def __init__(self, period: Callable[[float], Tuple[str, float, float]]):
+        self.__period = period
+        self.__key: str = ""
+        self.__start: float = 0.0
+        self.__end: float = -1.0
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, RunningSum] = {}
+
+    def __enter(self, ts: float) -> None:
+        "Makes the period holding `ts` the current one."
+        if not self.__start <= ts < self.__end:
+            self.__key, self.__start, self.__end = self.__period(ts)
+            if self.__key not in self.counts:
+                self.counts[self.__key] = 0
+                self.totals[self.__key] = RunningSum()
+
+    def add(self, ts: float, change: float) -> None:
+        self.__enter(ts)
+        self.counts[self.__key] += 1
+        self.totals[self.__key].add(change)
+
+    def extend(self, times: _array, changes: _array) -> None:
+        """
+        Adds sorted transactions in bulk: the transactions of each period are found with `bisect`
+        and summed at once, so the cost grows with the number of periods rather than transactions.
+        """
+        i: int = 0
+        while i < len(times):
+            self.__enter(times[i])
+            j: int = _bisect.bisect_left(times, self.__end, i)
+            self.counts[self.__key] += j - i
+            self.totals[self.__key].add(_math.fsum(changes[i:j]))
+            i = j
+
+    def get(self, key: str) -> _Rollup | None:
+        if key not in self.counts:
+            return None
+        return key, self.counts[key], self.totals[key].value
+
+    def all(self) -> List[_Rollup]:
+        return [
+            (key, self.counts[key], self.totals[key].value)
+            for key in sorted(self.counts)
+        ]
+
+    def dump(self) -> Dict[str, List[float]]:
+        "Returns the rollups as a JSON-serializable {key: [count, change]} dictionary."
+        return {key: [count, change] for key, count, change in self.all()}
+
+    def load(self, rollups: Dict[str, List[float]]) -> None:
+        "Replaces the rollups with those returned by `dump`."
+        self.__end = -1.0
+        self.counts = {}
+        self.totals = {}
+        for key, (count, change) in rollups.items():
+            self.counts[key] = int(count)
+            self.totals[key] = RunningSum()
+            self.totals[key].add(change)
+
+
+class TimeIndex:
+    """
+    The class `TimeIndex` holds the transaction history sorted by time, in columns, with a running
+    (prefix) sum of the changes so the total change over any time range is found with two `bisect`
+    lookups. Monthly and weekly rollups are kept up to date as transactions are added. The columns
+    and rollups can be saved with `dump` and read back with `restore` without decoding the history.
+    """
+
+    def __init__(self, transactions: Iterable[_Transaction]):
+        """
+        Indexes the given transactions.
+
+        @param transactions The `transactions` parameter is an iterable of (timestamp, op, name,
+        amount, change) tuples, normally sorted by time; they are sorted if they are not.
+        """
+        logger.was_called(TimeIndex)
+        self.__times: _array = _array("d")
+        self.__ops: List[str] = []
+        self.__names: List[str] = []
+        self.__amounts: _array = _array("d")
+        self.__changes: _array = _array("d")
+        # The prefix sums start at 0 so that sum(changes[i:j]) == cumulative[j] - cumulative[i].
+        self.__cumulative: _array = _array("d", [0.0])
+        self.__months: _Rollups = _Rollups(_month)
+        self.__weeks: _Rollups = _Rollups(_week)
+        self.extend(transactions)
+
+    def extend(self, transactions: Iterable[_Transaction]) -> None:
+        """
+        Appends transactions in bulk, sorting the whole index again if any of them is older than the
+        transaction before it.
+
+        @param transactions The `transactions` parameter is an iterable of (timestamp, op, name,
+        amount, change) tuples.
+        """
+        start: int = len(self.__times)
+        iterator: Iterator[_Transaction] = iter(transactions)
+        # Decoding allocates containers for every transaction; pausing the cyclic collector avoids
+        # rescanning the growing columns over and over.
+        collecting: bool = _gc.isenabled()
+        _gc.disable()
+        try:
+            while chunk := list(_itertools.islice(iterator, _LOAD_CHUNK)):
+                times, ops, names, amounts, changes = zip(*chunk)
+                self.__times.extend(times)
+                self.__ops.extend(ops)
+                self.__names.extend(names)
+                self.__amounts.extend(amounts)
+                self.__changes.extend(changes)
+        finally:
+            if collecting:
+                _gc.enable()
+        tail: _array = self.__times[max(start - 1, 0) :]
+        if any(a > b for a, b in zip(tail, tail[1:])):
+            order: List[int] = sorted(
+                range(len(self.__times)), key=self.__times.__getitem__
+            )
+            self.__times = _array("d", (self.__times[i] for i in order))
+            self.__ops = [self.__ops[i] for i in order]
+            self.__names = [self.__names[i] for i in order]
+            self.__amounts = _array("d", (self.__amounts[i] for i in order))
+            self.__changes = _array("d", (self.__changes[i] for i in order))
+            self.__cumulative = _array("d", [0.0])
+            self.__months = _Rollups(_month)
+            self.__weeks = _Rollups(_week)
+            start = 0
+        changes: _array = self.__changes[start:]
+        # `accumulate` yields its initial value first, which is already the last prefix sum.
+        self.__cumulative.extend(
+            _itertools.islice(
+                _itertools.accumulate(changes, initial=self.__cumulative[-1]), 1, None
+            )
+        )
+        self.__months.extend(self.__times[start:], changes)
+        self.__weeks.extend(self.__times[start:], changes)
+
+    def dump(self, f: IO[bytes]) -> None:
+        """
+        Writes the columns and rollups, to be read back with `restore`.
+
+        @param f The `f` parameter is the file to write to, opened in binary mode.
+        """
+        header: Dict[str, Any] = {
+            "count": len(self.__times),
+            "byteorder": _sys.byteorder,
+            "zone": [_time.timezone, _time.altzone, _time.daylight],
+            "months": self.__months.dump(),
+            "weeks": self.__weeks.dump(),
+        }
+        f.write(_json.dumps(header, separators=(",", ":")).encode() + b"\n")
+        for column in (self.__times, self.__amounts, self.__changes, self.__cumulative):
+            column.tofile(f)
+        f.write(_json.dumps([self.__ops, self.__names]).encode() + b"\n")
+
+    @staticmethod
+    def restore(f: IO[bytes]) -> "TimeIndex":
+        """
+        Reads the columns and rollups written by `dump`. The rollups are computed again from the
+        columns if they were written in another time zone.
+
+        @param f The `f` parameter is the file to read from, opened in binary mode.
+
+        @return The time index.
+
+        @raise ValueError If the file is not a time index written on this platform.
+        @raise EOFError If the file is truncated.
+        """
+        header: Dict[str, Any] = _json.loads(f.readline())
+        if header["byteorder"] != _sys.byteorder:
+            raise ValueError(header["byteorder"])
+        count: int = header["count"]
+        timeline: TimeIndex = TimeIndex(())
+        timeline.__times.fromfile(f, count)
+        timeline.__amounts.fromfile(f, count)
+        timeline.__changes.fromfile(f, count)
+        timeline.__cumulative = _array("d")
+        timeline.__cumulative.fromfile(f, count + 1)
+        timeline.__ops, timeline.__names = _json.loads(f.readline())
+        if len(timeline.__ops) != count or len(timeline.__names) != count:
+            raise ValueError(count)
+        if header["zone"] == [_time.timezone, _time.altzone, _time.daylight]:
+            timeline.__months.load(header["months"])
+            timeline.__weeks.load(header["weeks"])
+        else:
+            timeline.__months.extend(timeline.__times, timeline.__changes)
+            timeline.__weeks.extend(timeline.__times, timeline.__changes)
+        return timeline
+
+    def add(self, transaction: _Transaction) -> None:
+        """
+        Appends a transaction, which must not be older than the last one.
+
+        @param transaction The `transaction` parameter is a (timestamp, op, name, amount, change)
+        tuple.
+        """
+        ts, op, name, amount, change = transaction
+        self.__times.append(ts)
+        self.__ops.append(op)
+        self.__names.append(name)
+        self.__amounts.append(amount)
+        self.__changes.append(change)
+        self.__cumulative.append(self.__cumulative[-1] + change)
+        self.__months.add(ts, change)
+        self.__weeks.add(ts, change)
+
+    def __bounds(self, start: float, end: float) -> Tuple[int, int]:
+        return (
+            _bisect.bisect_left(self.__times, start),
+            _bisect.bisect_left(self.__times, end),
+        )
+
+    def total(self, start: float, end: float) -> Tuple[int, float]:
+        """
+        Returns the number of transactions and their total change within a time range.
+
+        @param start The `start` parameter is the timestamp where the range starts (included).
+        @param end The `end` parameter is the timestamp where the range ends (excluded).
+
+        @return A (count, change) tuple.
+        """
+        lo, hi = self.__bounds(start, end)
+        return hi - lo, self.__cumulative[hi] - self.__cumulative[lo]
+
+    def latest(self, start: float, end: float, limit: int) -> List[_Transaction]:
+        """
+        Returns the latest transactions within a time range.
+
+        @param start The `start` parameter is the timestamp where the range starts (included).
+        @param end The `end` parameter is the timestamp where the range ends (excluded).
+        @param limit The `limit` parameter is the maximum number of transactions to return.
+
+        @return A list of (timestamp, op, name, amount, change) tuples, newest first.
+        """
+        lo, hi = self.__bounds(start, end)
+        return [
+            (
+                self.__times[i],
+                self.__ops[i],
+                self.__names[i],
+                self.__amounts[i],
+                self.__changes[i],
+            )
+            for i in range(hi - 1, max(lo, hi - limit) - 1, -1)
+        ]
+
+    def rollup(self, key: str) -> _Rollup | None:
+        """
+        Returns the precomputed totals of a month (YYYY-MM) or an ISO week (YYYY-Www).
+
+        @param key The `key` parameter is the month or week.
+
+        @return A (key, count, change) tuple, or None if there is no such period in the history.
+        """
+        return (self.__weeks if "W" in key.upper() else self.__months).get(key.upper())
+
+    def rollups(self, weekly: bool = False) -> List[_Rollup]:
+        """
+        Returns the precomputed totals of every month or week.
+
+        @param weekly The `weekly` parameter selects weeks instead of months.
+
+        @return A list of (key, count, change) tuples sorted by period.
+        """
+        return (self.__weeks if weekly else self.__months).all()
+
+    def __len__(self) -> int:
+        return len(self.__times)
@@ -0,0 +1,200 @@
+__all__ = ["import_file"]
+
+import csv as _csv
+import itertools as _itertools
+import json as _json
+import sys as _sys
+import time as _time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from src.var import var
+import src.money as _money
+from src.logger import logger as logger
+from src.messages import *
+from src.selector_handler.functions import *
+
+_Row = Tuple[str, Any, str]
+_Item = Tuple[str, float, str]
+_Reader = Callable[[str, str, str, str], Iterator[_Row]]
+
+
+class __Counters:
+    "The class `__Counters` keeps the statistics of the import in progress."
+
+    read: int = 0
+    imported: int = 0
+    invalid: int = 0
+    duplicated: int = 0
+
+
+def __read_csv(path: str, name: str, amount: str, category: str) -> Iterator[_Row]:
+    """
+    The function `__read_csv` streams the rows of a CSV file with a header line.
+
+    @param path The `path` parameter is the CSV file to read.
+    @param name The `name` parameter is the column holding the item name.
+    @param amount The `amount` parameter is the column holding the item amount.
+    @param category The `category` parameter is the optional column holding the item category.
+
+    @return The function returns an iterator of (name, raw amount, category) tuples.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in _csv.DictReader(f):
+            yield row.get(name) or "", row.get(amount), row.get(category) or ""
+
+
+def __read_jsonl(path: str, name: str, amount: str, category: str) -> Iterator[_Row]:
+    """
+    The function `__read_jsonl` streams the objects of a JSON Lines file, one object per line.
+
+    @param path The `path` parameter is the JSON Lines file to read.
+    @param name The `name` parameter is the key holding the item name.
+    @param amount The `amount` parameter is the key holding the item amount.
+    @param category The `category` parameter is the optional key holding the item category.
+
+    @return The function returns an iterator of (name, raw amount, category) tuples.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row: Dict[str, Any] = _json.loads(line)
+            except _json.JSONDecodeError:
+                logger.exc(f"Ignoring unreadable JSON line: {line!r}")
+                yield "", None, ""
+                continue
+            yield str(row.get(name) or ""), row.get(amount), str(
+                row.get(category) or ""
+            )
+
+
+def __parse(rows: Iterable[_Row]) -> Iterator[_Item]:
+    """
+    The function `__parse` converts the raw amounts with the same rules as the interactive menu
+    (`src.money.read`), dropping rows without a name or a valid amount.
+
+    @param rows The `rows` parameter is the iterable of (name, raw amount, category) tuples.
+
+    @return The function returns an iterator of (name, amount, category) tuples.
+    """
+    for name, raw, category in rows:
+        __Counters.read += 1
+        name = name.strip()
+        try:
+            if not name or raw is None:
+                raise ValueError(PRT_INIT_TRANSACTION_INVALID_NAME)
+            amount: float = _money.read(str(raw))
+        except ValueError:
+            __Counters.invalid += 1
+            continue
+        yield name, amount, category.strip()
+
+
+def __chunks(items: Iterable[_Item], size: int) -> Iterator[List[_Item]]:
+    """
+    The function `__chunks` groups the items in lists of at most `size` elements.
+
+    @param items The `items` parameter is the iterable of (name, amount, category) tuples.
+    @param size The `size` parameter is the maximum number of items per chunk.
+
+    @return The function returns an iterator of chunks.
+    """
+    iterator: Iterator[_Item] = iter(items)
+    while chunk := list(_itertools.islice(iterator, size)):
+        yield chunk
+
+
+def __commit(chunk: List[_Item]) -> None:
+    """
+    The function `__commit` registers the items of a chunk whose name is not taken yet, counting the
+    others as duplicates. With `var.journal` the chunk is appended to the journal right away;
+    otherwise it stays pending until the import saves once at the end, as each save rewrites the
+    whole file.
+
+    @param chunk The `chunk` parameter is the list of (name, amount, category) tuples to register.
+    """
+    for name, amount, category in chunk:
+        if item_exists(name):
+            __Counters.duplicated += 1
+            continue
+        register(name, amount, category)
+        __Counters.imported += 1
+    if var.journal:
+        save()
+
+
+def __report(start: float, end: str = "\r") -> None:
+    """
+    The function `__report` prints the progress of the import on stderr.
+
+    @param start The `start` parameter is the `time.perf_counter()` value when the import started.
+    @param end The `end` parameter is the string written after the report.
+    """
+    elapsed: float = _time.perf_counter() - start
+    print(
+        PRT_INIT_IMPORT_PROGRESS(
+            (__Counters.read, __Counters.imported, __Counters.read / max(elapsed, 1e-9))
+        ),
+        end=end,
+        file=_sys.stderr,
+    )
+
+
+__readers: Dict[str, _Reader] = {
+    "csv": __read_csv,
+    "jsonl": __read_jsonl,
+}
+
+
+def import_file(
+    path: str,
+    file_format: str = "",
+    chunk_size: int | None = None,
+    name: str = "name",
+    amount: str = "amount",
+    category: str = "category",
+) -> int:
+    """
+    The function `import_file` streams a CSV or JSON Lines file into the budget. Rows flow through a
+    generator pipeline (read, parse, chunk) so only one chunk of rows is held at a time; the items
+    are written with a single `save()` at the end, or per chunk to the journal (see `__commit`).
+    Names that are already registered, or repeated in the input, are skipped.
+
+    @param path The `path` parameter is the file to import.
+    @param file_format The `file_format` parameter is either "csv" or "jsonl"; when empty it is taken
+    from the file extension.
+    @param chunk_size The `chunk_size` parameter is the number of items per chunk (and progress
+    report) (default: `var.import_chunk`).
+    @param name The `name` parameter is the column or key holding the item name.
+    @param amount The `amount` parameter is the column or key holding the item amount.
+    @param category The `category` parameter is the column or key holding the item category, if any.
+
+    @return The function returns the number of imported items.
+    """
+    logger.was_called(
+        import_file, path, file_format, chunk_size, name, amount, category
+    )
+    file_format = (file_format or path.rpartition(".")[2]).lower()
+    if file_format not in __readers:
+        raise ValueError(PRT_INIT_IMPORT_UNKNOWN_FORMAT(file_format))
+
+    __Counters.read = __Counters.imported = 0
+    __Counters.invalid = __Counters.duplicated = 0
+    autosave: bool = var.autosave
+    var.autosave = False
+    start: float = _time.perf_counter()
+    try:
+        rows: Iterator[_Row] = __readers[file_format](path, name, amount, category)
+        for chunk in __chunks(
+            __parse(rows),
+            max(var.import_chunk if chunk_size is None else chunk_size, 1),
+        ):
+            __commit(chunk)
+            __report(start)
+    finally:
+        save()
+        var.autosave = autosave
+    __report(start, end="\n")
+    print(PRT_INIT_IMPORT_SKIPPED((__Counters.invalid, __Counters.duplicated)))
+    return __Counters.imported
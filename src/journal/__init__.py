@@ -0,0 +1,205 @@
+__all__ = [
+    "BATCH",
+    "Journal",
+    "append",
+    "extend",
+    "replay",
+    "reset",
+    "size",
+    "records",
+]
+
+import json as _json
+import os as _os
+from typing import Any, Dict, IO, Iterator, List
+
+import src.const as const
+import src.durable as durable
+from src.logger import logger as logger
+
+_Record = Dict[str, Any]
+
+# "op" of the journal lines holding the records written together by `extend`.
+BATCH: str = "batch"
+
+
+class Journal:
+    """
+    The class `Journal` is an append-only file of mutation records, one JSON line each, that a
+    storage replays on top of its snapshot and empties once they are written into a new one. The
+    module functions use the journal of `JsonStorage`, `const.JOURNAL_FILE`.
+    """
+
+    def __init__(self, path: str | None = None):
+        """
+        Creates a journal; the file is only opened on the first append.
+
+        @param path The `path` parameter is the path of the journal file (default:
+        `const.JOURNAL_FILE`, read on every use).
+        """
+        self.__path: str | None = path
+        self.__handle: IO[str] | None = None
+        self.__opened: str = ""
+        self.__records: int = 0
+
+    @property
+    def path(self) -> str:
+        "The path of the journal file."
+        return const.JOURNAL_FILE if self.__path is None else self.__path
+
+    def __file(self) -> IO[str]:
+        """
+        Returns an append handle to the journal file, reopening it if its path changed since the last
+        call.
+
+        @return The open journal file handle.
+        """
+        if self.__handle is None or self.__opened != self.path:
+            if self.__handle is not None:
+                self.__handle.close()
+            self.__opened = self.path
+            self.__handle = open(
+                const.ensure_parent(self.__opened), "a", encoding="utf-8"
+            )
+        return self.__handle
+
+    def append(self, record: _Record) -> int:
+        """
+        Writes a single mutation record as one JSON line at the end of the journal and syncs it as
+        `var.durability` requires, so the cost of a mutation does not depend on the size of the
+        budget.
+
+        @param record The `record` parameter is the mutation to be written.
+
+        @return The number of records currently held by the journal.
+        """
+        f: IO[str] = self.__file()
+        f.write(_json.dumps(record, separators=(",", ":")) + "\n")
+        durable.sync(f)
+        self.__records += 1
+        return self.__records
+
+    def extend(self, records: List[_Record]) -> int:
+        """
+        Writes several mutation records at the end of the journal as a single "batch" line, with a
+        single write and sync. A batch cut short by a crash is an unreadable line, so it is ignored
+        as a whole when the journal is replayed: its records are applied all or none.
+
+        @param records The `records` parameter is the list of mutations to be written.
+
+        @return The number of records currently held by the journal.
+        """
+        f: IO[str] = self.__file()
+        f.write(
+            _json.dumps({"op": BATCH, "records": records}, separators=(",", ":")) + "\n"
+        )
+        durable.sync(f)
+        self.__records += len(records)
+        return self.__records
+
+    def replay(self) -> Iterator[_Record]:
+        """
+        Yields the records stored in the journal, in the order they were written, those of a batch
+        one by one. Unreadable lines are logged and ignored. A trailing line without its newline,
+        left by a crash mid-write, is also cut off the file, as the next record appended would
+        otherwise be written onto its end and be lost with it.
+
+        @return An iterator over the journal records.
+        """
+        logger.was_called(self.replay)
+        self.__records = 0
+        path: str = self.path
+        if not _os.path.exists(path):
+            return
+        # Offset of the end of the last complete line.
+        end: int = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    logger.info(f"Truncating torn journal record: {line!r}")
+                    break
+                end += len(line)
+                try:
+                    record: _Record = _json.loads(line)
+                except ValueError:
+                    logger.exc(f"Ignoring unreadable journal record: {line!r}")
+                    continue
+                if record.get("op") == BATCH:
+                    self.__records += len(record["records"])
+                    yield from record["records"]
+                    continue
+                self.__records += 1
+                yield record
+        if end < self.size():
+            with open(path, "r+b") as f:
+                f.truncate(end)
+                durable.sync(f)
+
+    def reset(self) -> None:
+        """
+        Empties the journal. It must only be called once the records it holds have been written into
+        a snapshot.
+        """
+        logger.was_called(self.reset)
+        self.close()
+        if _os.path.exists(self.path):
+            open(self.path, "w").close()
+        self.__records = 0
+
+    def close(self) -> None:
+        "Closes the append handle of the journal file, if it is open."
+        if self.__handle is not None:
+            self.__handle.close()
+            self.__handle = None
+
+    def size(self) -> int:
+        """
+        Returns the size of the journal file in bytes.
+
+        @return The size of the journal file, or 0 if it does not exist.
+        """
+        try:
+            return _os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def records(self) -> int:
+        """
+        Returns the number of records appended or replayed since the last reset.
+
+        @return The number of journal records.
+        """
+        return self.__records
+
+
+__journal: Journal = Journal()
+
+
+def append(record: _Record) -> int:
+    "Appends a record to the journal of `JsonStorage` (see `Journal.append`)."
+    return __journal.append(record)
+
+
+def extend(records: List[_Record]) -> int:
+    "Appends a batch of records to the journal of `JsonStorage` (see `Journal.extend`)."
+    return __journal.extend(records)
+
+
+def replay() -> Iterator[_Record]:
+    "Yields the records of the journal of `JsonStorage` (see `Journal.replay`)."
+    return __journal.replay()
+
+
+def reset() -> None:
+    "Empties the journal of `JsonStorage` (see `Journal.reset`)."
+    __journal.reset()
+
+
+def size() -> int:
+    "Returns the size of the journal of `JsonStorage` in bytes (see `Journal.size`)."
+    return __journal.size()
+
+
+def records() -> int:
+    "Returns the number of records of the journal of `JsonStorage` (see `Journal.records`)."
+    return __journal.records()
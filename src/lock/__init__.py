@@ -0,0 +1,100 @@
+__all__ = ["FileLock"]
+
+from typing import IO, Any
+
+from src.logger import logger as logger
+
+try:
+    import fcntl as _fcntl
+except ImportError:  # Windows
+    _fcntl = None
+    import msvcrt as _msvcrt
+
+
+class FileLock:
+    """
+    The class `FileLock` is an exclusive lock shared by every process opening the same file, taken
+    with `flock` (or `msvcrt.locking` on Windows) and released when the process exits. The locked
+    file also holds a version stamp: a number the holder of the lock bumps each time it writes the
+    data the lock protects, so a process can tell whether the data changed since it last read it.
+    The lock is reentrant within a process.
+    """
+
+    def __init__(self, path: str):
+        """
+        Creates the lock, without taking it.
+
+        @param path The `path` parameter is the path of the lock file, created if needed.
+        """
+        logger.was_called(FileLock, path)
+        self.path: str = path
+        self.__handle: IO[str] | None = None
+        self.__depth: int = 0
+
+    def __enter__(self) -> "FileLock":
+        if self.__depth == 0:
+            handle: IO[str] = open(self.path, "a+", encoding="ascii")
+            try:
+                if _fcntl is not None:
+                    _fcntl.flock(handle.fileno(), _fcntl.LOCK_EX)
+                else:
+                    handle.seek(0)
+                    # LK_LOCK gives up after 10 attempts, one second apart; keep waiting.
+                    while True:
+                        try:
+                            _msvcrt.locking(handle.fileno(), _msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+            except BaseException:
+                handle.close()
+                raise
+            self.__handle = handle
+        self.__depth += 1
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.__depth -= 1
+        if self.__depth or self.__handle is None:
+            return
+        handle: IO[str] = self.__handle
+        self.__handle = None
+        try:
+            if _fcntl is not None:
+                _fcntl.flock(handle.fileno(), _fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                _msvcrt.locking(handle.fileno(), _msvcrt.LK_UNLCK, 1)
+        finally:
+            handle.close()
+
+    def __held(self) -> IO[str]:
+        "Returns the handle of the lock file, raising RuntimeError if the lock is not held."
+        if self.__handle is None:
+            raise RuntimeError(f"The lock {self.path} is not held.")
+        return self.__handle
+
+    def version(self) -> int:
+        """
+        Reads the version stamp. The lock must be held.
+
+        @return The version stamp, 0 if none was written yet.
+        """
+        handle: IO[str] = self.__held()
+        handle.seek(0)
+        text: str = handle.read().strip()
+        return int(text) if text.isdigit() else 0
+
+    def bump(self) -> int:
+        """
+        Increments the version stamp. The lock must be held.
+
+        @return The new version stamp.
+        """
+        version: int = self.version() + 1
+        handle: IO[str] = self.__held()
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(version))
+        handle.flush()
+        return version
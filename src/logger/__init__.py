@@ -1,23 +1,60 @@
 import os
 from typing import Any, Callable, List
+import atexit
 import logging
-import traceback as tb
+import queue
 
 import src.const as const
 
+LEVELS: List[str] = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+
+def _queue_handler(records: "queue.SimpleQueue[logging.LogRecord]") -> logging.Handler:
+    """
+    The function `_queue_handler` returns the `logging.handlers.QueueHandler` handing log records
+    to the background writer thread. Its `prepare` formats the message and arguments of a record in
+    the calling thread, once the level check has passed, so the writer thread never reads objects
+    the caller may still change.
+
+    @param records The `records` parameter is the queue read by the writer thread.
+
+    @return The function returns the handler.
+    """
+    # Imported here so that other commands do not pay for importing it.
+    import logging.handlers
+
+    class _QueueHandler(logging.handlers.QueueHandler):
+        def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+            "Formats the message of a record in place; no other handler reads it unformatted."
+            record.message = record.msg = self.format(record)
+            record.args = record.exc_info = record.exc_text = record.stack_info = None
+            return record
+
+    return _QueueHandler(records)
+
 
 class __Logger:
-    "The class `__Logger` initializes a logger object, deletes old log files, and configures logging settings."
+    """
+    The class `__Logger` initializes a logger object, deletes old log files, and configures logging
+    settings on first use. Records are formatted by the caller, then handed to a queue and written
+    to the log file by a background thread, so callers never wait on disk I/O. Function call tracing
+    (`was_called`, `returned`) is logged at the DEBUG level and costs a single level check when that
+    level is disabled.
+    """
 
     def __init__(self) -> None:
-        "Initializes a logger object, deletes old log files, and configures logging settings."
-        # Delete the oldest files.
-        log_path: str = const.LOGGER_PATH
-        log_file: str = const.LOGGER_FILE
-
-        # Start the logger
+        "Initializes a logger object. The log file is only set up when the first message is logged."
         self.__log: logging.Logger = logging.getLogger(__name__)
-        self.__log.setLevel(logging.DEBUG)
+        self.__started: bool = False
+        self.set_level(os.environ.get("BUDGET_LOG_LEVEL", "INFO"))
+
+    def __start(self) -> None:
+        "Deletes old log files, and configures the log file and its writer thread."
+        import logging.handlers
+
+        self.__started = True
+        log_path: str = const.LOGGER_PATH
+        log_file: str = const.ensure_parent(const.LOGGER_FILE)
 
         # Delete the oldest files.
         files: List[str] = os.listdir(log_path)
@@ -34,10 +71,22 @@ class __Logger:
             "%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
         )
         logger_handler.setFormatter(formatter)
-        # Add the handler to the logger
-        self.__log.addHandler(logger_handler)
+        # Write the records from a background thread, add the queue handler to the logger
+        records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        self.__listener = logging.handlers.QueueListener(records, logger_handler)
+        self.__listener.start()
+        atexit.register(self.__listener.stop)
+        self.__log.addHandler(_queue_handler(records))
         self.info("Logger started.")
 
+    def set_level(self, level: str) -> None:
+        """
+        Sets the minimum level of the messages written to the log file.
+
+        @param level The `level` parameter is one of `LEVELS`, e.g. "DEBUG" to trace every call.
+        """
+        self.__log.setLevel(level.upper())
+
     def __func_at(self, c: Callable[..., Any]) -> str:
         """
         The method `__func_at` returns a string representing the name and memory location of a given callable object.
@@ -55,6 +104,8 @@ class __Logger:
 
         @param s The `s` parameter is a string containing the message to be logged.
         """
+        if not self.__started:
+            self.__start()
         self.__log.info(s)
 
     def exc(
@@ -67,6 +118,10 @@ class __Logger:
         @param c The `c` parameter is a callable object associated with the exception (if any).
         @param default The `default` parameter is a boolean flag indicating whether the exception is unhandled.
         """
+        import traceback as tb
+
+        if not self.__started:
+            self.__start()
         if default:
             self.__log.warning(
                 f"Unhandled exception raised in {self.__func_at(c)}:\n{tb.format_exc()}"
@@ -76,31 +131,51 @@ class __Logger:
 
     def was_called(self, c: Callable[..., Any], *data: Any) -> None:
         """
-        Logs a message indicating that a function was called, along with any associated data.
+        Logs a message indicating that a function was called, along with any associated data. The
+        message is only formatted if the DEBUG level is enabled.
 
         @param c The `c` parameter is a callable object representing the function that was called.
         @param data The `data` parameter is a variable-length list of data passed to the function.
         """
-        self.info(
-            f"Function {self.__func_at(c)} was called"
-            + (f" with the following data:\n{data}" if data != () else ".")
-        )
+        if not self.__log.isEnabledFor(logging.DEBUG):
+            return
+        if not self.__started:
+            self.__start()
+        if data:
+            self.__log.debug(
+                "Function '%s' at <%d> was called with the following data:\n%s",
+                c.__name__,
+                id(c),
+                data,
+            )
+            return
+        self.__log.debug("Function '%s' at <%d> was called.", c.__name__, id(c))
 
-    def returned(self, c: Callable[..., Any], *args: Any) -> None:
+    def returned(self, c: Callable[..., Any], *args: Any) -> Any:
         """
         Logs a message indicating that a function returned a value.
 
         @param c The `c` parameter is a callable object representing the function that returned a value.
         @param args The `args` parameter is a variable-length list of arguments passed to the function.
+
+        @return The value returned by the function.
         """
         val: Any = None
         if args:
             val = c(*args)
         else:
             val = c()
-        self.info(
-            f"Function {self.__func_at(c)} returned: {val} ({type(val).__name__})"
-        )
+        if self.__log.isEnabledFor(logging.DEBUG):
+            if not self.__started:
+                self.__start()
+            self.__log.debug(
+                "Function '%s' at <%d> returned: %s (%s)",
+                c.__name__,
+                id(c),
+                val,
+                type(val).__name__,
+            )
+        return val
 
 
 logger = __Logger()
@@ -7,15 +7,89 @@ __all__ = [
     "PRT_INIT_ITEM_NOT_FOUND",
     "PRT_INIT_REGISTER_REGISTERED_SUCCESSFULLY",
     "PRT_INIT_SEARCH_ITEM_FOUND",
+    "PRT_INIT_SEARCH_RESULTS",
+    "PRT_INIT_SEARCH_RESULT",
     "PRT_INIT_EDIT_ITEM_EDITED_SUCCESSFULLY",
     "PRT_INIT_DELETED_ITEM_DELETED_SUCCESSFULLY",
+    "PRT_INIT_AMOUNT_OUT_OF_RANGE",
+    "PRT_INIT_RUN_UNKNOWN_COMMAND",
+    "PRT_INIT_RUN_FAILED_LINE",
+    "PRT_INIT_RUN_SUMMARY",
+    "PRT_INIT_RUN_NOT_ATOMIC",
+    "PRT_INIT_TRANSACTION_INVALID_NAME",
+    "PRT_INIT_TRANSACTION_INVALID_AMOUNT",
+    "PRT_INIT_TRANSACTION_OPERATION",
+    "PRT_INIT_TRANSACTION_REJECTED",
+    "PRT_INIT_TRANSACTION_COMMITTED",
+    "PRT_INIT_IMPORT_UNKNOWN_FORMAT",
+    "PRT_INIT_IMPORT_PROGRESS",
+    "PRT_INIT_IMPORT_SKIPPED",
+    "PRT_INIT_EXPORT_UNKNOWN_FORMAT",
+    "PRT_INIT_EXPORT_UNKNOWN_SORT",
+    "PRT_INIT_EXPORT_EXPORTED",
+    "PRT_INIT_MIGRATE_SAME_STORAGE",
+    "PRT_INIT_MIGRATE_MIGRATED_SUCCESSFULLY",
+    "PRT_INIT_RESHARD_JSON_ONLY",
+    "PRT_INIT_RESHARD_RESHARDED",
+    "PRT_INIT_SUMMARY",
+    "PRT_INIT_SUMMARY_EMPTY",
+    "PRT_INIT_SUMMARY_VERIFIED",
+    "PRT_INIT_SUMMARY_MISMATCH",
+    "PRT_INIT_LIST_EMPTY",
+    "PRT_INIT_LIST_PAGE",
+    "PRT_INIT_LIST_ROW",
+    "PRT_INIT_CATEGORIES",
+    "PRT_INIT_CATEGORY",
+    "PRT_INIT_CATEGORY_ITEMS",
+    "PRT_INIT_CATEGORY_MORE_ITEMS",
+    "PRT_INIT_CATEGORY_NOT_FOUND",
+    "PRT_INIT_HISTORY_EMPTY",
+    "PRT_INIT_HISTORY_ROLLUPS",
+    "PRT_INIT_HISTORY_ROLLUP",
+    "PRT_INIT_HISTORY_PERIOD",
+    "PRT_INIT_HISTORY_TRANSACTION",
+    "PRT_INIT_HISTORY_INVALID_PERIOD",
+    "PRT_INIT_SERVE_LISTENING",
+    "PRT_INIT_SERVE_INVALID_REQUEST",
+    "PRT_INIT_SERVE_UNKNOWN_OP",
+    "PRT_INIT_SERVE_INVALID_ARGUMENT",
+    "PRT_INIT_STATS",
+    "PRT_INIT_STATS_EMPTY",
+    "PRT_INIT_STATS_RESET",
+    "PRT_INIT_STATS_PROFILE_SAVED",
+    "PRT_INIT_UNDO_NOTHING",
+    "PRT_INIT_UNDO_UNDONE",
+    "PRT_INIT_UNDO_CONFLICT",
+    "PRT_INIT_REDO_NOTHING",
+    "PRT_INIT_REDO_REDONE",
+    "PRT_INIT_RULE_TOTAL",
+    "PRT_INIT_RULE_ITEM",
+    "PRT_INIT_RULE_CATEGORY",
+    "PRT_INIT_RULE_SHARE",
+    "PRT_INIT_RULES",
+    "PRT_INIT_RULES_EMPTY",
+    "PRT_INIT_RULES_RULE",
+    "PRT_INIT_RULES_ADDED",
+    "PRT_INIT_RULES_REMOVED",
+    "PRT_INIT_RULES_NOT_FOUND",
+    "PRT_INIT_RULES_UNKNOWN_KIND",
+    "PRT_INIT_RULES_INVALID_TARGET",
+    "PRT_INIT_RULES_INVALID_LIMIT",
+    "PRT_INIT_RULES_RESPECTED",
     "INP_ENTER_MAIN_MENU_CHOICE",
     "INP_INIT_REGISTER_HANDLER_ITEM_NAME",
     "INP_INIT_REGISTER_HANDLER_ITEM_AMOUNT",
+    "INP_INIT_REGISTER_HANDLER_ITEM_CATEGORY",
     "INP_INIT_SEARCH_HANDLER_ITEM_TO_SEARCH",
+    "INP_INIT_SEARCH_HANDLER_PAGE",
     "INP_INIT_EDIT_HANDLER_ITEM_TO_EDIT",
     "INP_INIT_EDIT_HANDLER_NEW_ITEM_AMOUNT",
+    "INP_INIT_EDIT_HANDLER_NEW_ITEM_CATEGORY",
     "INP_INIT_DELETED_HANDLER_ITEM_TO_DELETE",
+    "INP_INIT_LIST_HANDLER_PAGE",
+    "INP_INIT_CATEGORIES_HANDLER_CATEGORY",
+    "INP_INIT_HISTORY_HANDLER_PERIOD",
+    "INP_INIT_APPLY_HANDLER_SCRIPT",
 ]
 
 # Prefixes:
@@ -23,10 +97,14 @@ __all__ = [
 # INP = INPUT MESSAGES, RETURNS: input(f"{s}\n> ")
 # INIT = String that is within ('init'ialized) in a function.
 
+import time as _time
 from typing import Callable, Tuple, Any
 
 _single_injector = Callable[[Any], str]
 _double_injector = Callable[[Tuple[Any, Any]], str]
+_triple_injector = Callable[[Tuple[Any, Any, Any]], str]
+_quadruple_injector = Callable[[Tuple[Any, Any, Any, Any]], str]
+_quintuple_injector = Callable[[Tuple[Any, Any, Any, Any, Any]], str]
 
 PRT_MAIN_MENU: str = (
     "Budget Tracking System\n"
@@ -34,7 +112,14 @@ PRT_MAIN_MENU: str = (
     "2. Find Item\n"
     "3. Update Item\n"
     "4. Remove Item\n"
-    "5. Exit\n"
+    "5. Summary\n"
+    "6. Categories\n"
+    "7. History\n"
+    "8. Undo\n"
+    "9. Redo\n"
+    "10. List Items\n"
+    "11. Apply Changes\n"
+    "12. Exit\n"
 )
 PRT_OPERATION_CANCELED: str = "Action canceled."
 PRT_ERROR: str = "Oops! Something went wrong. Please try again."
@@ -53,21 +138,249 @@ PRT_INIT_REGISTER_REGISTERED_SUCCESSFULLY: _single_injector = (
 PRT_INIT_SEARCH_ITEM_FOUND: _double_injector = (
     lambda s: f"Found item:\nName: '{s[0]}', Amount: '{s[1]}'."
 )
+PRT_INIT_SEARCH_RESULTS: _quadruple_injector = (
+    lambda s: f"Found {s[0]} item(s) matching '{s[1]}' (page {s[2]} of {s[3]}):"
+)
+PRT_INIT_SEARCH_RESULT: _double_injector = (
+    lambda s: f"  Name: '{s[0]}', Amount: '{s[1]}'."
+)
 PRT_INIT_EDIT_ITEM_EDITED_SUCCESSFULLY: _double_injector = (
     lambda s: f"Item '{s[0]}' updated successfully. New amount: '{s[1]}'."
 )
 PRT_INIT_DELETED_ITEM_DELETED_SUCCESSFULLY: _single_injector = (
     lambda s: f"Item(s) '{s}' deleted successfully."
 )
+PRT_INIT_AMOUNT_OUT_OF_RANGE: _single_injector = (
+    lambda s: f"Amounts must be less than {s:,} in absolute value."
+)
+PRT_INIT_RUN_UNKNOWN_COMMAND: _single_injector = (
+    lambda s: f"Unknown command '{s}'. Expected register, search, find, edit, delete,"
+    " summary, categories, category, history, undo or redo."
+)
+PRT_INIT_RUN_FAILED_LINE: _double_injector = lambda s: f"Line {s[0]}: {s[1]}"
+PRT_INIT_RUN_SUMMARY: _triple_injector = (
+    lambda s: f"Processed {s[0]} command(s) ({s[1]} failed) in {s[2]:.2f}s"
+    f" ({s[0] / max(s[2], 1e-9):,.0f} commands/s)."
+)
+PRT_INIT_RUN_NOT_ATOMIC: _single_injector = (
+    lambda s: f"'{s}' cannot be part of an atomic script. Expected register, edit or delete."
+)
+PRT_INIT_TRANSACTION_INVALID_NAME: str = "The name of an item cannot be empty."
+PRT_INIT_TRANSACTION_INVALID_AMOUNT: _single_injector = (
+    lambda s: f"Invalid amount for item '{s}'."
+)
+PRT_INIT_TRANSACTION_OPERATION: _double_injector = lambda s: f"Operation {s[0]}: {s[1]}"
+PRT_INIT_TRANSACTION_REJECTED: _double_injector = (
+    lambda s: f"Nothing was changed: {s[0]} change(s) failed.\n{s[1]}"
+)
+PRT_INIT_TRANSACTION_COMMITTED: _double_injector = (
+    lambda s: f"Committed {s[0]} change(s) at once in {s[1]:.2f}s"
+    f" ({s[0] / max(s[1], 1e-9):,.0f} changes/s)."
+)
+PRT_INIT_IMPORT_UNKNOWN_FORMAT: _single_injector = (
+    lambda s: f"Unknown import format '{s}'. Expected csv or jsonl."
+)
+PRT_INIT_IMPORT_PROGRESS: _triple_injector = (
+    lambda s: f"Read {s[0]:,} row(s), imported {s[1]:,} ({s[2]:,.0f} rows/s)."
+)
+PRT_INIT_IMPORT_SKIPPED: _double_injector = (
+    lambda s: f"Skipped {s[0]:,} invalid row(s) and {s[1]:,} duplicated name(s)."
+)
+PRT_INIT_EXPORT_UNKNOWN_FORMAT: _single_injector = (
+    lambda s: f"Unknown export format '{s}'. Expected csv, jsonl or json."
+)
+PRT_INIT_EXPORT_UNKNOWN_SORT: _single_injector = (
+    lambda s: f"Unknown sort key '{s}'. Expected name or amount."
+)
+PRT_INIT_EXPORT_EXPORTED: _quintuple_injector = (
+    lambda s: f"Exported {s[0]:,} row(s) to '{s[1]}' in {s[2]:.2f}s ({s[3]:,.0f} rows read/s"
+    + (f", merged {s[4]} sorted run(s))." if s[4] else ").")
+)
+PRT_INIT_MIGRATE_SAME_STORAGE: _single_injector = (
+    lambda s: f"The budget is already stored in '{s}'. Pick another --storage to migrate from."
+)
+PRT_INIT_MIGRATE_MIGRATED_SUCCESSFULLY: _double_injector = (
+    lambda s: f"Migrated {s[0]:,} item(s) to '{s[1]}'."
+)
+PRT_INIT_RESHARD_JSON_ONLY: _single_injector = (
+    lambda s: f"Only the JSON storage can be sharded, not '{s}'."
+)
+PRT_INIT_RESHARD_RESHARDED: _double_injector = lambda s: (
+    f"Stored {s[0]:,} item(s) in {s[1]} shard(s)."
+    if s[1] > 1
+    else f"Stored {s[0]:,} item(s) in a single file."
+)
+PRT_INIT_SUMMARY: _single_injector = lambda s: "\n".join(
+    [
+        f"Items: {s['count']:,}, Total: {s['total']:,.2f}, Mean: {s['mean']:,.2f}",
+        f"Smallest: '{s['min'][0]}' ({s['min'][1]:,.2f}),"
+        f" Largest: '{s['max'][0]}' ({s['max'][1]:,.2f})",
+        f"Top {len(s['top'])}:",
+    ]
+    + [
+        f"  {i}. '{name}' ({amount:,.2f})"
+        for i, (name, amount) in enumerate(s["top"], 1)
+    ]
+)
+PRT_INIT_SUMMARY_EMPTY: str = "There are no items yet."
+PRT_INIT_SUMMARY_VERIFIED: str = "The summary matches a full recomputation."
+PRT_INIT_SUMMARY_MISMATCH: _single_injector = (
+    lambda s: f"The summary does not match a full recomputation: {', '.join(s)}."
+)
+PRT_INIT_LIST_EMPTY: str = "There are no items yet."
+PRT_INIT_LIST_PAGE: _quintuple_injector = (
+    lambda s: f"Items {s[0] + 1:,}-{s[1]:,} of {s[2]:,} in alphabetical order"
+    f" (page {s[3]:,} of {s[4]:,}):"
+)
+PRT_INIT_LIST_ROW: _triple_injector = (
+    lambda s: f"  {s[0]:<32} {s[1]:>16,.2f}  {s[2] or '(uncategorized)'}"
+)
+PRT_INIT_CATEGORIES: _single_injector = (
+    lambda s: f"{s:,} categor{'y' if s == 1 else 'ies'} (count, total):"
+)
+PRT_INIT_CATEGORY: _triple_injector = (
+    lambda s: f"  {s[0] or '(uncategorized)'}: {s[1]:,} item(s), {s[2]:,.2f}"
+)
+PRT_INIT_CATEGORY_ITEMS: _single_injector = (
+    lambda s: f"Items in {f'category {s!r}' if s else 'no category'}:"
+)
+PRT_INIT_CATEGORY_MORE_ITEMS: _single_injector = lambda s: f"  ... and {s:,} more."
+PRT_INIT_CATEGORY_NOT_FOUND: _single_injector = (
+    lambda s: f"We couldn't find a category named '{s}'."
+)
+PRT_INIT_HISTORY_EMPTY: str = "No transactions have been recorded yet."
+PRT_INIT_HISTORY_ROLLUPS: _single_injector = (
+    lambda s: f"Transactions per {s} (count, change of the total):"
+)
+PRT_INIT_HISTORY_ROLLUP: _triple_injector = (
+    lambda s: f"  {s[0]}: {s[1]:,} transaction(s), {s[2]:+,.2f}"
+)
+PRT_INIT_HISTORY_PERIOD: _triple_injector = (
+    lambda s: f"{s[1]:,} transaction(s) in {s[0]}, changing the total by {s[2]:+,.2f}."
+)
+PRT_INIT_HISTORY_TRANSACTION: _quintuple_injector = (
+    lambda s: f"  {_time.strftime('%Y-%m-%d %H:%M:%S', _time.localtime(s[0]))}"
+    f" {s[1]} '{s[2]}': {s[3]:,.2f} ({s[4]:+,.2f})"
+)
+PRT_INIT_HISTORY_INVALID_PERIOD: _single_injector = (
+    lambda s: f"Invalid period '{s}'. Use YYYY, YYYY-MM, YYYY-Www, YYYY-MM-DD or FROM..TO."
+)
+PRT_INIT_SERVE_LISTENING: _double_injector = (
+    lambda s: f"Serving the budget on {s[0]}:{s[1]} (JSON lines). Press Ctrl+C to stop."
+)
+PRT_INIT_SERVE_INVALID_REQUEST: str = "Requests must be JSON objects, one per line."
+PRT_INIT_SERVE_UNKNOWN_OP: _single_injector = (
+    lambda s: f"Unknown op {s!r}. Expected register, search, find, edit, delete, summary,"
+    " categories, history, undo, redo or stats."
+)
+PRT_INIT_SERVE_INVALID_ARGUMENT: _single_injector = (
+    lambda s: f"Missing or invalid '{s}' argument."
+)
+PRT_INIT_STATS: _single_injector = lambda s: "\n".join(
+    [
+        f"{'name':<24} {'calls':>9} {'total ms':>11} {'mean us':>10}"
+        f" {'p50 us':>10} {'p99 us':>10} {'max us':>11}"
+    ]
+    + [
+        f"{r[0]:<24} {r[1]:>9,} {r[2]:>11,.2f} {r[3]:>10,.1f}"
+        f" {r[4]:>10,.1f} {r[5]:>10,.1f} {r[6]:>11,.1f}"
+        for r in s
+    ]
+    + ["(p50 and p99 are the upper bounds of power-of-two buckets.)"]
+)
+PRT_INIT_STATS_EMPTY: str = (
+    "No calls have been recorded yet. Run a command with --profile."
+)
+PRT_INIT_STATS_RESET: str = "The recorded calls were forgotten."
+PRT_INIT_STATS_PROFILE_SAVED: _single_injector = (
+    lambda s: f"cProfile statistics saved to '{s}' (python -m pstats {s})."
+)
+PRT_INIT_UNDO_NOTHING: str = "There is nothing to undo."
+PRT_INIT_UNDO_UNDONE: _double_injector = (
+    lambda s: f"Undid the last change to '{s[0]}' ({s[1]} more can be undone)."
+)
+PRT_INIT_UNDO_CONFLICT: _single_injector = (
+    lambda s: f"Item '{s}' was changed elsewhere since; the change was left as it is."
+)
+PRT_INIT_REDO_NOTHING: str = "There is nothing to redo."
+PRT_INIT_REDO_REDONE: _double_injector = (
+    lambda s: f"Redid the change to '{s[0]}' ({s[1]} more can be redone)."
+)
+PRT_INIT_RULE_TOTAL: _double_injector = (
+    lambda s: f"Warning: the total, {s[0]:,.2f}, is over its limit of {s[1]:,.2f}."
+)
+PRT_INIT_RULE_ITEM: _triple_injector = (
+    lambda s: f"Warning: item '{s[0]}', {s[1]:,.2f}, is over its limit of {s[2]:,.2f}."
+)
+PRT_INIT_RULE_CATEGORY: _triple_injector = (
+    lambda s: f"Warning: {f'category {s[0]!r}' if s[0] else 'uncategorized items'} total"
+    f" {s[1]:,.2f}, over the limit of {s[2]:,.2f}."
+)
+PRT_INIT_RULE_SHARE: _triple_injector = (
+    lambda s: f"Warning: {f'category {s[0]!r}' if s[0] else 'uncategorized items'} make"
+    f" {s[1]:.1f}% of the total, over the limit of {s[2]:g}%."
+)
+PRT_INIT_RULES: _single_injector = lambda s: f"{s} budget rule(s):"
+PRT_INIT_RULES_EMPTY: str = "No budget rules have been added yet."
+PRT_INIT_RULES_RULE: _quadruple_injector = lambda s: (
+    f"  {s[0]}. {s[1]}"
+    + (f" '{s[2]}'" if s[2] else "")
+    + (
+        f": at most {s[3]:g}% of the total"
+        if s[1] == "share"
+        else f": at most {s[3]:,.2f}"
+    )
+)
+PRT_INIT_RULES_ADDED: _single_injector = lambda s: f"Rule {s} added."
+PRT_INIT_RULES_REMOVED: _single_injector = lambda s: f"Rule {s} removed."
+PRT_INIT_RULES_NOT_FOUND: _single_injector = (
+    lambda s: f"There is no rule number {s}. Run 'rules' to list them."
+)
+PRT_INIT_RULES_UNKNOWN_KIND: _single_injector = (
+    lambda s: f"Unknown rule kind {s!r}. Expected total, item, category or share."
+)
+PRT_INIT_RULES_INVALID_TARGET: _double_injector = (
+    lambda s: f"Invalid target for a {s[0]} rule. Expected {s[1]}."
+)
+PRT_INIT_RULES_INVALID_LIMIT: _single_injector = (
+    lambda s: f"Invalid limit {s}. Expected a non-negative amount, or a percentage up to 100."
+)
+PRT_INIT_RULES_RESPECTED: str = "Every budget rule is respected."
 
 INP_ENTER_MAIN_MENU_CHOICE: str = "What would you like to do?"
 INP_INIT_REGISTER_HANDLER_ITEM_NAME: str = "\nWhat would you like to name the item?"
 INP_INIT_REGISTER_HANDLER_ITEM_AMOUNT: str = "\nEnter the item's amount."
-INP_INIT_SEARCH_HANDLER_ITEM_TO_SEARCH: str = "\nWhat item are you looking for?"
+INP_INIT_REGISTER_HANDLER_ITEM_CATEGORY: str = (
+    "\nEnter the item's category (optional, press Enter to skip)."
+)
+INP_INIT_SEARCH_HANDLER_ITEM_TO_SEARCH: str = (
+    "\nWhat item are you looking for? (any part of its name, or 'start*')"
+)
+INP_INIT_SEARCH_HANDLER_PAGE: str = (
+    "\nPress Enter for the next page, type a page number, or 'q' to go back."
+)
+INP_INIT_LIST_HANDLER_PAGE: str = (
+    "\nPress Enter for the next page, '-' for the previous one, type a page number, the start of"
+    " a name to jump to it, or 'q' to go back."
+)
 INP_INIT_EDIT_HANDLER_ITEM_TO_EDIT: str = (
     "\nEnter the name of the item you want to update."
 )
 INP_INIT_EDIT_HANDLER_NEW_ITEM_AMOUNT: str = "\nEnter the new amount for the item."
+INP_INIT_EDIT_HANDLER_NEW_ITEM_CATEGORY: str = (
+    "\nEnter the new category ('-' to remove it, press Enter to keep the current one)."
+)
 INP_INIT_DELETED_HANDLER_ITEM_TO_DELETE: str = (
     "\nEnter the name of the item you want to remove."
 )
+INP_INIT_CATEGORIES_HANDLER_CATEGORY: str = (
+    "\nEnter a category to list its items, or press Enter for the totals per category."
+)
+INP_INIT_APPLY_HANDLER_SCRIPT: str = (
+    "\nEnter the path of a script of register, edit and delete commands to apply at once;"
+    " nothing is changed if any of them fails."
+)
+INP_INIT_HISTORY_HANDLER_PERIOD: str = (
+    "\nEnter a period (YYYY, YYYY-MM, YYYY-Www, YYYY-MM-DD or FROM..TO),"
+    " or press Enter for the totals per month."
+)
@@ -0,0 +1,215 @@
+__all__ = [
+    "UNITS_MAX",
+    "scale",
+    "to_units",
+    "to_amount",
+    "quantize",
+    "check_units",
+    "rescale",
+    "parse",
+    "amount",
+    "read",
+    "total",
+]
+
+import functools as _functools
+import math as _math
+import re as _re
+from typing import Any, Sequence
+
+from src.var import var
+from src.messages import PRT_INIT_AMOUNT_OUT_OF_RANGE
+
+# Largest sum NumPy adds up in int64 without overflowing; larger sums use Python integers.
+_INT64_MAX: int = (1 << 63) - 1
+# Largest amount in minor units, in absolute value. Half the int64 range, so that the float an
+# amount is passed around as always converts back to minor units that fit in an `array('q')`.
+UNITS_MAX: int = 1 << 62
+
+
+def scale(precision: int | None = None) -> int:
+    """
+    The function `scale` returns the number of minor units in one unit of amount.
+
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit
+    (default: `var.precision`).
+
+    @return The function returns 10 to the power of the precision, e.g. 100 for cents.
+    """
+    return 10 ** (var.precision if precision is None else precision)
+
+
+def to_units(amount: float, precision: int | None = None) -> int:
+    """
+    The function `to_units` converts an amount to integer minor units, rounding half to even. An
+    amount with no more decimal digits than the precision converts exactly, as the nearest float of
+    a decimal number scaled by a power of ten is much closer to an integer than 0.5.
+
+    @param amount The `amount` parameter is the amount.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit
+    (default: `var.precision`).
+
+    @return The function returns the amount in minor units.
+    """
+    return round(amount * scale(precision))
+
+
+def to_amount(units: int, precision: int | None = None) -> float:
+    """
+    The function `to_amount` converts minor units back to an amount, as the float nearest to the
+    exact decimal value, so `to_units` recovers the same units.
+
+    @param units The `units` parameter is the amount in minor units.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit
+    (default: `var.precision`).
+
+    @return The function returns the amount.
+    """
+    return units / scale(precision)
+
+
+def check_units(units: int, precision: int | None = None) -> int:
+    """
+    The function `check_units` checks that an amount in minor units can be stored.
+
+    @param units The `units` parameter is the amount in minor units.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit
+    (default: `var.precision`).
+
+    @return The function returns the amount in minor units, unchanged.
+
+    @raise ValueError If its absolute value is `UNITS_MAX` or more.
+    """
+    if not -UNITS_MAX < units < UNITS_MAX:
+        raise ValueError(PRT_INIT_AMOUNT_OUT_OF_RANGE(UNITS_MAX // scale(precision)))
+    return units
+
+
+def quantize(amount: float, precision: int | None = None) -> float:
+    """
+    The function `quantize` rounds an amount to the precision of the minor unit, so it can be stored
+    as integer minor units without changing it.
+
+    @param amount The `amount` parameter is the amount.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit
+    (default: `var.precision`).
+
+    @return The function returns the rounded amount.
+
+    @raise ValueError If the amount is not finite or out of range (see `check_units`).
+    """
+    if not _math.isfinite(amount):
+        raise ValueError(PRT_INIT_AMOUNT_OUT_OF_RANGE(UNITS_MAX // scale(precision)))
+    return to_amount(check_units(to_units(amount, precision), precision), precision)
+
+
+def rescale(units: int, source: int, target: int) -> int:
+    """
+    The function `rescale` converts minor units from one precision to another; adding digits is
+    exact, removing digits rounds half to even.
+
+    @param units The `units` parameter is the amount in minor units of the `source` precision.
+    @param source The `source` parameter is the precision `units` are in.
+    @param target The `target` parameter is the precision to convert to.
+
+    @return The function returns the amount in minor units of the `target` precision.
+    """
+    if target >= source:
+        return units * 10 ** (target - source)
+    divisor: int = 10 ** (source - target)
+    quotient, remainder = divmod(units, divisor)
+    if 2 * remainder > divisor or (2 * remainder == divisor and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def parse(text: str, precision: int | None = None) -> int:
+    """
+    The function `parse` reads a decimal number made of digits and at most one decimal point, such
+    as the input `numeric_only` keeps, straight into minor units, rounding half to even. The text is
+    never converted to a float, so no digit within the precision is lost.
+
+    @param text The `text` parameter is the number, e.g. "1234.5".
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit
+    (default: `var.precision`).
+
+    @return The function returns the amount in minor units.
+
+    @raise ValueError If the text is not a decimal number or is out of range (see `check_units`).
+    """
+    digits: int = var.precision if precision is None else precision
+    whole, _, fraction = text.strip().partition(".")
+    if not (whole or fraction) or not (whole + fraction).isdigit():
+        raise ValueError(f"could not convert string to an amount: {text!r}")
+    kept: str = fraction[:digits].ljust(digits, "0")
+    units: int = int(whole + kept) if whole + kept else 0
+    dropped: str = fraction[digits:]
+    if dropped:
+        first, rest = dropped[0], dropped[1:].rstrip("0")
+        if first > "5" or (first == "5" and (rest or units % 2)):
+            units += 1
+    return check_units(units, digits)
+
+
+def amount(text: str) -> float:
+    """
+    The function `amount` parses an amount with `parse` and returns it as a float holding exactly
+    the decimal value at `var.precision`. It is meant to be passed to `numeric_only`.
+
+    @param text The `text` parameter is the number.
+
+    @return The function returns the amount.
+
+    @raise ValueError If the text is not a decimal number or is out of range (see `check_units`).
+    """
+    # Quantized again, as the largest units in range can round up once converted to a float.
+    return quantize(to_amount(parse(text)))
+
+
+def read(text: str) -> float:
+    """
+    The function `read` parses an amount typed or read from a file, keeping only its digits and
+    decimal point first as `numeric_only` does (e.g. "$1,234.50"), but raising instead of returning
+    the `var.limit` sentinel, which a valid amount may equal.
+
+    @param text The `text` parameter is the amount as written.
+
+    @return The function returns the amount (see `amount`).
+
+    @raise ValueError If no number is left, or it is not a decimal number or is out of range.
+    """
+    return amount(_re.sub(r"[^0-9.]", "", text))
+
+
+@_functools.lru_cache(maxsize=None)
+def _numpy() -> Any:
+    "Returns NumPy, or None if it is not installed, trying to import it once."
+    try:
+        # Imported here so that other commands do not pay for importing it.
+        import numpy
+
+        return numpy
+    except ImportError:
+        return None
+
+
+def total(units: Sequence[int]) -> int:
+    """
+    The function `total` adds up a column of minor units exactly. When NumPy is installed and the
+    column supports the buffer protocol (e.g. an `array('q')`), it is summed in int64 without copying
+    it, unless the sum could overflow; otherwise Python integers are used, which never overflow.
+
+    @param units The `units` parameter is the column of amounts in minor units.
+
+    @return The function returns the sum, in minor units.
+    """
+    np: Any = _numpy()
+    if np is not None and len(units):
+        try:
+            column: Any = np.frombuffer(units, dtype=np.int64)
+        except (TypeError, ValueError):
+            return sum(units)
+        largest: int = max(abs(int(column.max())), abs(int(column.min())))
+        if largest * len(column) <= _INT64_MAX:
+            return int(column.sum())
+    return sum(units)
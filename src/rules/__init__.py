@@ -0,0 +1,235 @@
+__all__ = ["KINDS", "EVERY", "Rule", "RuleSet", "load", "save", "validate"]
+
+import json as _json
+import math as _math
+import os as _os
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import src.const as const
+from src.logger import logger as logger
+from src.messages import *
+from src.aggregates import RunningSum
+
+_Row = Tuple[str, float, str]
+_State = Tuple[float, str]
+# (kind, target, limit)
+Rule = Tuple[str, str, float]
+
+# Kinds of rules, and what their target is.
+KINDS: Dict[str, str] = {
+    "total": "no target: the total of the budget",
+    "item": "an item name, or '*' for every item",
+    "category": "a category, or '*' for every category",
+    "share": "a category, whose total is limited to a percentage of the budget total",
+}
+# Target of the item and category rules applying to every item or category.
+EVERY: str = "*"
+
+
+def validate(kind: str, target: str, limit: float) -> Rule:
+    """
+    The function `validate` checks a rule before it is added.
+
+    @param kind The `kind` parameter is one of `KINDS`.
+    @param target The `target` parameter is what the rule applies to (see `KINDS`).
+    @param limit The `limit` parameter is the largest amount allowed, or percentage for "share".
+
+    @return The function returns the rule as a (kind, target, limit) tuple.
+
+    @raise ValueError If the kind is unknown, the target does not fit the kind or the limit is not a
+    finite, non-negative number (at most 100 for "share").
+    """
+    target = target.strip()
+    if kind not in KINDS:
+        raise ValueError(PRT_INIT_RULES_UNKNOWN_KIND(kind))
+    if (kind == "total") != (not target) or (kind == "share" and target == EVERY):
+        raise ValueError(PRT_INIT_RULES_INVALID_TARGET((kind, KINDS[kind])))
+    if not _math.isfinite(limit) or limit < 0 or (kind == "share" and limit > 100):
+        raise ValueError(PRT_INIT_RULES_INVALID_LIMIT(limit))
+    return kind, target, float(limit)
+
+
+def load() -> List[Rule]:
+    """
+    The function `load` reads the rules saved in `const.RULES_FILE`.
+
+    @return The function returns the list of rules, empty if none were saved yet.
+    """
+    logger.was_called(load)
+    if not _os.path.exists(const.RULES_FILE):
+        return []
+    with open(const.RULES_FILE, "r", encoding="utf-8") as f:
+        return [
+            (str(rule["kind"]), str(rule["target"]), float(rule["limit"]))
+            for rule in _json.load(f)
+        ]
+
+
+def save(rules: List[Rule]) -> None:
+    """
+    The function `save` writes the rules to `const.RULES_FILE`, removing it when there are none.
+
+    @param rules The `rules` parameter is the list of rules.
+    """
+    logger.was_called(save, len(rules))
+    if not rules:
+        if _os.path.exists(const.RULES_FILE):
+            _os.remove(const.RULES_FILE)
+        return
+    with open(const.ensure_parent(const.RULES_FILE), "w", encoding="utf-8") as f:
+        _json.dump(
+            [{"kind": k, "target": t, "limit": limit} for k, t, limit in rules],
+            f,
+            indent=2,
+        )
+
+
+class RuleSet:
+    """
+    The class `RuleSet` checks the rules of the budget as items change, without reading the items
+    again. Rules are indexed by kind and target, and the budget total and the total of every
+    category are kept as `RunningSum`s, so a change only evaluates the rules it can affect: the
+    total caps, the caps of the item and of its old and new categories, and the share rules, whose
+    percentage moves with the total. A rule warns when a change leaves it exceeded and made its
+    value grow, so changes that reduce an exceeded value do not repeat the warning.
+    """
+
+    def __init__(self, rules: Iterable[Rule], rows: Callable[[], Iterable[_Row]]):
+        """
+        Indexes the rules and, if any of them depends on totals, computes the totals.
+
+        @param rules The `rules` parameter is an iterable of (kind, target, limit) tuples.
+        @param rows The `rows` parameter returns an iterable of the (name, amount, category) tuples
+        of every item; it is only called if there are total, category or share rules.
+        """
+        logger.was_called(RuleSet)
+        self.__total_caps: List[float] = []
+        self.__item_caps: Dict[str, List[float]] = {}
+        self.__category_caps: Dict[str, List[float]] = {}
+        self.__shares: Dict[str, List[float]] = {}
+        self.count: int = 0
+        for kind, target, limit in rules:
+            self.count += 1
+            if kind == "total":
+                self.__total_caps.append(limit)
+            elif kind == "item":
+                self.__item_caps.setdefault(target, []).append(limit)
+            elif kind == "category":
+                self.__category_caps.setdefault(target, []).append(limit)
+            elif kind == "share":
+                self.__shares.setdefault(target, []).append(limit)
+        self.__total: RunningSum = RunningSum()
+        self.__categories: Dict[str, RunningSum] = {}
+        self.__tracked: bool = bool(
+            self.__total_caps or self.__category_caps or self.__shares
+        )
+        if self.__tracked:
+            for _, amount, category in rows():
+                self.__add(category, amount)
+
+    def __add(self, category: str, amount: float) -> None:
+        "Adds an amount to the total and to the total of its category."
+        self.__total.add(amount)
+        total: RunningSum | None = self.__categories.get(category)
+        if total is None:
+            total = self.__categories[category] = RunningSum()
+        total.add(amount)
+
+    def __category_total(self, category: str) -> float:
+        total: RunningSum | None = self.__categories.get(category)
+        return 0.0 if total is None else total.value
+
+    def apply(
+        self, name: str, before: _State | None, after: _State | None
+    ) -> List[str]:
+        """
+        Updates the totals after an item was registered (no `before`), edited or deleted (no
+        `after`), and evaluates the rules the change affects.
+
+        @param name The `name` parameter is the name of the item.
+        @param before The `before` parameter is the (amount, category) of the item before the change.
+        @param after The `after` parameter is the (amount, category) of the item after the change.
+
+        @return The warnings of the rules the change left exceeded, empty if there are none.
+        """
+        warnings: List[str] = []
+        if after is not None:
+            old: float = before[0] if before is not None else 0.0
+            for target in (name, EVERY):
+                for limit in self.__item_caps.get(target, ()):
+                    if after[0] > limit and after[0] > old:
+                        warnings.append(PRT_INIT_RULE_ITEM((name, after[0], limit)))
+        if not self.__tracked:
+            return warnings
+
+        total_before: float = self.__total.value
+        touched: Dict[str, float] = {}
+        for state in (before, after):
+            if state is not None and state[1] not in touched:
+                touched[state[1]] = self.__category_total(state[1])
+        if before is not None:
+            self.__add(before[1], -before[0])
+        if after is not None:
+            self.__add(after[1], after[0])
+        total: float = self.__total.value
+
+        for limit in self.__total_caps:
+            if total > limit and total > total_before:
+                warnings.append(PRT_INIT_RULE_TOTAL((total, limit)))
+        for category, old in touched.items():
+            value: float = self.__category_total(category)
+            if value <= old:
+                continue
+            for target in (category, EVERY):
+                for limit in self.__category_caps.get(target, ()):
+                    if value > limit:
+                        warnings.append(
+                            PRT_INIT_RULE_CATEGORY((category, value, limit))
+                        )
+        if total > 0 and self.__shares:
+            for category, limits in self.__shares.items():
+                value = self.__category_total(category)
+                share: float = 100 * value / total
+                old = touched.get(category, value)
+                old_share: float = 100 * old / total_before if total_before > 0 else 0
+                for limit in limits:
+                    if share > limit and share > old_share:
+                        warnings.append(PRT_INIT_RULE_SHARE((category, share, limit)))
+        return warnings
+
+    def check(self, rows: Iterable[_Row]) -> List[str]:
+        """
+        Evaluates every rule against the whole budget, e.g. after the rules changed.
+
+        @param rows The `rows` parameter is an iterable of the (name, amount, category) tuples of
+        every item; it is only read for the item rules.
+
+        @return The warnings of every exceeded rule.
+        """
+        logger.was_called(self.check)
+        warnings: List[str] = []
+        if self.__item_caps:
+            every: List[float] = self.__item_caps.get(EVERY, [])
+            for name, amount, _ in rows:
+                for limit in every + self.__item_caps.get(name, []):
+                    if amount > limit:
+                        warnings.append(PRT_INIT_RULE_ITEM((name, amount, limit)))
+        total: float = self.__total.value
+        for limit in self.__total_caps:
+            if total > limit:
+                warnings.append(PRT_INIT_RULE_TOTAL((total, limit)))
+        for category in sorted(self.__categories):
+            value: float = self.__category_total(category)
+            for target in (category, EVERY):
+                for limit in self.__category_caps.get(target, ()):
+                    if value > limit:
+                        warnings.append(
+                            PRT_INIT_RULE_CATEGORY((category, value, limit))
+                        )
+        if total > 0:
+            for category, limits in self.__shares.items():
+                share: float = 100 * self.__category_total(category) / total
+                for limit in limits:
+                    if share > limit:
+                        warnings.append(PRT_INIT_RULE_SHARE((category, share, limit)))
+        return warnings
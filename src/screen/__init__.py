@@ -0,0 +1,194 @@
+__all__ = ["Screen", "screen"]
+
+import os as _os
+import sys as _sys
+from typing import IO, List, Tuple
+
+_HOME_CLEAR: str = "\x1b[H\x1b[2J"
+_CLEAR_LINE: str = "\x1b[K"
+_CLEAR_BELOW: str = "\x1b[J"
+# Size assumed when it cannot be queried.
+_DEFAULT_SIZE: Tuple[int, int] = (80, 24)
+
+
+def _move(row: int, column: int = 0) -> str:
+    "Returns the escape sequence moving the cursor to a row and column, both counted from 0."
+    return f"\x1b[{row + 1};{column + 1}H"
+
+
+def _enable_vt(stream: IO[str]) -> bool:
+    """
+    The function `_enable_vt` turns on the interpretation of escape sequences by the Windows
+    console, which is off by default.
+
+    @param stream The `stream` parameter is the console output stream.
+
+    @return The function returns True if the console interprets escape sequences.
+    """
+    if _os.name != "nt":
+        return True
+    try:
+        import ctypes
+        import msvcrt
+
+        kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        handle = msvcrt.get_osfhandle(stream.fileno())  # type: ignore[attr-defined]
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except (AttributeError, ImportError, OSError):
+        return False
+
+
+class Screen:
+    """
+    The class `Screen` draws the interactive menu in the terminal with ANSI escape sequences instead
+    of clearing it with an external command. Output is collected into a frame, a list of lines drawn
+    from the top of the screen; each time it is drawn, only the lines that differ from the ones
+    already on the screen are rewritten. Lines are cut at the width of the terminal so that each
+    takes a single row, and a frame taller than the terminal shows its last rows. When the output is
+    not a terminal, text is printed as it comes.
+    """
+
+    def __init__(self, stream: IO[str] | None = None):
+        """
+        Creates a screen.
+
+        @param stream The `stream` parameter is the stream to draw on (default: `sys.stdout` at the
+        time of drawing).
+        """
+        self.__output: IO[str] | None = stream
+        self.__ansi: bool | None = None
+        self.__frame: List[str] = []
+        # The rows on the terminal, or None if it holds output the screen did not draw.
+        self.__shown: List[str] | None = None
+        self.__size: Tuple[int, int] = _DEFAULT_SIZE
+
+    @property
+    def __stream(self) -> IO[str]:
+        return self.__output or _sys.stdout
+
+    @property
+    def ansi(self) -> bool:
+        "Whether the stream is a terminal that interprets escape sequences, checked on first use."
+        if self.__ansi is None:
+            isatty = getattr(self.__stream, "isatty", None)
+            self.__ansi = bool(
+                isatty is not None
+                and isatty()
+                and _os.environ.get("TERM") != "dumb"
+                and _enable_vt(self.__stream)
+            )
+        return self.__ansi
+
+    def size(self) -> Tuple[int, int]:
+        """
+        Returns the size of the terminal.
+
+        @return A (columns, rows) tuple.
+        """
+        try:
+            columns, rows = _os.get_terminal_size(self.__stream.fileno())
+        except (AttributeError, ValueError, OSError):
+            return _DEFAULT_SIZE
+        return (columns, rows) if columns and rows else _DEFAULT_SIZE
+
+    def invalidate(self) -> None:
+        "Forgets what is on the terminal, so that the next frame is drawn from a cleared screen."
+        self.__shown = None
+
+    def clear(self) -> None:
+        "Starts a new, empty frame. The terminal is left as it is until the frame is drawn."
+        self.__frame = []
+
+    def add(self, text: str) -> None:
+        """
+        Adds text to the frame and draws the rows it changed, as `print` would show it.
+
+        @param text The `text` parameter is the text to add; it may hold several lines.
+        """
+        if not self.ansi:
+            print(text, file=self.__stream)
+            return
+        self.__frame.extend(text.split("\n"))
+        self.__draw(full=False)
+
+    def ask(self, question: str) -> str:
+        """
+        Adds a question and a "> " prompt to the frame, draws it and reads the answer on the prompt
+        row.
+
+        @param question The `question` parameter is the question; it may hold several lines.
+
+        @return The line typed by the user.
+        """
+        if not self.ansi:
+            return input(f"{question}\n> ")
+        self.__frame.extend(question.split("\n"))
+        self.__frame.append("> ")
+        rows: List[str] = self.__draw(full=True)
+        self.__stream.write(_move(len(rows) - 1, 2))
+        self.__stream.flush()
+        try:
+            answer: str = input()
+        except BaseException:
+            self.invalidate()
+            raise
+        # The answer was echoed on the prompt row. If it wrapped, the rows below are unknown.
+        self.__frame[-1] = f"> {answer}"
+        if self.__shown is not None:
+            if len(self.__frame[-1]) >= self.__size[0]:
+                self.__shown = None
+            else:
+                self.__shown[-1] = self.__frame[-1]
+        return answer
+
+    def finish(self) -> None:
+        "Clears the rows below the frame and moves the cursor after it, before leaving the menu."
+        if not self.ansi or self.__shown is None:
+            return
+        self.__stream.write(_move(len(self.__shown)) + _CLEAR_BELOW)
+        self.__stream.flush()
+        self.__shown = None
+
+    def __draw(self, full: bool) -> List[str]:
+        """
+        Draws the frame, rewriting only the rows that changed.
+
+        @param full The `full` parameter tells whether to also clear the rows left below the frame
+        by a taller one; output still to come in the same frame may overwrite them anyway.
+
+        @return The rows of the frame on the screen.
+        """
+        size: Tuple[int, int] = self.size()
+        width, height = size
+        # One row is kept free, so the line ending the answer to a prompt never scrolls the screen.
+        rows: List[str] = [
+            line[: width - 1] for line in self.__frame[-max(height - 1, 1) :]
+        ]
+        shown: List[str] | None = self.__shown
+        out: List[str] = []
+        if shown is None or size != self.__size:
+            out.append(_HOME_CLEAR)
+            shown = []
+        for row, line in enumerate(rows):
+            if row >= len(shown) or shown[row] != line:
+                out.append(f"{_move(row)}{line}{_CLEAR_LINE}")
+        if full and len(shown) > len(rows):
+            out.append(_move(len(rows)) + _CLEAR_BELOW)
+        elif len(shown) > len(rows):
+            rows = rows + shown[len(rows) :]
+        self.__stream.write("".join(out))
+        self.__stream.flush()
+        self.__size = size
+        self.__shown = rows
+        return rows
+
+
+screen = Screen()
+"""
+The screen of the interactive menu, drawing on stdout. `prt`, `inp` and `clear_terminal` of
+`src.functions` go through it.
+"""
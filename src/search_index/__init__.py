@@ -0,0 +1,203 @@
+__all__ = ["NameIndex"]
+
+import bisect as _bisect
+import gc as _gc
+import heapq as _heapq
+from array import array as _array
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from src.logger import logger as logger
+
+# Marks the start and end of a name, so names shorter than an n-gram still get n-grams.
+_START: str = "\x02"
+_END: str = "\x03"
+_N: int = 3
+
+
+def _fold(name: str) -> str:
+    "Returns the case-insensitive key of a name."
+    return name.casefold()
+
+
+def _ngrams(key: str) -> Set[str]:
+    """
+    The function `_ngrams` returns the n-grams of a key, including the start and end markers.
+
+    @param key The `key` parameter is a folded name.
+
+    @return The function returns the set of n-grams of the key.
+    """
+    padded: str = f"{_START}{key}{_END}"
+    return {padded[i : i + _N] for i in range(len(padded) - _N + 1)}
+
+
+class NameIndex:
+    """
+    The class `NameIndex` answers case-insensitive prefix and substring queries over item names. It
+    keeps the folded names in a sorted list, searched with `bisect` for prefixes, and an inverted
+    index from n-grams to the ids of the names containing them for substrings. Postings are
+    append-only arrays; removed names are tombstoned and the index is rebuilt once they pile up.
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        "Builds the index from the given item names."
+        logger.was_called(NameIndex)
+        self.__build(names)
+
+    def __build(self, names: Iterable[str]) -> None:
+        self.__sorted: List[str] = []
+        self.__names: Dict[str, List[str]] = {}
+        self.__ids: Dict[str, int] = {}
+        self.__keys: List[str] = []
+        self.__postings: Dict[str, _array] = {}
+        self.__removed: Set[int] = set()
+        # Building allocates one list per name; pausing the cyclic collector avoids rescanning them.
+        collecting: bool = _gc.isenabled()
+        _gc.disable()
+        try:
+            for name in names:
+                self.__add(name)
+        finally:
+            if collecting:
+                _gc.enable()
+        self.__sorted.sort()
+
+    def __add(self, name: str) -> bool:
+        key: str = _fold(name)
+        names: List[str] | None = self.__names.get(key)
+        if names is not None:
+            if name not in names:
+                names.append(name)
+            return False
+        self.__names[key] = [name]
+        self.__sorted.append(key)
+        key_id: int = len(self.__keys)
+        self.__ids[key] = key_id
+        self.__keys.append(key)
+        for gram in _ngrams(key):
+            postings: _array | None = self.__postings.get(gram)
+            if postings is None:
+                self.__postings[gram] = postings = _array("I")
+            postings.append(key_id)
+        return True
+
+    def add(self, name: str) -> None:
+        """
+        Adds an item name to the index.
+
+        @param name The `name` parameter is the name of the item.
+        """
+        if self.__add(name):
+            self.__sorted.pop()
+            _bisect.insort(self.__sorted, _fold(name))
+
+    def remove(self, name: str) -> None:
+        """
+        Removes an item name from the index.
+
+        @param name The `name` parameter is the name of the item.
+        """
+        key: str = _fold(name)
+        names: List[str] | None = self.__names.get(key)
+        if names is None or name not in names:
+            return
+        names.remove(name)
+        if names:
+            return
+        del self.__names[key]
+        del self.__sorted[_bisect.bisect_left(self.__sorted, key)]
+        self.__removed.add(self.__ids.pop(key))
+        if len(self.__removed) > max(len(self.__keys) // 4, 1024):
+            self.__build([n for ns in self.__names.values() for n in ns])
+
+    def __prefixed(self, prefix: str, limit: int) -> Tuple[int, List[str]]:
+        start: int = _bisect.bisect_left(self.__sorted, prefix)
+        end: int = _bisect.bisect_left(
+            self.__sorted, prefix[:-1] + chr(ord(prefix[-1]) + 1), start
+        )
+        return end - start, self.__sorted[start : min(end, start + limit)]
+
+    def __containing(self, part: str) -> Iterator[str]:
+        if len(part) >= _N:
+            # Every candidate must hold every n-gram of the query: walk the rarest one.
+            grams: List[_array] = []
+            for i in range(len(part) - _N + 1):
+                postings: _array | None = self.__postings.get(part[i : i + _N])
+                if postings is None:
+                    return
+                grams.append(postings)
+            candidates: Iterable[int] = min(grams, key=len)
+        else:
+            # Shorter queries only appear inside n-grams: merge the postings of those holding it.
+            candidates = {
+                key_id
+                for gram, postings in self.__postings.items()
+                if part in gram
+                for key_id in postings
+            }
+        for key_id in candidates:
+            if key_id in self.__removed:
+                continue
+            key: str = self.__keys[key_id]
+            if part in key:
+                yield key
+
+    def find(self, query: str, limit: int) -> Tuple[int, List[str]]:
+        """
+        Finds the item names matching a query, ignoring case. A query ending with '*' only matches
+        names starting with the rest of the query, in alphabetical order. Any other query matches
+        names containing it, ranked: exact matches first, then prefixes, then matches at the start
+        of a word, then any other substring; ties are broken by match position, length and name.
+
+        @param query The `query` parameter is the text to look for.
+        @param limit The `limit` parameter is the maximum number of names to return.
+
+        @return A tuple with the number of matches and the best `limit` matching item names.
+        """
+        logger.was_called(self.find, query, limit)
+        part: str = _fold(query.rstrip("*"))
+        if not part:
+            return 0, []
+        if query.endswith("*"):
+            total, keys = self.__prefixed(part, limit)
+        else:
+            ranked: List[Tuple[int, int, int, str]] = []
+            for key in self.__containing(part):
+                at: int = key.find(part)
+                rank: int = 0 if key == part else 1 if at == 0 else 3
+                if rank == 3 and not key[at - 1].isalnum():
+                    rank = 2
+                ranked.append((rank, at, len(key), key))
+            total = len(ranked)
+            keys = [match[-1] for match in _heapq.nsmallest(limit, ranked)]
+        names: List[str] = [name for key in keys for name in sorted(self.__names[key])]
+        return total, names[:limit]
+
+    def position(self, text: str) -> int:
+        """
+        Returns where a name would be in alphabetical order, ignoring case.
+
+        @param text The `text` parameter is the name, or the start of one.
+
+        @return The number of folded names sorting before `text`.
+        """
+        return _bisect.bisect_left(self.__sorted, _fold(text))
+
+    def page(self, start: int, count: int) -> List[str]:
+        """
+        Returns a slice of the item names in alphabetical order, ignoring case, without touching the
+        others. Names differing only by case share a position and are returned together.
+
+        @param start The `start` parameter is the position of the first name, from 0 to `len(self)`.
+        @param count The `count` parameter is the number of positions to return.
+
+        @return The item names at those positions.
+        """
+        return [
+            name
+            for key in self.__sorted[start : start + count]
+            for name in sorted(self.__names[key])
+        ]
+
+    def __len__(self) -> int:
+        return len(self.__names)
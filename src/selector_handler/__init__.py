@@ -1,12 +1,16 @@
 __all__ = ["selector"]
 
-from typing import Any, Dict, Callable, Literal, Tuple, Set
+import time as _time
+from typing import Any, Dict, Callable, List, Literal, Tuple, Set
 
 from src.var import var
 from src.functions import *
 from .functions import *
 from src.logger import logger
 from src.messages import *
+from src.stats import timed
+import src.money as _money
+from src.screen import screen
 
 _TupleStrFloatOrNone = Tuple[str, float] | None
 _StrOrNone = str | None
@@ -40,7 +44,7 @@ def __if_empty_do_nothing(*msg: str, skip: bool) -> _IfEmpty:
     values or input data based on the conditions met during the checks. If the input string
     exists and the `skip` flag is `True`, it returns a predefined tuple denoting existence.
     If the input string is empty, it returns default values. If the input float value is
-    either empty or not a valid float, it also returns default values.
+    either empty or not a valid float, it returns `var.limit` as the amount.
     """
     logger.was_called(__if_empty_do_nothing, msg)
     default_values: _IfEmpty = "", 0.0, True, True
@@ -58,11 +62,10 @@ def __if_empty_do_nothing(*msg: str, skip: bool) -> _IfEmpty:
         return default_values
 
     # Input float value.
-    amount_input: float = numeric_only(inp(msg[1]), float)
+    var.extra_message = PRT_OPERATION_CANCELED
+    amount_input: float = numeric_only(inp(msg[1]), _money.amount)
 
-    # Check if float value is empty or not a valid float.
-    if amount_input == var.limit:
-        return default_values
+    # An empty or invalid float value is `var.limit`, with the reason in `var.extra_message`.
     return name_input, amount_input, False, True
 
 
@@ -81,8 +84,9 @@ def __handler(
 
     @return The function `__handler` returns a tuple representing either the result of
     calling the provided function or `None` based on the conditions met during the checks.
-    If the input name does not exist, it returns `None`. If the input is empty or reaches
-    a certain limit, it returns a predefined tuple denoting emptiness.
+    If the input name does not exist or the amount is invalid, it returns `None`, leaving the
+    reason in `var.extra_message`. If the input is empty, it returns a predefined tuple
+    denoting emptiness.
     """
     logger.was_called(__handler, msg)
 
@@ -94,7 +98,7 @@ def __handler(
     if is_empty:
         return __its_empty()
     if amount == var.limit:
-        return __its_empty()
+        return None
     return f(name, amount)
 
 
@@ -122,6 +126,59 @@ def __handler_str_only(
     return f(name_input)
 
 
+def __find_pages(query: str) -> str:
+    """
+    The function `__find_pages` shows the items matching `query` one page at a time, letting the
+    user move between pages, and leaves the last page shown in `var.extra_message`. A single match
+    is shown as an exact search result.
+
+    @param query The `query` parameter is the text to look for.
+
+    @return The function returns the query.
+    """
+    logger.was_called(__find_pages, query)
+    page: int = 1
+    while True:
+        total, items = find(query, page)
+        if total == 0:
+            var.extra_message = PRT_INIT_ITEM_NOT_FOUND(query)
+            return query
+        if total == 1 and items:
+            var.extra_message = PRT_INIT_SEARCH_ITEM_FOUND(items[0])
+            return query
+        pages: int = -(-total // var.search_page_size)
+        var.extra_message = "\n".join(
+            [PRT_INIT_SEARCH_RESULTS((total, query, page, pages))]
+            + [PRT_INIT_SEARCH_RESULT(item) for item in items]
+        )
+        if pages == 1:
+            return query
+        prt(var.extra_message)
+        choice: str = inp(INP_INIT_SEARCH_HANDLER_PAGE).strip()
+        if choice == "":
+            page = page % pages + 1
+        elif choice.isdigit():
+            page = min(max(int(choice), 1), pages)
+        else:
+            return query
+
+
+def __category_input(msg: str) -> _StrOrNone:
+    """
+    The function `__category_input` prompts the user for a category.
+
+    @param msg The `msg` parameter is the message to prompt the user with.
+
+    @return The function returns the category, "" if the user typed '-' or None if the input was
+    left empty.
+    """
+    category: str = inp(msg).strip()
+    if category == "-":
+        return ""
+    return category or None
+
+
+@timed("menu.register")
 def __register_handler() -> _TupleStrFloatOrNone:
     """
     The function `__register_handler` prompts the user to enter an item name and its amount, then registers the item
@@ -134,24 +191,31 @@ def __register_handler() -> _TupleStrFloatOrNone:
     return __handler(
         INP_INIT_REGISTER_HANDLER_ITEM_NAME,
         INP_INIT_REGISTER_HANDLER_ITEM_AMOUNT,
-        f=register,
+        f=lambda name, amount: register(
+            name,
+            amount,
+            __category_input(INP_INIT_REGISTER_HANDLER_ITEM_CATEGORY) or "",
+        ),
     )
 
 
+@timed("menu.search")
 def __search_handler() -> _StrOrNone:
     """
-    The function `__search_handler` prompts the user to enter an item name to search for. It searches for the item
-    with the provided name and returns the name of the item if found.
+    The function `__search_handler` prompts the user to enter (part of) an item name to search for. It lists
+    the matching items, best match first, one page at a time.
 
-    @return The name of the item if found, otherwise an empty string.
+    @return The query, or None if the search was canceled.
     """
     logger.was_called(__search_handler)
     return __handler_str_only(
         INP_INIT_SEARCH_HANDLER_ITEM_TO_SEARCH,
-        f=search,
+        f=__find_pages,
+        check=False,
     )
 
 
+@timed("menu.edit")
 def __edit_handler() -> _TupleStrFloatOrNone:
     """
     The function `__edit_handler` prompts the user to enter an item name and its new amount. It edits the item with
@@ -165,11 +229,14 @@ def __edit_handler() -> _TupleStrFloatOrNone:
     return __handler(
         INP_INIT_EDIT_HANDLER_ITEM_TO_EDIT,
         INP_INIT_EDIT_HANDLER_NEW_ITEM_AMOUNT,
-        f=edit,
+        f=lambda name, amount: edit(
+            name, amount, __category_input(INP_INIT_EDIT_HANDLER_NEW_ITEM_CATEGORY)
+        ),
         skip_existence=True,
     )
 
 
+@timed("menu.delete")
 def __delete_handler() -> _StrOrNone:
     """
     The function `__delete_handler` prompts the user to enter an item name to delete. It deletes the item with the
@@ -184,19 +251,181 @@ def __delete_handler() -> _StrOrNone:
     )
 
 
-__selector_values: Set[str] = {"1", "2", "3", "4"}
+@timed("menu.summary")
+def __summary_handler() -> None:
+    """
+    The function `__summary_handler` shows the summary of the budget: number of items, total, mean,
+    smallest and largest items.
+    """
+    logger.was_called(__summary_handler)
+    totals: Dict[str, Any] = summary()
+    if totals["count"] == 0:
+        var.extra_message = PRT_INIT_SUMMARY_EMPTY
+        return
+    var.extra_message = PRT_INIT_SUMMARY(totals)
+
+
+@timed("menu.categories")
+def __categories_handler() -> None:
+    """
+    The function `__categories_handler` prompts the user for a category and lists its items, the
+    first `var.search_page_size` of them; with no category it shows the number of items and the
+    total amount of every category.
+    """
+    logger.was_called(__categories_handler)
+    category: _StrOrNone = __category_input(INP_INIT_CATEGORIES_HANDLER_CATEGORY)
+    if category is None:
+        groups: List[Tuple[str, int, float]] = categories()
+        var.extra_message = "\n".join(
+            [PRT_INIT_CATEGORIES(len(groups))] + [PRT_INIT_CATEGORY(g) for g in groups]
+        )
+        return
+    items: List[Tuple[str, float]] = category_items(category)
+    if not items:
+        var.extra_message = PRT_INIT_CATEGORY_NOT_FOUND(category)
+        return
+    size: int = var.search_page_size
+    lines: List[str] = [PRT_INIT_CATEGORY_ITEMS(category)]
+    lines += [PRT_INIT_SEARCH_RESULT(item) for item in items[:size]]
+    if len(items) > size:
+        lines.append(PRT_INIT_CATEGORY_MORE_ITEMS(len(items) - size))
+    var.extra_message = "\n".join(lines)
+
+
+@timed("menu.history")
+def __history_handler() -> None:
+    """
+    The function `__history_handler` prompts the user for a period and shows how many transactions
+    it holds, how much they changed the total and the latest `var.search_page_size` of them; with no
+    period it shows the totals of every month.
+    """
+    logger.was_called(__history_handler)
+    period: str = inp(INP_INIT_HISTORY_HANDLER_PERIOD).strip()
+    if not period:
+        months: List[Tuple[str, int, float]] = rollups()
+        if not months:
+            var.extra_message = PRT_INIT_HISTORY_EMPTY
+            return
+        var.extra_message = "\n".join(
+            [PRT_INIT_HISTORY_ROLLUPS("month")]
+            + [PRT_INIT_HISTORY_ROLLUP(month) for month in months]
+        )
+        return
+    try:
+        count, change, transactions = history(period)
+    except ValueError:
+        var.extra_message = PRT_INIT_HISTORY_INVALID_PERIOD(period)
+        return
+    var.extra_message = "\n".join(
+        [PRT_INIT_HISTORY_PERIOD((period, count, change))]
+        + [PRT_INIT_HISTORY_TRANSACTION(t) for t in transactions]
+    )
+
+
+# Rows of the terminal taken by the list screen besides the items: title, prompt and a free row.
+__LIST_CHROME: int = 5
+
+
+@timed("menu.list")
+def __list_handler() -> None:
+    """
+    The function `__list_handler` shows every item in alphabetical order, one page at a time, letting
+    the user move between pages or jump to a name. Pages fill the terminal, and only the items of
+    the page shown are read; moving to another page only redraws the lines that changed. The last
+    page's title is left in `var.extra_message`.
+    """
+    logger.was_called(__list_handler)
+    start: int = 0
+    while True:
+        size: int = max(screen.size()[1] - __LIST_CHROME, 1)
+        total, rows = list_items(start, size)
+        if total == 0:
+            var.extra_message = PRT_INIT_LIST_EMPTY
+            return
+        if not rows:
+            start = max(total - size, 0)
+            continue
+        pages: int = -(-total // size)
+        end: int = min(start + size, total)
+        var.extra_message = PRT_INIT_LIST_PAGE(
+            (start, end, total, -(-end // size), pages)
+        )
+        clear_terminal()
+        prt("\n".join([var.extra_message] + [PRT_INIT_LIST_ROW(r) for r in rows]))
+        choice: str = inp(INP_INIT_LIST_HANDLER_PAGE).strip()
+        if choice == "":
+            start = 0 if end >= total else end
+        elif choice == "-":
+            start = max(start - size, 0)
+        elif choice.isdigit():
+            start = (min(max(int(choice), 1), pages) - 1) * size
+        elif choice.lower() == "q":
+            return
+        else:
+            start = min(list_position(choice), total - 1)
+
+
+@timed("menu.apply")
+def __apply_handler() -> None:
+    """
+    The function `__apply_handler` prompts the user for a script of register, edit and delete
+    commands and applies it atomically, with a single save; if any command fails, nothing is
+    changed and the failed lines are shown.
+    """
+    logger.was_called(__apply_handler)
+    path: str = inp(INP_INIT_APPLY_HANDLER_SCRIPT).strip()
+    if __empty(path):
+        __its_empty()
+        return
+    # Imported here so that other commands do not pay for importing it.
+    from src.batch import apply
+
+    start: float = _time.perf_counter()
+    try:
+        count, warnings = apply(path)
+    except (OSError, ValueError) as e:
+        var.extra_message = str(e)
+        return
+    var.extra_message = "\n".join(
+        [PRT_INIT_TRANSACTION_COMMITTED((count, _time.perf_counter() - start))]
+        + warnings
+    )
+
+
+__selector_values: Set[str] = {
+    "1",
+    "2",
+    "3",
+    "4",
+    "5",
+    "6",
+    "7",
+    "8",
+    "9",
+    "10",
+    "11",
+}
 
 __selector_handler: Dict[str, Callable[[], None]] = {
     "1": lambda: logger.returned(__register_handler),
     "2": lambda: logger.returned(__search_handler),
     "3": lambda: logger.returned(__edit_handler),
     "4": lambda: logger.returned(__delete_handler),
+    "5": lambda: logger.returned(__summary_handler),
+    "6": lambda: logger.returned(__categories_handler),
+    "7": lambda: logger.returned(__history_handler),
+    "8": lambda: logger.returned(undo),
+    "9": lambda: logger.returned(redo),
+    "10": lambda: logger.returned(__list_handler),
+    "11": lambda: logger.returned(__apply_handler),
 }
 """
 The function __selector_handler is a dictionary that maps strings to callable functions, each corresponding
 to a specific action. Each key in the dictionary represents a choice, and its associated value is a
 lambda function. The lambda functions call handler functions (__register_handler, __search_handler, 
-__edit_handler, __delete_handler) passing the input string s as an argument.
+__edit_handler, __delete_handler, __summary_handler,
+__categories_handler, __history_handler, __list_handler, __apply_handler) passing the input string s as an argument;
+undo and redo take no input.
 """
 
 
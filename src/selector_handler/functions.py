@@ -1,61 +1,386 @@
 __all__ = [
     "register",
     "search",
+    "lookup",
     "edit",
     "delete",
     "item_exists",
+    "find",
+    "list_items",
+    "list_position",
+    "reload",
+    "close",
+    "save",
+    "summary",
+    "verify_summary",
+    "categories",
+    "category_items",
+    "rows",
+    "history",
+    "rollups",
+    "undo",
+    "redo",
+    "checkpoint",
+    "revert",
+    "begin",
+    "rollback",
+    "rules",
+    "add_rule",
+    "remove_rule",
+    "check_rules",
 ]
 
-import json as _json
-from typing import List, Dict, Union
+import math as _math
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
 
-_DataList = List[Dict[str, Union[str, float]]]
+_Record = Dict[str, Any]
+_Item = Tuple[str, float]
+_Summary = Dict[str, Any]
+_Group = Tuple[str, int, float]
+_State = Tuple[float, str]
+_Transaction = Tuple[float, str, str, float, float]
+_Rollup = Tuple[str, int, float]
+_Row = Tuple[str, float, str]
+_Step = Tuple[str, _State | None, _State | None]
+_Savepoint = Tuple[int, List[_Step], Tuple[List[_Step], List[_Step]]]
 
-import src.const as const
 from src.var import var
 from src.logger import logger as logger
 from src.messages import *
+from src.storage import Storage, open_storage
+from src.search_index import NameIndex
+from src.aggregates import Aggregates, recompute
+from src.categories import CategoryIndex
+from src.undo import OperationLog
+import src.rules as _rules
+import src.money as _money
+from src.stats import call, timed
 
+if TYPE_CHECKING:
+    import src.history as _history
 
-def __load_data() -> _DataList:
+__storage: Storage | None = None
+__names: NameIndex | None = None
+__totals: Aggregates | None = None
+__groups: CategoryIndex | None = None
+__timeline: "_history.TimeIndex | None" = None
+__operations: OperationLog | None = None
+__limits: _rules.RuleSet | None = None
+__generation: int = 0
+# Changes made since `begin`, oldest first, for `rollback`.
+__recorded: List[_Step] | None = None
+
+
+def __store() -> Storage:
+    """
+    The function __store returns the storage selected by `var.storage`, opening it on first use so
+    that command line options can pick the backend before any data is read.
+
+    @return The function __store returns the opened storage.
+    """
+    global __storage
+    if __storage is None:
+        __storage = open_storage(var.storage)
+    return __storage
+
+
+def __name_index() -> NameIndex:
+    """
+    The function __name_index returns the prefix/substring index over the item names, building it
+    from the storage on first use. It is then kept up to date by `register` and `delete`.
+
+    @return The function __name_index returns the name index.
+    """
+    global __names
+    if __names is None:
+        __names = call(
+            "index.names", NameIndex, (name for name, _ in __store().items())
+        )
+    return __names
+
+
+def __aggregates() -> Aggregates:
+    """
+    The function __aggregates returns the running totals of the budget, computing them from the
+    storage on first use. They are then kept up to date by `register`, `edit` and `delete`.
+
+    @return The function __aggregates returns the aggregates.
+    """
+    global __totals
+    if __totals is None:
+        __totals = call(
+            "index.aggregates", Aggregates, __store().items(), __store().get
+        )
+    return __totals
+
+
+def __category_index() -> CategoryIndex:
+    """
+    The function __category_index returns the index from categories to their items, building it
+    from the storage on first use. It is then kept up to date by `register`, `edit` and `delete`.
+
+    @return The function __category_index returns the category index.
+    """
+    global __groups
+    if __groups is None:
+        __groups = call("index.categories", CategoryIndex, __store().rows())
+    return __groups
+
+
+def __history() -> Any:
+    """
+    The function __history returns the `src.history` module, which only changes and the history
+    commands need.
+
+    @return The function __history returns the module.
+    """
+    # Imported here so that other commands do not pay for importing it.
+    import src.history
+
+    return src.history
+
+
+def __time_index() -> "_history.TimeIndex":
     """
-    The function __load_data loads data from a JSON file, handling file not found or JSON decoding
-    errors by logging an exception and creating an empty JSON file if necessary before attempting to
-    load data again.
+    The function __time_index returns the transaction history sorted by time, loading it on first
+    use from `const.HISTORY_FILE` and its checkpointed index (see `src.history.index`). It is then
+    kept up to date by `register`, `edit` and `delete`.
 
-    @return The function __load_data returns a list containing the data loaded from the JSON file,
-    or an empty list if the file does not exist or is not in JSON format.
+    @return The function __time_index returns the time index.
     """
-    logger.was_called(__load_data)
+    global __timeline
+    if __timeline is None:
+        __timeline = call("index.history", __history().index)
+    return __timeline
 
-    data: _DataList = []
 
-    try:
-        with open(const.JSON_FILE, "r") as f:
-            data = _json.load(f)
-    except (FileNotFoundError, _json.JSONDecodeError):
-        logger.exc(c=__load_data, default=True)
-        with open(const.JSON_FILE, "w") as f:
-            f.write("[]")
-        data = __load_data()
+def __operation_log() -> OperationLog:
+    """
+    The function __operation_log returns the log of the changes that can be undone, creating it on
+    first use with `var.undo_depth` steps, and reading the steps saved by the previous session if
+    `var.undo_persist` is enabled.
 
-    return data
+    @return The function __operation_log returns the operation log.
+    """
+    global __operations
+    if __operations is None:
+        __operations = OperationLog(var.undo_depth)
+        if var.undo_persist:
+            __operations.load()
+    return __operations
 
 
-def __save_data(data: _DataList) -> None:
+def __rule_set() -> _rules.RuleSet:
     """
-    The function __save_data saves data to a JSON file.
+    The function __rule_set returns the budget rules of `const.RULES_FILE`, with the totals they
+    need, loading them on first use. It is then kept up to date by `register`, `edit` and `delete`,
+    which must build it before they change the storage.
 
-    @param data The data parameter is a list containing the data to be saved to the JSON file.
+    @return The function __rule_set returns the rule set.
     """
-    logger.was_called(__save_data)
-    with open(const.JSON_FILE, "w") as f:
-        _json.dump(data, f, separators=(",", ":"))
+    global __limits
+    if __limits is None:
+        __limits = call("index.rules", _rules.RuleSet, _rules.load(), __store().rows)
+    return __limits
+
 
+def __prepare(name: str) -> _State | None:
+    """
+    The function __prepare returns the state of an item about to change, once the rule set is built
+    from the storage as it is before the change.
+
+    @param name The name parameter is the name of the item.
+
+    @return The function __prepare returns the (amount, category) of the item, or None if it does
+    not exist.
+    """
+    __rule_set()
+    return __state(name)
+
+
+def __state(name: str) -> _State | None:
+    """
+    The function __state returns what the indexes and the operation log need to know about an item
+    before it changes.
 
-__data: _DataList = __load_data()
+    @param name The name parameter is the name of the item.
 
+    @return The function __state returns the (amount, category) of the item, or None if it does not
+    exist.
+    """
+    amount: float | None = __store().get(name)
+    if amount is None:
+        return None
+    return amount, __store().category(name) or ""
+
+
+def __changed(
+    name: str, before: _State | None, after: _State | None, undoable: bool = True
+) -> List[str]:
+    """
+    The function __changed records a transaction in the history and the operation log, updates the
+    indexes that were built and evaluates the budget rules the change affects, after an item was
+    registered (no `before`), edited or deleted (no `after`).
+
+    @param name The name parameter is the name of the item.
+    @param before The before parameter is the (amount, category) of the item before the change.
+    @param after The after parameter is the (amount, category) of the item after the change.
+    @param undoable The undoable parameter is False for changes made by `undo` and `redo`.
+
+    @return The function __changed returns the warnings of the budget rules the change exceeded.
+    """
+    if __recorded is not None:
+        __recorded.append((name, before, after))
+    if undoable:
+        __operation_log().push(name, before, after)
+    op: str = "edit" if before and after else "delete" if before else "register"
+    transaction: _Transaction = __history().record(
+        op,
+        name,
+        after[0] if after else 0.0,
+        (after[0] if after else 0.0) - (before[0] if before else 0.0),
+    )
+    if __store().generation != __generation:
+        __drop_indexes()
+        return []
+    if __timeline is not None:
+        __timeline.add(transaction)
+    if __names is not None and (before is None) != (after is None):
+        if before is None:
+            __names.add(name)
+        else:
+            __names.remove(name)
+    if __totals is not None:
+        if before is None and after is not None:
+            __totals.add(name, after[0])
+        elif after is None and before is not None:
+            __totals.remove(name, before[0])
+        elif before is not None and after is not None:
+            __totals.update(name, before[0], after[0])
+    if __groups is not None:
+        if before is not None:
+            __groups.remove(name, *before)
+        if after is not None:
+            __groups.add(name, *after)
+    return __limits.apply(name, before, after) if __limits is not None else []
+
+
+def __report(message: str, warnings: List[str]) -> None:
+    """
+    The function __report leaves the outcome of a change in `var.extra_message`, followed by the
+    warnings of the budget rules it exceeded.
+
+    @param message The message parameter is the outcome of the change.
+    @param warnings The warnings parameter is the list of warnings returned by `__changed`.
+    """
+    var.extra_message = "\n".join([message, *warnings])
 
+
+def __drop_indexes() -> None:
+    """
+    The function __drop_indexes forgets the indexes built from the storage, after it re-read the
+    changes of another process, so they are built again on next use.
+    """
+    logger.was_called(__drop_indexes)
+    global __names, __totals, __groups, __timeline, __limits, __generation
+    __names = None
+    __totals = None
+    __groups = None
+    __timeline = None
+    __limits = None
+    __generation = __store().generation
+
+
+def __move(
+    name: str, expected: _State | None, target: _State | None
+) -> List[str] | None:
+    """
+    The function __move brings an item from the `expected` state to the `target` state, as `undo`
+    and `redo` do. Nothing is changed if the item is no longer in the `expected` state.
+
+    @param name The name parameter is the name of the item.
+    @param expected The expected parameter is the state the item must be in.
+    @param target The target parameter is the state to bring the item to.
+
+    @return The function __move returns the warnings of the budget rules the change exceeded, or
+    None if the item was not changed.
+    """
+    before: _State | None = __prepare(name)
+    if before != expected:
+        return None
+    if target is None:
+        record: _Record = {"op": "delete", "name": name}
+    else:
+        record = {
+            "op": "edit" if before else "register",
+            "name": name,
+            "amount": target[0],
+            "category": target[1],
+        }
+    __store().apply(record)
+    return __changed(name, before, target, undoable=False)
+
+
+@timed("io.undo")
+def __persist_operations() -> None:
+    "Saves the operation log if `var.undo_persist` is enabled and it changed."
+    if __operations is not None and __operations.dirty and var.undo_persist:
+        __operations.save()
+
+
+@timed("op.close")
+def close() -> None:
+    """
+    The function `close` persists pending changes and closes the current storage, if it was opened.
+    The next operation opens the storage selected by `var.storage` again.
+    """
+    logger.was_called(close)
+    global __storage, __names, __totals, __groups, __timeline, __operations, __limits
+    global __generation
+    if __storage is not None:
+        __storage.close()
+        __storage = None
+    __history().flush()
+    __persist_operations()
+    __names = None
+    __totals = None
+    __groups = None
+    __timeline = None
+    __operations = None
+    __limits = None
+    __generation = 0
+
+
+@timed("op.reload")
+def reload() -> int:
+    """
+    The function `reload` closes the current storage and opens the one selected by `var.storage`
+    again, re-reading its data.
+
+    @return The function returns the number of items loaded.
+    """
+    logger.was_called(reload)
+    close()
+    return len(__store())
+
+
+@timed("op.save")
+def save() -> bool:
+    """
+    The function `save` persists the changes kept in memory while `var.autosave` is disabled.
+
+    @return The function returns True if there were pending changes to write, otherwise False.
+    """
+    logger.was_called(save)
+    __history().flush()
+    __persist_operations()
+    saved: bool = __store().save()
+    if __store().generation != __generation:
+        __drop_indexes()
+    return saved
+
+
+@timed("op.item_exists")
 def item_exists(s: str) -> bool:
     """
     The function `item_exists` checks if an item with the given name exists in the data. If found,
@@ -67,27 +392,40 @@ def item_exists(s: str) -> bool:
     @return The function returns a boolean value indicating whether the item exists in the data or not.
     """
     logger.was_called(item_exists, s)
-    for item in __data:
-        if item["name"] == s:
-            var.extra_message = PRT_INIT_ITEM_ALREADY_EXISTS(s)
-            return True
+    if s in __store():
+        var.extra_message = PRT_INIT_ITEM_ALREADY_EXISTS(s)
+        return True
     var.extra_message = PRT_INIT_ITEM_NOT_FOUND(s)
     return False
 
 
-def register(name: str, amount: float) -> None:
+@timed("op.register")
+def register(name: str, amount: float, category: str = "") -> None:
     """
     The function register adds a new item to the data list and saves it to the JSON file.
 
     @param name The name parameter is a string representing the name of the item to be registered.
-    @param amount The amount parameter is a float representing the amount of the item to be registered.
+    @param amount The amount parameter is a float representing the amount of the item to be registered,
+    rounded to `var.precision` decimals.
+    @param category The category parameter is the optional category of the item.
     """
-    logger.was_called(register, name, amount)
-    __data.append({"name": name, "amount": amount})
-    __save_data(__data)
-    var.extra_message = PRT_INIT_REGISTER_REGISTERED_SUCCESSFULLY(name)
+    logger.was_called(register, name, amount, category)
+    amount = _money.quantize(amount)
+    category = category.strip()
+    before: _State | None = __prepare(name)
+    if before is None:
+        record: _Record = {"op": "register", "name": name, "amount": amount}
+    else:
+        record = {"op": "edit", "name": name, "amount": amount}
+        category = category or before[1]
+    if category:
+        record["category"] = category
+    __store().apply(record)
+    warnings: List[str] = __changed(name, before, (amount, category))
+    __report(PRT_INIT_REGISTER_REGISTERED_SUCCESSFULLY(name), warnings)
 
 
+@timed("op.search")
 def search(name: str) -> None:
     """
     The function search searches for an item by name in the data list.
@@ -95,35 +433,444 @@ def search(name: str) -> None:
     @param name The name parameter is a string representing the name of the item to search for.
     """
     logger.was_called(search, name)
-    for item in __data:
-        var.extra_message = PRT_INIT_SEARCH_ITEM_FOUND((item["name"], item["amount"]))
+    amount: float | None = __store().get(name)
+    if amount is None:
+        var.extra_message = PRT_INIT_ITEM_NOT_FOUND(name)
         return
+    var.extra_message = PRT_INIT_SEARCH_ITEM_FOUND((name, amount))
+
+
+@timed("op.lookup")
+def lookup(name: str) -> _State | None:
+    """
+    The function `lookup` returns the amount and category of an item, for callers that need the
+    values rather than a message.
+
+    @param name The name parameter is the name of the item.
+
+    @return The function returns the (amount, category) of the item, or None if it does not exist.
+    """
+    logger.was_called(lookup, name)
+    return __state(name)
+
+
+@timed("op.find")
+def find(query: str, page: int = 1) -> Tuple[int, List[_Item]]:
+    """
+    The function `find` looks up the items whose name contains `query`, ignoring case, best match
+    first; a query ending with '*' only matches names starting with the rest of it. Results are
+    split in pages of `var.search_page_size` items.
+
+    @param query The query parameter is the text to look for.
+    @param page The page parameter is the number of the page to return, starting at 1.
+
+    @return The function returns a tuple with the number of matching items and the items of the
+    requested page, as (name, amount) tuples.
+    """
+    logger.was_called(find, query, page)
+    size: int = var.search_page_size
+    total, names = __name_index().find(query, page * size)
+    items: List[_Item] = []
+    for name in names[(page - 1) * size :]:
+        amount: float | None = __store().get(name)
+        if amount is not None:
+            items.append((name, amount))
+    return total, items
+
+
+@timed("op.list_items")
+def list_items(start: int, count: int) -> Tuple[int, List[_Row]]:
+    """
+    The function `list_items` returns a page of the items in alphabetical order, ignoring case,
+    reading only the items of that page from the storage.
+
+    @param start The start parameter is the position of the first item of the page.
+    @param count The count parameter is the number of items of the page.
+
+    @return The function returns a tuple with the number of positions, as `start` counts them, and
+    the (name, amount, category) tuples of the page.
+    """
+    logger.was_called(list_items, start, count)
+    index: NameIndex = __name_index()
+    rows: List[_Row] = []
+    for name in index.page(max(start, 0), count):
+        state: _State | None = __state(name)
+        if state is not None:
+            rows.append((name, state[0], state[1]))
+    return len(index), rows
+
+
+def list_position(text: str) -> int:
+    """
+    The function `list_position` returns the position, as `list_items` counts them, of the first
+    item whose name sorts at or after `text`.
+
+    @param text The text parameter is a name, or the start of one.
+
+    @return The function returns the position.
+    """
+    logger.was_called(list_position, text)
+    return __name_index().position(text)
 
 
-def edit(name: str, new_amount: float) -> None:
+@timed("op.edit")
+def edit(name: str, new_amount: float, category: str | None = None) -> None:
     """
     The function edit modifies the amount of an item in the data list and saves the changes
     to the JSON file.
 
     @param name The name parameter is a string representing the name of the item to be edited.
-    @param new_amount The new_amount parameter is a float representing the new amount of the item.
+    @param new_amount The new_amount parameter is a float representing the new amount of the item,
+    rounded to `var.precision` decimals.
+    @param category The category parameter is the new category of the item; None keeps the current
+    one and "" removes it.
     """
-    logger.was_called(edit, name, new_amount)
-    for item in __data:
-        item["amount"] = new_amount
-    if item_exists(name):
-        __save_data(__data)
-        var.extra_message = PRT_INIT_EDIT_ITEM_EDITED_SUCCESSFULLY((name, new_amount))
+    logger.was_called(edit, name, new_amount, category)
+    new_amount = _money.quantize(new_amount)
+    before: _State | None = __prepare(name)
+    record: _Record = {"op": "edit", "name": name, "amount": new_amount}
+    if category is not None:
+        record["category"] = category = category.strip()
+    if before is None or not __store().apply(record):
+        var.extra_message = PRT_INIT_ITEM_NOT_FOUND(name)
+        return
+    warnings: List[str] = __changed(
+        name, before, (new_amount, before[1] if category is None else category)
+    )
+    __report(PRT_INIT_EDIT_ITEM_EDITED_SUCCESSFULLY((name, new_amount)), warnings)
 
 
+@timed("op.delete")
 def delete(name: str) -> None:
     """
-    The function delete removes item or items (if any) from the data list and saves the changes
-    to the JSON file.
+    The function delete removes an item from the data list and saves the changes to the JSON file.
 
     @param name The name parameter is a string representing the name of the item to be deleted.
     """
     logger.was_called(delete)
-    __data[:] = [item for item in __data if item["name"] != name]
-    __save_data(__data)
-    var.extra_message = PRT_INIT_DELETED_ITEM_DELETED_SUCCESSFULLY(name)
+    before: _State | None = __prepare(name)
+    if before is None or not __store().apply({"op": "delete", "name": name}):
+        var.extra_message = PRT_INIT_ITEM_NOT_FOUND(name)
+        return
+    warnings: List[str] = __changed(name, before, None)
+    __report(PRT_INIT_DELETED_ITEM_DELETED_SUCCESSFULLY(name), warnings)
+
+
+@timed("op.summary")
+def summary(top: int | None = None) -> _Summary:
+    """
+    The function `summary` returns the count, total, mean, smallest and largest items of the budget,
+    from totals kept up to date as items change, so it does not scan the items after the first call.
+
+    @param top The top parameter is the number of largest items to report (default:
+    `var.summary_top`).
+
+    @return The function returns a dictionary with the keys "count", "total", "mean", "min", "max"
+    (as (name, amount) tuples, or None when the budget is empty) and "top" (a list of them).
+    """
+    logger.was_called(summary, top)
+    return __aggregates().summary(var.summary_top if top is None else top)
+
+
+@timed("op.verify_summary")
+def verify_summary(top: int | None = None) -> List[str]:
+    """
+    The function `verify_summary` recomputes the summary from every item and compares it with the
+    one returned by `summary`. Amounts are compared rather than names, as ties may be broken
+    differently. Totals are exact sums of minor units, but the mean allows for rounding errors.
+
+    @param top The top parameter is the number of largest items to compare (default:
+    `var.summary_top`).
+
+    @return The function returns the names of the fields that differ, empty if they all match.
+    """
+    logger.was_called(verify_summary, top)
+    top = var.summary_top if top is None else top
+    kept: _Summary = summary(top)
+    names, amounts = __store().columns()
+    fresh: _Summary = recompute(names, amounts, top, __store().units())
+    mismatches: List[str] = []
+    for field in ("count", "total", "mean", "min", "max", "top"):
+        a: Any = kept[field]
+        b: Any = fresh[field]
+        if field in ("min", "max"):
+            a, b = a and a[1], b and b[1]
+        elif field == "top":
+            a, b = [i[1] for i in a], [i[1] for i in b]
+        if isinstance(a, float):
+            if not _math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6):
+                mismatches.append(field)
+        elif a != b:
+            mismatches.append(field)
+    return mismatches
+
+
+@timed("op.categories")
+def categories() -> List[_Group]:
+    """
+    The function `categories` returns the number of items and the total amount of every category,
+    from an index kept up to date as items change, so it takes time proportional to the number of
+    categories rather than items.
+
+    @return The function returns a list of (category, count, total) tuples sorted by category; items
+    without a category are grouped under "".
+    """
+    logger.was_called(categories)
+    return __category_index().groups()
+
+
+def rows() -> Iterator[_Row]:
+    """
+    The function `rows` streams every item straight from the storage, without copying the budget.
+    The budget must not change until the iterator is exhausted.
+
+    @return The function returns an iterator of (name, amount, category) tuples, in storage order.
+    """
+    logger.was_called(rows)
+    return __store().rows()
+
+
+@timed("op.category_items")
+def category_items(category: str) -> List[_Item]:
+    """
+    The function `category_items` returns the items of a category.
+
+    @param category The category parameter is the category to list ("" for items without one).
+
+    @return The function returns the (name, amount) tuples of the items, sorted by name.
+    """
+    logger.was_called(category_items, category)
+    items: List[_Item] = []
+    for name in __category_index().members(category.strip()):
+        amount: float | None = __store().get(name)
+        if amount is not None:
+            items.append((name, amount))
+    return items
+
+
+@timed("op.history")
+def history(
+    period: str | None = None, limit: int | None = None
+) -> Tuple[int, float, List[_Transaction]]:
+    """
+    The function `history` returns the transactions of a period: how many there were, how much they
+    changed the budget total and the latest of them. Whole months and weeks are answered from
+    precomputed rollups and other periods from running sums over the time index, so the cost does
+    not grow with the length of the history.
+
+    @param period The period parameter is a year (YYYY), month (YYYY-MM), ISO week (YYYY-Www), day
+    (YYYY-MM-DD) or a FROM..TO range of them; None means the whole history.
+    @param limit The limit parameter is the number of latest transactions to return (default:
+    `var.search_page_size`).
+
+    @return The function returns a (count, change, transactions) tuple, the transactions being
+    (timestamp, op, name, amount, change) tuples, newest first.
+
+    @raise ValueError If the period is not valid.
+    """
+    logger.was_called(history, period, limit)
+    timeline: _history.TimeIndex = __time_index()
+    start, end = (
+        (float("-inf"), float("inf"))
+        if period is None
+        else __history().period_range(period)
+    )
+    rollup: _Rollup | None = timeline.rollup(period.strip()) if period else None
+    count, change = rollup[1:] if rollup else timeline.total(start, end)
+    size: int = var.search_page_size if limit is None else limit
+    return count, change, timeline.latest(start, end, size)
+
+
+@timed("op.rollups")
+def rollups(weekly: bool = False) -> List[_Rollup]:
+    """
+    The function `rollups` returns the number of transactions and the change of the budget total of
+    every month, or week, of the history.
+
+    @param weekly The weekly parameter selects ISO weeks instead of months.
+
+    @return The function returns a list of (period, count, change) tuples sorted by period.
+    """
+    logger.was_called(rollups, weekly)
+    return __time_index().rollups(weekly)
+
+
+@timed("op.undo")
+def undo() -> bool:
+    """
+    The function `undo` reverts the latest change still in the operation log by applying its
+    inverse: a registration is deleted, a deletion registered again and an edit edited back. The
+    step can be redone with `redo`. Nothing is changed if the item was modified outside the log
+    since (e.g. by another session).
+
+    @return The function returns True if a change was undone, otherwise False.
+    """
+    logger.was_called(undo)
+    log: OperationLog = __operation_log()
+    step = log.undo()
+    if step is None:
+        var.extra_message = PRT_INIT_UNDO_NOTHING
+        return False
+    name, before, after = step
+    warnings: List[str] | None = __move(name, after, before)
+    if warnings is None:
+        log.cancel(undone=True)
+        var.extra_message = PRT_INIT_UNDO_CONFLICT(name)
+        return False
+    __report(PRT_INIT_UNDO_UNDONE((name, log.sizes()[0])), warnings)
+    return True
+
+
+@timed("op.redo")
+def redo() -> bool:
+    """
+    The function `redo` applies again the latest change reverted by `undo`. Redo steps are discarded
+    as soon as a new change is made.
+
+    @return The function returns True if a change was redone, otherwise False.
+    """
+    logger.was_called(redo)
+    log: OperationLog = __operation_log()
+    step = log.redo()
+    if step is None:
+        var.extra_message = PRT_INIT_REDO_NOTHING
+        return False
+    name, before, after = step
+    warnings: List[str] | None = __move(name, before, after)
+    if warnings is None:
+        log.cancel(undone=False)
+        var.extra_message = PRT_INIT_UNDO_CONFLICT(name)
+        return False
+    __report(PRT_INIT_REDO_REDONE((name, log.sizes()[1])), warnings)
+    return True
+
+
+def checkpoint() -> int:
+    """
+    The function `checkpoint` marks the changes kept in memory so far while `var.autosave` is
+    disabled, so that the changes made afterwards can be forgotten with `revert`.
+
+    @return The function returns the checkpoint.
+    """
+    return __store().checkpoint()
+
+
+@timed("op.revert")
+def revert(steps: List[_Step], checkpoint: int) -> None:
+    """
+    The function `revert` undoes changes made while `var.autosave` is disabled that must not be kept,
+    e.g. those of a transaction that failed partway. Items are moved back to their state before the
+    changes, newest first, to keep the indexes in step, then the changes and their reversal are
+    forgotten by the storage, so neither is ever saved. Their steps are dropped from the operation
+    log; the history keeps both the changes and their reversal.
+
+    @param steps The `steps` parameter is the list of (name, before, after) changes, oldest first.
+    @param checkpoint The `checkpoint` parameter is the value `checkpoint` returned before them.
+    """
+    logger.was_called(revert, len(steps), checkpoint)
+    log: OperationLog = __operation_log()
+    for step in reversed(steps):
+        name, before, after = step
+        __move(name, after, before)
+        log.drop(step)
+    __store().discard(checkpoint)
+
+
+@timed("op.begin")
+def begin() -> _Savepoint:
+    """
+    The function `begin` marks the changes kept in memory so far while `var.autosave` is disabled,
+    like `checkpoint`, and records every change made afterwards, including those of `undo`, `redo`
+    and transactions, until the next call, so that all of them can be forgotten with `rollback`
+    when they cannot be saved.
+
+    @return The function returns the savepoint.
+    """
+    logger.was_called(begin)
+    global __recorded
+    __recorded = []
+    return checkpoint(), __recorded, __operation_log().mark()
+
+
+@timed("op.rollback")
+def rollback(savepoint: _Savepoint) -> None:
+    """
+    The function `rollback` undoes every change recorded since `begin` returned `savepoint`, as
+    `revert` does, and brings the operation log back to its state at that time.
+
+    @param savepoint The `savepoint` parameter is the value `begin` returned.
+    """
+    global __recorded
+    start, steps, mark = savepoint
+    logger.was_called(rollback, len(steps), start)
+    __recorded = None
+    for name, before, after in reversed(steps):
+        __move(name, after, before)
+    __operation_log().restore(mark)
+    __store().discard(start)
+
+
+@timed("op.rules")
+def rules() -> List[_rules.Rule]:
+    """
+    The function `rules` returns the budget rules, in the order they were added.
+
+    @return The function returns a list of (kind, target, limit) tuples.
+    """
+    logger.was_called(rules)
+    return _rules.load()
+
+
+@timed("op.add_rule")
+def add_rule(kind: str, target: str, limit: float) -> int:
+    """
+    The function `add_rule` adds a budget rule, checked by every later change (see `src.rules`).
+
+    @param kind The kind parameter is "total", "item", "category" or "share".
+    @param target The target parameter is the item or category the rule applies to, "*" for every
+    item or category, and "" for "total".
+    @param limit The limit parameter is the largest amount allowed, or percentage for "share".
+
+    @return The function returns the number of the rule, counted from 1.
+
+    @raise ValueError If the rule is not valid.
+    """
+    logger.was_called(add_rule, kind, target, limit)
+    global __limits
+    saved: List[_rules.Rule] = _rules.load()
+    saved.append(_rules.validate(kind, target, limit))
+    _rules.save(saved)
+    __limits = None
+    return len(saved)
+
+
+@timed("op.remove_rule")
+def remove_rule(number: int) -> bool:
+    """
+    The function `remove_rule` removes a budget rule.
+
+    @param number The number parameter is the number of the rule, as listed by `rules`.
+
+    @return The function returns True if the rule was removed, False if there is no such rule.
+    """
+    logger.was_called(remove_rule, number)
+    global __limits
+    saved: List[_rules.Rule] = _rules.load()
+    if not 1 <= number <= len(saved):
+        return False
+    del saved[number - 1]
+    _rules.save(saved)
+    __limits = None
+    return True
+
+
+@timed("op.check_rules")
+def check_rules() -> List[str]:
+    """
+    The function `check_rules` evaluates every budget rule against the whole budget, which changes
+    only evaluate for the rules they affect.
+
+    @return The function returns the warnings of every exceeded rule.
+    """
+    logger.was_called(check_rules)
+    return __rule_set().check(__store().rows())
@@ -0,0 +1,437 @@
+__all__ = ["handle", "serve"]
+
+import asyncio as _asyncio
+import json as _json
+import math as _math
+import time as _time
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import src.const as const
+from src.var import var
+from src.logger import logger as logger
+from src.messages import *
+from src.selector_handler.functions import *
+from src.stats import report, snapshot
+from src.transaction import Transaction
+
+# Longest request line accepted, in bytes; longer ones close the connection.
+LINE_LIMIT: int = 1024 * 1024
+
+_Request = Dict[str, Any]
+_Response = Dict[str, Any]
+# An operation returns whether it succeeded and its result, leaving a message in `var.extra_message`.
+_Operation = Callable[[_Request], Tuple[bool, Any]]
+
+
+def _text(request: _Request, key: str, default: str | None = None) -> str:
+    "Returns a string argument of a request, raising ValueError if it is missing or not a string."
+    value: Any = request.get(key, default)
+    if not isinstance(value, str):
+        raise ValueError(PRT_INIT_SERVE_INVALID_ARGUMENT(key))
+    return value.strip()
+
+
+def _number(request: _Request, key: str, default: float | None = None) -> float:
+    "Returns a numeric argument of a request, raising ValueError if it is missing or not finite."
+    value: Any = request.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(PRT_INIT_SERVE_INVALID_ARGUMENT(key))
+    if not _math.isfinite(value):
+        raise ValueError(PRT_INIT_SERVE_INVALID_ARGUMENT(key))
+    return float(value)
+
+
+def _register(request: _Request) -> Tuple[bool, Any]:
+    "Registers a new item; fails if the name is empty or already exists."
+    name: str = _text(request, "name")
+    if not name or item_exists(name):
+        return False, None
+    register(name, _number(request, "amount"), _text(request, "category", ""))
+    return True, None
+
+
+def _search(request: _Request) -> Tuple[bool, Any]:
+    "Looks up an item by exact name, returning its name, amount and category."
+    name: str = _text(request, "name")
+    state: Tuple[float, str] | None = lookup(name)
+    search(name)
+    if state is None:
+        return False, None
+    return True, {"name": name, "amount": state[0], "category": state[1]}
+
+
+def _find(request: _Request) -> Tuple[bool, Any]:
+    "Returns a page of the items whose name contains 'query', with the number of matches."
+    total, items = find(
+        _text(request, "query"), max(int(_number(request, "page", 1)), 1)
+    )
+    return True, {"total": total, "items": items}
+
+
+def _edit(request: _Request) -> Tuple[bool, Any]:
+    "Changes the amount, and the category if given, of an existing item."
+    name: str = _text(request, "name")
+    if not item_exists(name):
+        return False, None
+    category: str | None = None
+    if request.get("category") is not None:
+        category = _text(request, "category")
+    edit(name, _number(request, "amount"), category)
+    return True, None
+
+
+def _delete(request: _Request) -> Tuple[bool, Any]:
+    "Deletes an existing item."
+    name: str = _text(request, "name")
+    if not item_exists(name):
+        return False, None
+    delete(name)
+    return True, None
+
+
+def _summary(request: _Request) -> Tuple[bool, Any]:
+    "Returns the totals of the budget, with its 'top' largest items."
+    return True, summary(int(_number(request, "top", var.summary_top)))
+
+
+def _categories(request: _Request) -> Tuple[bool, Any]:
+    "Returns every category with its count and total, or the items of 'category'."
+    if request.get("category") is None:
+        return True, categories()
+    category: str = _text(request, "category")
+    items: List[Tuple[str, float]] = category_items(category)
+    if not items:
+        var.extra_message = PRT_INIT_CATEGORY_NOT_FOUND(category)
+        return False, None
+    return True, items
+
+
+def _history(request: _Request) -> Tuple[bool, Any]:
+    "Returns the transactions of 'period', or the monthly totals without one."
+    period: str | None = None
+    if request.get("period") is not None:
+        period = _text(request, "period")
+    limit: int = int(_number(request, "limit", var.search_page_size))
+    try:
+        count, change, transactions = history(period, limit)
+    except ValueError:
+        var.extra_message = PRT_INIT_HISTORY_INVALID_PERIOD(period)
+        return False, None
+    return True, {"count": count, "change": change, "transactions": transactions}
+
+
+def _undo(request: _Request) -> Tuple[bool, Any]:
+    "Reverts the latest change."
+    return undo(), None
+
+
+def _redo(request: _Request) -> Tuple[bool, Any]:
+    "Applies again the latest change reverted by `_undo`."
+    return redo(), None
+
+
+def _stage(transaction: Transaction, change: Any) -> None:
+    "Stages a change of a transaction request, raising ValueError if it is invalid."
+    if not isinstance(change, dict):
+        raise ValueError(PRT_INIT_SERVE_INVALID_ARGUMENT("changes"))
+    op: Any = change.get("op")
+    if op == "register":
+        transaction.register(
+            _text(change, "name"),
+            _number(change, "amount"),
+            _text(change, "category", ""),
+        )
+    elif op == "edit":
+        category: str | None = None
+        if change.get("category") is not None:
+            category = _text(change, "category")
+        transaction.edit(_text(change, "name"), _number(change, "amount"), category)
+    elif op == "delete":
+        transaction.delete(_text(change, "name"))
+    else:
+        raise ValueError(PRT_INIT_RUN_NOT_ATOMIC(op))
+
+
+def _transaction(request: _Request) -> Tuple[bool, Any]:
+    "Stages every change of 'changes' and commits them atomically, or none if any is invalid."
+    changes: Any = request.get("changes")
+    if not isinstance(changes, list):
+        raise ValueError(PRT_INIT_SERVE_INVALID_ARGUMENT("changes"))
+    start: float = _time.perf_counter()
+    transaction: Transaction = Transaction()
+    failures: List[str] = []
+    for number, change in enumerate(changes, 1):
+        try:
+            _stage(transaction, change)
+        except ValueError as e:
+            failures.append(PRT_INIT_TRANSACTION_OPERATION((number, e)))
+    if failures:
+        raise ValueError(
+            PRT_INIT_TRANSACTION_REJECTED((len(failures), "\n".join(failures)))
+        )
+    # The writer saves it with the other requests of its batch, and rolls it back with them if
+    # the save fails.
+    warnings: List[str] = transaction.commit(persist=False)
+    var.extra_message = "\n".join(
+        [
+            PRT_INIT_TRANSACTION_COMMITTED(
+                (len(changes), _time.perf_counter() - start)
+            ),
+            *warnings,
+        ]
+    )
+    return True, {"changes": len(changes), "warnings": warnings}
+
+
+def _stats(request: _Request) -> Tuple[bool, Any]:
+    "Returns the calls timed since the server started with --profile."
+    keys: Tuple[str, ...] = ("name", "calls", "total_ms", "mean_us", "p50_us", "p99_us")
+    return True, [dict(zip(keys + ("max_us",), row)) for row in report(snapshot())]
+
+
+__operations: Dict[str, _Operation] = {
+    "register": _register,
+    "search": _search,
+    "find": _find,
+    "edit": _edit,
+    "delete": _delete,
+    "summary": _summary,
+    "categories": _categories,
+    "history": _history,
+    "undo": _undo,
+    "redo": _redo,
+    "transaction": _transaction,
+    "stats": _stats,
+}
+"""
+The dictionary __operations maps the "op" of a request to the function executing it, as the batch
+commands of `src.batch` do.
+"""
+
+# Operations that change the budget, and are therefore committed before they are answered.
+MUTATIONS: Set[str] = {"register", "edit", "delete", "undo", "redo", "transaction"}
+
+
+def handle(request: Any) -> _Response:
+    """
+    The function `handle` executes one request. A request is a JSON object with an "op" (register,
+    search, find, edit, delete, summary, categories, history, undo, redo, transaction, which
+    commits a list of register/edit/delete "changes" atomically, or stats, which reports the calls
+    timed since a server started with --profile), the arguments of the operation ("name",
+    "amount", "category", "query", "page", "top", "period", "limit", "changes") and an optional
+    "id", returned unchanged in the response so pipelined requests can be told apart.
+
+    @param request The `request` parameter is the decoded request.
+
+    @return The function returns the response: {"id", "ok": true, "result", "message"} on success,
+    or {"id", "ok": false, "error"} on failure.
+    """
+    if not isinstance(request, dict):
+        return {"id": None, "ok": False, "error": PRT_INIT_SERVE_INVALID_REQUEST}
+    response: _Response = {"id": request.get("id")}
+    operation: _Operation | None = __operations.get(str(request.get("op")))
+    if operation is None:
+        response.update(ok=False, error=PRT_INIT_SERVE_UNKNOWN_OP(request.get("op")))
+        return response
+    var.extra_message = ""
+    try:
+        ok, result = operation(request)
+    except ValueError as e:
+        ok, result, var.extra_message = False, None, str(e)
+    if ok:
+        response.update(ok=True, result=result, message=var.extra_message)
+    else:
+        response.update(ok=False, error=var.extra_message)
+    return response
+
+
+class _Writer:
+    """
+    The class `_Writer` executes the requests of every connection one at a time, in the order they
+    arrive, so mutations never interleave. Requests are taken in batches: the mutations of a batch
+    are written with a single save, and their responses are only sent once it is done.
+    """
+
+    def __init__(self) -> None:
+        self.__queue: "_asyncio.Queue[Tuple[Any, _asyncio.Future[_Response]]]" = (
+            _asyncio.Queue()
+        )
+
+    def submit(self, request: Any) -> "_asyncio.Future[_Response]":
+        """
+        Queues a request.
+
+        @param request The `request` parameter is the decoded request.
+
+        @return A future resolved with the response.
+        """
+        future: _asyncio.Future[_Response] = _asyncio.get_running_loop().create_future()
+        self.__queue.put_nowait((request, future))
+        return future
+
+    def __handle(self, request: Any) -> _Response:
+        """
+        Executes a request with `handle`, turning any error it raises into a failed response, so
+        that a single request can never stop the writer and leave every connection waiting.
+
+        @param request The `request` parameter is the decoded request.
+
+        @return The response.
+        """
+        try:
+            return handle(request)
+        except Exception as e:
+            logger.exc(c=handle, default=True)
+            return {
+                "id": request.get("id") if isinstance(request, dict) else None,
+                "ok": False,
+                "error": str(e) or PRT_ERROR,
+            }
+
+    @staticmethod
+    def __rollback(savepoint: Any) -> None:
+        """
+        Forgets the changes of a batch whose save failed, so that they are neither kept in memory
+        nor written by a later save, as `Transaction` does for a failed commit.
+
+        @param savepoint The `savepoint` parameter is the value `begin` returned before the batch,
+        or None if it had no mutation.
+        """
+        if savepoint is None:
+            return
+        try:
+            rollback(savepoint)
+        except Exception:
+            logger.exc(c=rollback, default=True)
+
+    async def run(self) -> None:
+        "Executes the queued requests until cancelled."
+        while True:
+            batch: List[Tuple[Any, _asyncio.Future[_Response]]] = [
+                await self.__queue.get()
+            ]
+            while not self.__queue.empty():
+                batch.append(self.__queue.get_nowait())
+            mutations: bool = any(
+                isinstance(request, dict) and request.get("op") in MUTATIONS
+                for request, _ in batch
+            )
+            savepoint: Any = begin() if mutations else None
+            responses: List[_Response] = [
+                self.__handle(request) for request, _ in batch
+            ]
+            try:
+                save()
+            except Exception as e:
+                logger.exc(c=self.run, default=True)
+                self.__rollback(savepoint)
+                for (request, _), response in zip(batch, responses):
+                    if response["ok"] and request.get("op") in MUTATIONS:
+                        response.update(ok=False, error=str(e))
+                        del response["result"], response["message"]
+            for (_, future), response in zip(batch, responses):
+                if not future.cancelled():
+                    future.set_result(response)
+
+
+async def __respond(
+    writer: _asyncio.StreamWriter,
+    responses: "_asyncio.Queue[_asyncio.Future[_Response] | None]",
+) -> None:
+    """
+    The function `__respond` writes the responses of a connection in the order of its requests.
+
+    @param writer The `writer` parameter is the stream of the connection.
+    @param responses The `responses` parameter is the queue of pending responses, ended by None.
+    """
+    while (future := await responses.get()) is not None:
+        writer.write(_json.dumps(await future, separators=(",", ":")).encode() + b"\n")
+        if responses.empty():
+            await writer.drain()
+    await writer.drain()
+
+
+async def __connection(
+    server: _Writer, reader: _asyncio.StreamReader, writer: _asyncio.StreamWriter
+) -> None:
+    """
+    The function `__connection` serves a client: it reads one request per line and queues it
+    without waiting for the previous responses, so a client may pipeline requests.
+
+    @param server The `server` parameter is the writer executing the requests.
+    @param reader The `reader` parameter is the stream the requests are read from.
+    @param writer The `writer` parameter is the stream the responses are written to.
+    """
+    responses: _asyncio.Queue[_asyncio.Future[_Response] | None] = _asyncio.Queue()
+    respond: _asyncio.Task[None] = _asyncio.create_task(__respond(writer, responses))
+    try:
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            try:
+                request: Any = _json.loads(line)
+            except ValueError:
+                request = None
+            responses.put_nowait(server.submit(request))
+    except (ValueError, ConnectionError):
+        logger.exc(c=__connection, default=True)
+    finally:
+        responses.put_nowait(None)
+        try:
+            await respond
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def __serve(host: str, port: int, ready: Callable[[int], None]) -> None:
+    """
+    The function `__serve` accepts connections until cancelled.
+
+    @param host The `host` parameter is the address to listen on.
+    @param port The `port` parameter is the port to listen on, 0 for any free port.
+    @param ready The `ready` parameter is called with the port once the server listens.
+    """
+    server: _Writer = _Writer()
+    worker: _asyncio.Task[None] = _asyncio.create_task(server.run())
+    listener: _asyncio.AbstractServer = await _asyncio.start_server(
+        lambda r, w: __connection(server, r, w), host, port, limit=LINE_LIMIT
+    )
+    ready(listener.sockets[0].getsockname()[1])
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        worker.cancel()
+
+
+def serve(
+    host: str = const.SERVER_HOST,
+    port: int = const.SERVER_PORT,
+    ready: Callable[[int], None] | None = None,
+) -> int:
+    """
+    The function `serve` keeps the budget and its indexes loaded and answers requests sent as JSON
+    lines over TCP (see `handle`), one response line per request, in order, until interrupted.
+    Changes are persisted before they are acknowledged, in one save per batch of requests.
+
+    @param host The `host` parameter is the address to listen on.
+    @param port The `port` parameter is the port to listen on, 0 for any free port.
+    @param ready The `ready` parameter is called with the port once the server listens; by default
+    the address is printed.
+
+    @return The function returns the exit status.
+    """
+    logger.was_called(serve, host, port)
+    if ready is None:
+        ready = lambda p: print(PRT_INIT_SERVE_LISTENING((host, p)), flush=True)
+    autosave: bool = var.autosave
+    var.autosave = False
+    try:
+        _asyncio.run(__serve(host, port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        save()
+        var.autosave = autosave
+    return 0
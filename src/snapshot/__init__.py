@@ -0,0 +1,374 @@
+__all__ = ["MAGIC", "VERSION", "Snapshot", "write"]
+
+import mmap as _mmap
+import struct as _struct
+import sys as _sys
+import zlib as _zlib
+from array import array as _array
+from typing import IO, Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import src.money as _money
+from src.var import var
+from src.logger import logger as logger
+
+_Row = Tuple[str, float, str]
+
+MAGIC: bytes = b"BTCLISNP"
+# Version 1 stored the amounts as float64; version 2 stores them as integer minor units.
+VERSION: int = 2
+# magic, version, precision of the amounts (reserved in version 1), checksum of everything after
+# the header, number of items, number of categories, bytes of the name heap and bytes of the
+# category heap; padded to _HEADER_SIZE.
+_HEADER: _struct.Struct = _struct.Struct("<8sHHIQQQQ")
+_HEADER_SIZE: int = 64
+_DOUBLE: _struct.Struct = _struct.Struct("<d")
+_UNITS: _struct.Struct = _struct.Struct("<q")
+_NUMBER: _struct.Struct = _struct.Struct("<I")
+# Bytes hashed at a time when verifying the checksum.
+_CHECKSUM_CHUNK: int = 1 << 20
+_LITTLE: bool = _sys.byteorder == "little"
+
+
+def _aligned(size: int) -> int:
+    "Rounds a section size up to a multiple of 8 bytes, so every column starts aligned."
+    return (size + 7) & ~7
+
+
+def _layout(count: int, categories: int, heap: int, category_heap: int) -> List[int]:
+    """
+    The function `_layout` returns where each section of a snapshot starts.
+
+    @param count The `count` parameter is the number of items.
+    @param categories The `categories` parameter is the number of distinct categories.
+    @param heap The `heap` parameter is the size of the name heap, in bytes.
+    @param category_heap The `category_heap` parameter is the size of the category heap, in bytes.
+
+    @return The function returns the offsets of the amounts, name offsets, category numbers,
+    category offsets, name heap and category heap sections, followed by the size of the file.
+    """
+    amounts: int = _HEADER_SIZE
+    names: int = amounts + 8 * count
+    numbers: int = names + 8 * (count + 1)
+    category_offsets: int = numbers + _aligned(4 * count)
+    name_heap: int = category_offsets + 8 * (categories + 1)
+    end: int = name_heap + heap + category_heap
+    return [amounts, names, numbers, category_offsets, name_heap, name_heap + heap, end]
+
+
+def _little(column: _array) -> bytes:
+    "Returns the bytes of a column in little-endian order."
+    if not _LITTLE:
+        column = _array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def write(f: IO[bytes], rows: Iterable[_Row], precision: int | None = None) -> int:
+    """
+    The function `write` writes items as a binary snapshot: a header (magic, version, precision,
+    checksum and sizes) followed by fixed-width columns and string heaps, so it can be mapped in
+    memory and read without decoding it:
+
+    - the amounts, as int64 minor units of the precision (see `src.money`);
+    - the offsets of the names in the name heap (one more than the items), as uint64;
+    - the number of the category of each item, as uint32, padded to a multiple of 8 bytes;
+    - the offsets of the categories in the category heap (one more than the categories), as uint64;
+    - the names, sorted and UTF-8 encoded, end to end, then the categories likewise.
+
+    Integers and amounts are little-endian. Names are sorted by code point, which is also the order
+    of their UTF-8 bytes, so they can be looked up by binary search without decoding them.
+
+    @param f The `f` parameter is the file to write to, opened in binary mode, e.g. by
+    `durable.replace`.
+    @param rows The `rows` parameter is an iterable of (name, amount, category) tuples with unique
+    names.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit
+    (default: `var.precision`).
+
+    @return The function returns the number of items written.
+    """
+    logger.was_called(write)
+    digits: int = var.precision if precision is None else precision
+    items: List[_Row] = sorted(rows)
+    names: List[bytes] = [name.encode("utf-8") for name, _, _ in items]
+    name_offsets: _array = _array("Q", [0])
+    heap: int = 0
+    for name in names:
+        heap += len(name)
+        name_offsets.append(heap)
+    numbers: Dict[str, int] = {}
+    category_numbers: _array = _array(
+        "I", [numbers.setdefault(category, len(numbers)) for _, _, category in items]
+    )
+    categories: List[bytes] = [category.encode("utf-8") for category in numbers]
+    category_offsets: _array = _array("Q", [0])
+    for category in categories:
+        category_offsets.append(category_offsets[-1] + len(category))
+    body: List[bytes] = [
+        _little(
+            _array("q", [_money.to_units(amount, digits) for _, amount, _ in items])
+        ),
+        _little(name_offsets),
+        _little(category_numbers).ljust(_aligned(4 * len(items)), b"\0"),
+        _little(category_offsets),
+        b"".join(names),
+        b"".join(categories),
+    ]
+    checksum: int = 0
+    for section in body:
+        checksum = _zlib.crc32(section, checksum)
+    header: bytes = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        digits,
+        checksum,
+        len(items),
+        len(categories),
+        heap,
+        category_offsets[-1],
+    )
+    f.write(header.ljust(_HEADER_SIZE, b"\0"))
+    for section in body:
+        f.write(section)
+    return len(items)
+
+
+class Snapshot:
+    """
+    The class `Snapshot` reads a file written by `write` through a memory map. Opening it only reads
+    and checks the header; items are decoded one at a time when they are accessed, and the operating
+    system only loads the pages that are touched. Names are found by binary search over the sorted
+    name heap.
+    """
+
+    def __init__(self, path: str, verify: bool = True, precision: int | None = None):
+        """
+        Maps a snapshot.
+
+        @param path The `path` parameter is the path of the snapshot.
+        @param verify The `verify` parameter tells whether to check the checksum, which reads the
+        whole file.
+        @param precision The `precision` parameter is the number of decimal digits amounts are read
+        with (default: `var.precision`); those saved with another precision are converted, like
+        `JsonStorage` does, when they are read.
+
+        @raise ValueError If the file is not a snapshot, is of an unknown version, is truncated or
+        does not match its checksum.
+        """
+        logger.was_called(Snapshot, path, verify)
+        self.path: str = path
+        self.__precision: int = var.precision if precision is None else precision
+        with open(path, "rb") as f:
+            self.__map: _mmap.mmap = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+        try:
+            self.__open(verify)
+        except ValueError:
+            self.__map.close()
+            raise
+
+    def __open(self, verify: bool) -> None:
+        """
+        Reads and checks the header, and computes where the sections are.
+
+        @param verify The `verify` parameter tells whether to check the checksum.
+        """
+        if len(self.__map) < _HEADER_SIZE:
+            raise ValueError(f"{self.path} is not a budget snapshot.")
+        magic, version, saved, checksum, count, categories, heap, category_heap = (
+            _HEADER.unpack_from(self.__map, 0)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a budget snapshot.")
+        if version not in (1, VERSION):
+            raise ValueError(f"{self.path} has unsupported snapshot version {version}.")
+        # Amounts of version 1 snapshots are floats, which have no precision.
+        self.__saved: int | None = saved if version == VERSION else None
+        self.__scale: int = _money.scale(self.__precision)
+        self.__count: int = count
+        self.__categories: int = categories
+        (
+            self.__amounts,
+            self.__name_offsets,
+            self.__numbers,
+            self.__category_offsets,
+            self.__name_heap,
+            self.__category_heap,
+            end,
+        ) = _layout(count, categories, heap, category_heap)
+        if len(self.__map) != end:
+            raise ValueError(f"{self.path} is truncated or corrupted.")
+        if verify and self.checksum() != checksum:
+            raise ValueError(f"{self.path} does not match its checksum.")
+        self.__category_cache: Dict[int, str] = {}
+        # Name offsets are read at every step of a lookup, so they are viewed as integers directly.
+        self.__views: List[memoryview] = []
+        self.__offsets: Sequence[int] = self.__view(
+            "Q", self.__name_offsets, self.__numbers
+        )
+
+    def checksum(self) -> int:
+        """
+        Computes the checksum of everything after the header.
+
+        @return The CRC-32 of the body of the file.
+        """
+        view: memoryview = memoryview(self.__map)
+        checksum: int = 0
+        try:
+            for start in range(_HEADER_SIZE, len(view), _CHECKSUM_CHUNK):
+                checksum = _zlib.crc32(view[start : start + _CHECKSUM_CHUNK], checksum)
+        finally:
+            view.release()
+        return checksum
+
+    def close(self) -> None:
+        """
+        Unmaps the file, releasing the views of its columns. If a copy of such a view is still in use,
+        the map is left to be released with it.
+        """
+        for view in self.__views:
+            try:
+                view.release()
+            except BufferError:
+                pass
+        try:
+            self.__map.close()
+        except BufferError:
+            logger.info(f"{self.path} is still in use, it will be unmapped later.")
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def key(self, position: int) -> bytes:
+        """
+        Returns the encoded name of an item.
+
+        @param position The `position` parameter is the position of the item, in name order.
+
+        @return The UTF-8 encoded name.
+        """
+        heap: int = self.__name_heap
+        return self.__map[
+            heap + self.__offsets[position] : heap + self.__offsets[position + 1]
+        ]
+
+    def name(self, position: int) -> str:
+        "Returns the name of an item, by position."
+        return self.key(position).decode("utf-8")
+
+    def amount(self, position: int) -> float:
+        "Returns the amount of an item, by position."
+        if self.__saved is None:
+            amount: float = _DOUBLE.unpack_from(
+                self.__map, self.__amounts + 8 * position
+            )[0]
+            return _money.quantize(amount, self.__precision)
+        units: int = _UNITS.unpack_from(self.__map, self.__amounts + 8 * position)[0]
+        if self.__saved != self.__precision:
+            units = _money.rescale(units, self.__saved, self.__precision)
+        return units / self.__scale
+
+    def category(self, position: int) -> str:
+        "Returns the category of an item, by position. Categories are decoded once."
+        number: int = _NUMBER.unpack_from(self.__map, self.__numbers + 4 * position)[0]
+        category: str | None = self.__category_cache.get(number)
+        if category is None:
+            start, end = _struct.unpack_from(
+                "<QQ", self.__map, self.__category_offsets + 8 * number
+            )
+            category = self.__map[
+                self.__category_heap + start : self.__category_heap + end
+            ].decode("utf-8")
+            self.__category_cache[number] = category
+        return category
+
+    def find(self, name: str) -> int | None:
+        """
+        Looks up an item by binary search.
+
+        @param name The `name` parameter is the name of the item.
+
+        @return The position of the item, or None if it is not in the snapshot.
+        """
+        key: bytes = name.encode("utf-8")
+        data: _mmap.mmap = self.__map
+        offsets: Sequence[int] = self.__offsets
+        heap: int = self.__name_heap
+        low, high = 0, self.__count
+        while low < high:
+            middle: int = (low + high) // 2
+            if data[heap + offsets[middle] : heap + offsets[middle + 1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.__count and self.key(low) == key:
+            return low
+        return None
+
+    def __column(self, typecode: str, start: int, end: int) -> _array:
+        "Copies a column out of the map, in the byte order of the host."
+        column: _array = _array(typecode, self.__map[start:end])
+        if not _LITTLE:
+            column.byteswap()
+        return column
+
+    def __view(self, typecode: str, start: int, end: int) -> Sequence[Any]:
+        """
+        Returns a column without copying it on little-endian hosts; it is copied on others. Views are
+        released by `close`.
+        """
+        if not _LITTLE:
+            return self.__column(typecode, start, end)
+        view: memoryview = memoryview(self.__map)[start:end].cast(typecode)
+        self.__views.append(view)
+        return view
+
+    def rows(self) -> Iterator[_Row]:
+        """
+        Returns an iterator over the (name, amount, category) tuples of every item, in name order. The
+        columns are copied out of the map first, which is much faster than reading item by item.
+        """
+        offsets: _array = self.__column("Q", self.__name_offsets, self.__numbers)
+        amounts: Sequence[float] = self.amounts()
+        numbers: _array = self.__column(
+            "I", self.__numbers, self.__numbers + 4 * self.__count
+        )
+        bounds: _array = self.__column("Q", self.__category_offsets, self.__name_heap)
+        heap: bytes = self.__map[self.__category_heap : len(self.__map)]
+        categories: List[str] = [
+            heap[bounds[i] : bounds[i + 1]].decode("utf-8")
+            for i in range(self.__categories)
+        ]
+        heap = self.__map[self.__name_heap : self.__category_heap]
+        for position in range(self.__count):
+            yield (
+                heap[offsets[position] : offsets[position + 1]].decode("utf-8"),
+                amounts[position],
+                categories[numbers[position]],
+            )
+
+    def amounts(self) -> Sequence[float]:
+        """
+        Returns the amount column.
+
+        @return A sequence of the amounts, in name order, supporting the buffer protocol.
+        """
+        scale: int = self.__scale
+        return _array("d", [units / scale for units in self.units()])
+
+    def units(self) -> Sequence[int]:
+        """
+        Returns the amounts in integer minor units of the precision they are read with, without
+        copying them if they were saved with it, on little-endian hosts. The float amounts of
+        version 1 snapshots are rounded to it.
+
+        @return A sequence of the minor units, in name order, supporting the buffer protocol.
+        """
+        if self.__saved is None:
+            floats: _array = self.__column("d", self.__amounts, self.__name_offsets)
+            return _array("q", [_money.to_units(a, self.__precision) for a in floats])
+        units: Sequence[int] = self.__view("q", self.__amounts, self.__name_offsets)
+        if self.__saved == self.__precision:
+            return units
+        saved, precision = self.__saved, self.__precision
+        return _array("q", [_money.rescale(u, saved, precision) for u in units])
@@ -0,0 +1,249 @@
+__all__ = [
+    "timed",
+    "call",
+    "instrument",
+    "snapshot",
+    "report",
+    "start",
+    "stop",
+    "load",
+    "reset",
+]
+
+import functools as _functools
+import json as _json
+import os as _os
+import time as _time
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+
+import src.const as const
+from src.var import var
+from src.logger import logger as logger
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+# calls, total ns, slowest ns, then the number of calls of each power-of-two bucket of ns.
+_Timer = List[int]
+_Row = Tuple[str, int, float, float, float, float, float]
+
+# A call of n ns is counted in the bucket n.bit_length(), so the last one holds calls of ~9 s and more.
+BUCKETS: int = 34
+
+__timers: Dict[str, _Timer] = {}
+__profiler: Any = None
+
+
+def __record(name: str, elapsed: int) -> None:
+    """
+    The function `__record` counts a call in the timer of `name`.
+
+    @param name The `name` parameter is the name the call is recorded under.
+    @param elapsed The `elapsed` parameter is the duration of the call, in ns.
+    """
+    timer: _Timer | None = __timers.get(name)
+    if timer is None:
+        timer = __timers[name] = [0] * (3 + BUCKETS)
+    timer[0] += 1
+    timer[1] += elapsed
+    if elapsed > timer[2]:
+        timer[2] = elapsed
+    timer[3 + min(elapsed.bit_length(), BUCKETS - 1)] += 1
+
+
+def call(name: str, f: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    The function `call` calls `f`, recording its latency under `name` if `var.profile` is enabled.
+
+    @param name The `name` parameter is the name the call is recorded under.
+    @param f The `f` parameter is the function to call, with `args` and `kwargs`.
+
+    @return The function returns what `f` returns.
+    """
+    if not var.profile:
+        return f(*args, **kwargs)
+    start: int = _time.perf_counter_ns()
+    try:
+        return f(*args, **kwargs)
+    finally:
+        __record(name, _time.perf_counter_ns() - start)
+
+
+def timed(name: str) -> Callable[[_F], _F]:
+    """
+    The function `timed` is a decorator recording the call count and latency of a function under
+    `name` while `var.profile` is enabled. Otherwise the only cost is checking that setting.
+
+    @param name The `name` parameter is the name the calls are recorded under, e.g. "op.register".
+
+    @return The function returns the decorator.
+    """
+
+    def decorator(f: _F) -> _F:
+        @_functools.wraps(f)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not var.profile:
+                return f(*args, **kwargs)
+            start: int = _time.perf_counter_ns()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                __record(name, _time.perf_counter_ns() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def instrument(obj: Any, prefix: str, methods: Iterable[str]) -> Any:
+    """
+    The function `instrument` replaces `methods` of the instance `obj` by timed wrappers, recorded as
+    "`prefix`.`method`". It is meant for objects created while `var.profile` is enabled, so that they
+    cost nothing otherwise.
+
+    @param obj The `obj` parameter is the instance to instrument.
+    @param prefix The `prefix` parameter is the prefix of the recorded names.
+    @param methods The `methods` parameter is the names of the methods to time.
+
+    @return The function returns `obj`.
+    """
+    for method in methods:
+        setattr(obj, method, timed(f"{prefix}.{method}")(getattr(obj, method)))
+    return obj
+
+
+def snapshot() -> Dict[str, _Timer]:
+    """
+    The function `snapshot` returns a copy of the timers recorded by this process.
+
+    @return The function returns a dictionary from names to [calls, total ns, slowest ns, buckets...].
+    """
+    return {name: list(timer) for name, timer in __timers.items()}
+
+
+def __percentile(timer: _Timer, p: float) -> float:
+    """
+    The function `__percentile` estimates a percentile of a timer as the upper bound of the bucket
+    holding it.
+
+    @param timer The `timer` parameter is the timer.
+    @param p The `p` parameter is the percentile, from 0 to 100.
+
+    @return The function returns the percentile, in µs, never more than the slowest call.
+    """
+    rank: float = timer[0] * p / 100
+    seen: int = 0
+    for bucket, count in enumerate(timer[3:]):
+        seen += count
+        if seen >= rank and count:
+            return min(1 << bucket, timer[2]) / 1e3
+    return timer[2] / 1e3
+
+
+def report(timers: Dict[str, _Timer]) -> List[_Row]:
+    """
+    The function `report` summarizes timers, slowest total first.
+
+    @param timers The `timers` parameter is a dictionary such as the one returned by `snapshot`.
+
+    @return The function returns (name, calls, total ms, mean µs, p50 µs, p99 µs, max µs) tuples.
+    """
+    return [
+        (
+            name,
+            t[0],
+            t[1] / 1e6,
+            t[1] / max(t[0], 1) / 1e3,
+            __percentile(t, 50),
+            __percentile(t, 99),
+            t[2] / 1e3,
+        )
+        for name, t in sorted(timers.items(), key=lambda item: -item[1][1])
+    ]
+
+
+def load() -> Dict[str, _Timer]:
+    """
+    The function `load` reads the timers accumulated by the profiled runs in `const.STATS_FILE`.
+
+    @return The function returns the timers, empty if none were saved yet.
+    """
+    logger.was_called(load)
+    if not _os.path.exists(const.STATS_FILE):
+        return {}
+    with open(const.STATS_FILE, "r", encoding="utf-8") as f:
+        return {name: list(timer) for name, timer in _json.load(f).items()}
+
+
+def reset() -> bool:
+    """
+    The function `reset` forgets the timers accumulated in `const.STATS_FILE`.
+
+    @return The function returns True if there were timers to forget, otherwise False.
+    """
+    logger.was_called(reset)
+    if not _os.path.exists(const.STATS_FILE):
+        return False
+    _os.remove(const.STATS_FILE)
+    return True
+
+
+def __merge(timers: Dict[str, _Timer]) -> None:
+    """
+    The function `__merge` adds `timers` to the ones accumulated in `const.STATS_FILE`.
+
+    @param timers The `timers` parameter is the timers of this process.
+    """
+    logger.was_called(__merge)
+    saved: Dict[str, _Timer] = load()
+    for name, timer in timers.items():
+        total: _Timer | None = saved.get(name)
+        if total is None or len(total) != len(timer):
+            saved[name] = timer
+            continue
+        total[0] += timer[0]
+        total[1] += timer[1]
+        total[2] = max(total[2], timer[2])
+        for i in range(3, len(timer)):
+            total[i] += timer[i]
+    with open(const.ensure_parent(const.STATS_FILE), "w", encoding="utf-8") as f:
+        _json.dump(saved, f)
+
+
+def start(profile_file: str = "") -> None:
+    """
+    The function `start` enables `var.profile`, and cProfile if `profile_file` is given, which is
+    kept in `var.profile_file`.
+
+    @param profile_file The `profile_file` parameter is the file `stop` dumps the cProfile
+    statistics to, in the pstats format; with "" only the timers are recorded.
+    """
+    logger.was_called(start, profile_file)
+    global __profiler
+    var.profile = True
+    var.profile_file = profile_file
+    if profile_file:
+        # Imported here so that runs without --profile do not pay for importing it.
+        import cProfile
+
+        __profiler = cProfile.Profile()
+        __profiler.enable()
+
+
+def stop() -> List[_Row]:
+    """
+    The function `stop` disables `var.profile` and cProfile, dumps the cProfile statistics, and adds
+    the timers of this process to `const.STATS_FILE`. It does nothing if `start` was not called.
+
+    @return The function returns the report of the timers of this process.
+    """
+    logger.was_called(stop)
+    global __profiler
+    if not var.profile:
+        return []
+    if __profiler is not None:
+        __profiler.disable()
+        __profiler.dump_stats(var.profile_file)
+        __profiler = None
+    var.profile = False
+    if __timers:
+        __merge(__timers)
+    return report(__timers)
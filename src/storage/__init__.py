@@ -0,0 +1,252 @@
+__all__ = [
+    "Storage",
+    "STORAGES",
+    "open_storage",
+    "migrate",
+    "reshard",
+]
+
+import abc as _abc
+import importlib as _importlib
+from array import array as _array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from src.var import var
+import src.money as _money
+from src.logger import logger as logger
+from src.stats import call, instrument
+
+_Record = Dict[str, Any]
+_Item = Tuple[str, float]
+_Row = Tuple[str, float, str]
+
+
+class Storage(_abc.ABC):
+    """
+    The class `Storage` describes the operations a budget storage backend provides; backends must
+    implement every abstract method. Mutations are expressed as records: dictionaries with an "op"
+    key ("register", "edit" or "delete"), the item "name" and, except for deletions, its "amount",
+    rounded to `var.precision` decimals. Records may also carry a "category": items registered
+    without one get the empty category, and edits without one keep the current category. Applying a
+    record is idempotent.
+
+    `generation` is incremented whenever the backend re-reads data changed by another process, so
+    anything derived from the items must then be rebuilt.
+    """
+
+    generation: int = 0
+
+    @_abc.abstractmethod
+    def __contains__(self, name: str) -> bool:
+        "Returns whether an item with the given name exists."
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def __len__(self) -> int:
+        "Returns the number of items."
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def get(self, name: str) -> float | None:
+        """
+        Returns the amount of an item.
+
+        @param name The `name` parameter is the name of the item.
+
+        @return The amount of the item, or None if it does not exist.
+        """
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def items(self) -> Iterator[_Item]:
+        "Returns an iterator over the (name, amount) tuples of every item."
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def category(self, name: str) -> str | None:
+        """
+        Returns the category of an item.
+
+        @param name The `name` parameter is the name of the item.
+
+        @return The category of the item ("" if it has none), or None if it does not exist.
+        """
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def rows(self) -> Iterator[_Row]:
+        "Returns an iterator over the (name, amount, category) tuples of every item."
+        raise NotImplementedError
+
+    def columns(self) -> Tuple[Sequence[str], Sequence[float]]:
+        """
+        Returns the names and the amounts of every item as two sequences sharing positions. The
+        amounts support the buffer protocol, so they can be read without copying them again. Neither
+        sequence may be modified.
+
+        @return A (names, amounts) tuple.
+        """
+        names: List[str] = []
+        amounts: _array = _array("d")
+        for name, amount in self.items():
+            names.append(name)
+            amounts.append(amount)
+        return names, amounts
+
+    def units(self) -> Sequence[int]:
+        """
+        Returns the amounts of every item in integer minor units of `var.precision` decimals (see
+        `src.money`), sharing positions with `columns`, so they can be added up exactly. The
+        sequence supports the buffer protocol and may not be modified.
+
+        @return The `array('q')` of the amounts in minor units.
+        """
+        scale: int = _money.scale()
+        return _array("q", [round(amount * scale) for _, amount in self.items()])
+
+    @_abc.abstractmethod
+    def apply(self, record: _Record) -> bool:
+        """
+        Applies a mutation record and persists it, unless `var.autosave` is disabled, in which case it
+        is persisted by the next call to `save`.
+
+        @param record The `record` parameter is the mutation to apply.
+
+        @return True if the record changed the data, otherwise False.
+        """
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def checkpoint(self) -> int:
+        """
+        Marks the mutations applied so far while `var.autosave` is disabled, for `discard`.
+
+        @return The checkpoint.
+        """
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def discard(self, checkpoint: int) -> None:
+        """
+        Forgets the mutations applied since a `checkpoint` while `var.autosave` was disabled, so they
+        are never persisted. Their effect on the data must already have been reverted, by applying
+        inverse mutations, which are forgotten with them.
+
+        @param checkpoint The `checkpoint` parameter is the value returned by `checkpoint`.
+        """
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def replace(self, rows: Iterable[_Row]) -> int:
+        """
+        Replaces every item with the given ones and persists the result.
+
+        @param rows The `rows` parameter is an iterable of (name, amount, category) tuples.
+
+        @return The number of items stored.
+        """
+        raise NotImplementedError
+
+    @_abc.abstractmethod
+    def save(self) -> bool:
+        """
+        Persists the mutations applied while `var.autosave` was disabled.
+
+        @return True if there were pending mutations to persist, otherwise False.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        "Persists pending mutations and releases the resources held by the storage."
+        self.save()
+
+
+class _Backend:
+    """
+    The class `_Backend` opens a storage backend, importing its module on first use, so that
+    importing `src` does not pay for the backends that are not used (e.g. `sqlite3`).
+    """
+
+    def __init__(self, module: str, name: str) -> None:
+        """
+        Names a backend without importing it.
+
+        @param module The `module` parameter is the module of the backend, relative to this package.
+        @param name The `name` parameter is the name of its `Storage` class.
+        """
+        self.module: str = module
+        self.name: str = name
+
+    def __call__(self) -> Storage:
+        "Opens the backend."
+        backend: type[Storage] = getattr(
+            _importlib.import_module(self.module, __package__), self.name
+        )
+        return backend()
+
+
+STORAGES: Dict[str, Callable[[], Storage]] = {
+    "json": _Backend(".json_storage", "JsonStorage"),
+    "sqlite": _Backend(".sqlite_storage", "SqliteStorage"),
+    "binary": _Backend(".binary_storage", "BinaryStorage"),
+}
+
+
+def open_storage(kind: str) -> Storage:
+    """
+    The function `open_storage` opens the storage backend registered under `kind` in `STORAGES`.
+    While `var.profile` is enabled, opening it and its main methods are timed (see `src.stats`).
+
+    @param kind The `kind` parameter is the name of the backend, e.g. "json" or "sqlite".
+
+    @return The function returns the opened storage.
+    """
+    logger.was_called(open_storage, kind)
+    if not var.profile:
+        return STORAGES[kind]()
+    return instrument(
+        call("storage.open", STORAGES[kind]),
+        "storage",
+        ("get", "category", "apply", "replace", "save", "close"),
+    )
+
+
+def migrate(source: str, target: str) -> int:
+    """
+    The function `migrate` copies every item from the `source` backend into the `target` backend,
+    replacing whatever the target held.
+
+    @param source The `source` parameter is the name of the backend to read from.
+    @param target The `target` parameter is the name of the backend to write to.
+
+    @return The function returns the number of items copied.
+    """
+    logger.was_called(migrate, source, target)
+    src: Storage = open_storage(source)
+    dst: Storage = open_storage(target)
+    try:
+        return dst.replace(src.rows())
+    finally:
+        dst.close()
+        src.close()
+
+
+def reshard(count: int) -> int:
+    """
+    The function `reshard` splits the JSON budget into `count` shard files, or merges its shards back
+    into a single file if `count` is 1.
+
+    @param count The `count` parameter is the number of shards.
+
+    @return The function returns the number of items resharded.
+    """
+    logger.was_called(reshard, count)
+    # Imported here so that other commands do not pay for importing it.
+    from .json_storage import JsonStorage
+
+    storage: JsonStorage = JsonStorage()
+    try:
+        storage.reshard(count)
+        return len(storage)
+    finally:
+        storage.close()
@@ -0,0 +1,314 @@
+__all__ = ["BinaryStorage"]
+
+import os as _os
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import src.const as const
+import src.durable as durable
+from src.journal import Journal
+from src.lock import FileLock
+from src.snapshot import Snapshot, write
+from src.var import var
+from src.logger import logger as logger
+from . import Storage
+
+_Record = Dict[str, Any]
+_Item = Tuple[str, float]
+_Row = Tuple[str, float, str]
+_State = Tuple[float, str]
+
+# Suffix given to a corrupted snapshot replaced by its backup, kept for inspection.
+_CORRUPT_SUFFIX: str = ".corrupt"
+
+
+class _Names(Sequence[str]):
+    "The class `_Names` is a read-only sequence of the names of a snapshot, decoded on access."
+
+    def __init__(self, snapshot: Snapshot):
+        self.__snapshot: Snapshot = snapshot
+
+    def __len__(self) -> int:
+        return len(self.__snapshot)
+
+    def __getitem__(self, position: Any) -> Any:
+        if isinstance(position, slice):
+            return [
+                self.__snapshot.name(i) for i in range(*position.indices(len(self)))
+            ]
+        return self.__snapshot.name(position)
+
+
+class BinaryStorage(Storage):
+    """
+    The class `BinaryStorage` keeps the budget in the binary snapshot `const.BINARY_FILE` (see
+    `src.snapshot`), mapped in memory, so opening it takes the same time whatever its size and items
+    are only decoded when they are read. Changes are kept in an overlay, a dictionary from item names
+    to their new state (None once deleted), which is consulted before the snapshot. Saved changes are
+    appended to a journal of their own, `const.BINARY_FILE` + ".journal", whatever `var.journal`
+    says, and only folded into a new snapshot once it grows past the thresholds of `JsonStorage`.
+    Snapshots are written with `durable.replace`, and a corrupted one is replaced by its backup.
+    Writes hold `const.LOCK_FILE` and check its version stamp, like `JsonStorage`.
+    """
+
+    def __init__(self) -> None:
+        "Maps the snapshot, if there is one yet, and replays the journal."
+        logger.was_called(BinaryStorage)
+        self.__snapshot: Snapshot | None = None
+        self.__overlay: Dict[str, _State | None] = {}
+        self.__count: int = 0
+        self.__pending: List[_Record] = []
+        self.__precision: int = var.precision
+        self.__journal: Journal = Journal(const.BINARY_FILE + ".journal")
+        self.__lock: FileLock = FileLock(const.ensure_parent(const.LOCK_FILE))
+        with self.__lock:
+            self.__load()
+            self.__version: int = self.__lock.version()
+
+    def __load(self, verify: bool | None = None) -> None:
+        """
+        The method __load maps `const.BINARY_FILE`, or its backup if it is missing or corrupted, and
+        replays the journal into the overlay. The lock must be held.
+
+        @param verify The verify parameter tells whether to check the checksum of the snapshot
+        (default: `var.snapshot_verify`).
+
+        @raise ValueError If the snapshot and its backup are corrupted, rather than losing the budget.
+        """
+        if self.__snapshot is not None:
+            self.__snapshot.close()
+            self.__snapshot = None
+        self.__overlay = {}
+        self.__count = 0
+        self.__snapshot = self.__open(
+            var.snapshot_verify if verify is None else verify, self.__precision
+        )
+        if self.__snapshot is not None:
+            self.__count = len(self.__snapshot)
+        for record in self.__journal.replay():
+            self.__apply(record)
+
+    @staticmethod
+    def __open(verify: bool, precision: int) -> Snapshot | None:
+        """
+        The method __open maps the snapshot as `_read` does for `JsonStorage`: a corrupted snapshot is
+        renamed with `_CORRUPT_SUFFIX` and its backup, kept by `durable.replace`, is mapped instead.
+        The backup is also mapped if the snapshot is missing, as a crash between the two renames of a
+        save leaves only the backup.
+
+        @param verify The verify parameter tells whether to check the checksum of the snapshot.
+        @param precision The precision parameter is the number of decimal digits amounts are read
+        with.
+
+        @return The method __open returns the snapshot, or None if there is none yet.
+
+        @raise ValueError If the snapshot is corrupted and its backup is missing or corrupted too.
+        """
+        path: str = const.BINARY_FILE
+        backup: str = path + durable.BACKUP_SUFFIX
+        try:
+            return Snapshot(path, verify, precision)
+        except FileNotFoundError:
+            if not _os.path.exists(backup):
+                return None
+            logger.info(f"{path} is missing, mapping its backup {backup}.")
+        except ValueError as e:
+            if not _os.path.exists(backup):
+                raise ValueError(f"{e} There is no backup to fall back to.") from e
+            logger.exc(f"{e} Falling back to the backup {backup}.")
+            _os.replace(path, path + _CORRUPT_SUFFIX)
+        try:
+            return Snapshot(backup, verify, precision)
+        except ValueError as e:
+            raise ValueError(f"{e} Neither {path} nor its backup can be read.") from e
+
+    def __state(self, name: str) -> _State | None:
+        """
+        The method __state returns the state of an item, from the overlay or the snapshot.
+
+        @param name The name parameter is the name of the item.
+
+        @return The method __state returns the (amount, category) of the item, or None if it does
+        not exist.
+        """
+        if name in self.__overlay:
+            return self.__overlay[name]
+        if self.__snapshot is None:
+            return None
+        position: int | None = self.__snapshot.find(name)
+        if position is None:
+            return None
+        return self.__snapshot.amount(position), self.__snapshot.category(position)
+
+    def __apply(self, record: _Record) -> bool:
+        """
+        The method __apply applies a single mutation record to the overlay. As with `JsonStorage`,
+        registering an existing item edits it.
+
+        @param record The record parameter is the mutation to apply.
+
+        @return The method __apply returns True if the record changed the data, otherwise False.
+        """
+        name: str = record["name"]
+        before: _State | None = self.__state(name)
+        if before is None and record["op"] != "register":
+            return False
+        after: _State | None = None
+        if record["op"] != "delete":
+            category: str | None = record.get("category")
+            if category is None:
+                category = before[1] if before else ""
+            after = (float(record["amount"]), category)
+        self.__overlay[name] = after
+        self.__count += (after is not None) - (before is not None)
+        return True
+
+    def __journal_full(self, extra: int = 0) -> bool:
+        """
+        The method __journal_full checks whether the journal, grown by `extra` records, went past the
+        `var.journal_max_ratio` records per item or `var.journal_max_bytes` thresholds.
+
+        @param extra The extra parameter is the number of records about to be appended.
+
+        @return The method __journal_full returns True if the journal should be compacted.
+        """
+        return (
+            self.__journal.records() + extra
+            > var.journal_max_ratio * max(self.__count, 1)
+            or self.__journal.size() > var.journal_max_bytes
+        )
+
+    def __write(self, records: List[_Record]) -> None:
+        """
+        The method __write makes applied mutations durable while holding `const.LOCK_FILE`: they are
+        appended to the journal with a single write, and the overlay is only folded into a new
+        snapshot once the journal is full (see `__journal_full`). If another process wrote the budget
+        since it was read, its snapshot and journal are read again and the records are applied on top
+        of them first.
+
+        @param records The records parameter is the list of mutations that were applied.
+        """
+        logger.was_called(self.__write)
+        with self.__lock:
+            if self.__lock.version() != self.__version:
+                logger.info("The budget was changed by another process, merging.")
+                self.__load()
+                for record in records:
+                    self.__apply(record)
+                self.generation += 1
+            if self.__journal_full(len(records)):
+                self.__replace(self.rows())
+            elif len(records) == 1:
+                self.__journal.append(records[0])
+            else:
+                self.__journal.extend(records)
+            self.__version = self.__lock.bump()
+
+    def __replace(self, rows: Iterable[_Row]) -> None:
+        """
+        The method __replace writes the given items as the new snapshot with `durable.replace`, which
+        keeps the previous one as its backup, empties the journal and maps the new snapshot. The lock
+        must be held. A crash before the journal is emptied only replays records the snapshot
+        already holds, which leaves it unchanged.
+
+        @param rows The rows parameter is an iterable of (name, amount, category) tuples with unique
+        names.
+        """
+        items: List[_Row] = list(rows)
+        # The map must be closed before the file is renamed over, e.g. on Windows.
+        if self.__snapshot is not None:
+            self.__snapshot.close()
+            self.__snapshot = None
+        try:
+            with durable.replace(const.BINARY_FILE) as f:
+                write(f, items, self.__precision)
+        except BaseException:
+            # The previous snapshot was left as it was, and the overlay still applies on top of it.
+            self.__snapshot = self.__open(False, self.__precision)
+            raise
+        self.__journal.reset()
+        # The file was just written from the data in memory, so it is not checked again.
+        self.__load(verify=False)
+
+    def __contains__(self, name: str) -> bool:
+        return self.__state(name) is not None
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def get(self, name: str) -> float | None:
+        state: _State | None = self.__state(name)
+        return None if state is None else state[0]
+
+    def items(self) -> Iterator[_Item]:
+        for name, amount, _ in self.rows():
+            yield name, amount
+
+    def category(self, name: str) -> str | None:
+        state: _State | None = self.__state(name)
+        return None if state is None else state[1]
+
+    def rows(self) -> Iterator[_Row]:
+        overlay: Dict[str, _State | None] = self.__overlay
+        if self.__snapshot is not None:
+            for row in self.__snapshot.rows():
+                if row[0] not in overlay:
+                    yield row
+        for name, state in list(overlay.items()):
+            if state is not None:
+                yield name, state[0], state[1]
+
+    def columns(self) -> Tuple[Sequence[str], Sequence[float]]:
+        if self.__overlay or self.__snapshot is None:
+            return super().columns()
+        # Nothing changed since the snapshot was mapped, so its columns are the budget.
+        return _Names(self.__snapshot), self.__snapshot.amounts()
+
+    def units(self) -> Sequence[int]:
+        if self.__overlay or self.__snapshot is None:
+            return super().units()
+        return self.__snapshot.units()
+
+    def apply(self, record: _Record) -> bool:
+        if not self.__apply(record):
+            return False
+        if var.autosave:
+            self.__write([record])
+        else:
+            self.__pending.append(record)
+        return True
+
+    def checkpoint(self) -> int:
+        return len(self.__pending)
+
+    def discard(self, checkpoint: int) -> None:
+        del self.__pending[checkpoint:]
+
+    def replace(self, rows: Iterable[_Row]) -> int:
+        logger.was_called(self.replace)
+        items: Dict[str, _State] = {name: (amount, c) for name, amount, c in rows}
+        self.__pending.clear()
+        with self.__lock:
+            self.__replace((name, a, c) for name, (a, c) in items.items())
+            self.__version = self.__lock.bump()
+        return self.__count
+
+    def save(self) -> bool:
+        """
+        The method `save` writes the changes kept in memory while `var.autosave` is disabled, as a
+        single batch appended to the journal.
+
+        @return The method returns True if there were pending changes to write, otherwise False.
+        """
+        logger.was_called(self.save)
+        if not self.__pending:
+            return False
+        self.__write(self.__pending)
+        self.__pending.clear()
+        return True
+
+    def close(self) -> None:
+        self.save()
+        self.__journal.close()
+        if self.__snapshot is not None:
+            self.__snapshot.close()
+            self.__snapshot = None
@@ -0,0 +1,649 @@
+__all__ = ["JsonStorage"]
+
+import itertools as _itertools
+import json as _json
+import os as _os
+import sys as _sys
+import zlib as _zlib
+from array import array as _array
+from json.encoder import encode_basestring_ascii as _encode_string
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import src.const as const
+import src.durable as durable
+import src.journal as journal
+import src.money as _money
+from src.lock import FileLock
+from src.var import var
+from src.logger import logger as logger
+from . import Storage
+
+_DataList = List[Dict[str, Union[str, float]]]
+_DataIndex = Dict[str, int]
+_Record = Dict[str, Any]
+_Item = Tuple[str, float]
+_Row = Tuple[str, float, str]
+_Columns = Tuple[List[str], _array, List[str]]
+
+# Version of the JSON format written: {"version", "precision", "items", "crc32"}, with amounts in
+# minor units.
+FORMAT_VERSION: int = 2
+# Key ending the files written by `_write_items`: the CRC-32 of every byte before it.
+_CHECKSUM_KEY: bytes = b',"crc32":'
+# Suffix given to a corrupted file replaced by its backup, kept for inspection.
+_CORRUPT_SUFFIX: str = ".corrupt"
+# Number of items serialized per write when saving the snapshot.
+_SAVE_CHUNK: int = 10_000
+# Below this many bytes of shards, starting worker processes costs more than parsing them in one.
+_PARALLEL_BYTES: int = 8 * 1024 * 1024
+
+
+def _shard(name: str, count: int) -> int:
+    "Returns the shard holding an item, from a hash of its name that is the same in every process."
+    return _zlib.crc32(name.encode("utf-8")) % count
+
+
+def _manifest_file() -> str:
+    "Returns the path of the file holding the number of shards, next to `const.JSON_FILE`."
+    return f"{_os.path.splitext(const.JSON_FILE)[0]}.shards"
+
+
+def _shard_file(shard: int, count: int) -> str:
+    "Returns the path of a shard file, next to `const.JSON_FILE`."
+    return f"{_os.path.splitext(const.JSON_FILE)[0]}.{shard:03d}-of-{count:03d}.json"
+
+
+def _shard_count() -> int:
+    """
+    The function `_shard_count` reads the number of shards the budget is split into.
+
+    @return The function returns the number of shards, 1 if the budget is not sharded.
+    """
+    try:
+        with open(_manifest_file(), "r", encoding="ascii") as f:
+            return max(int(f.read().strip() or 1), 1)
+    except FileNotFoundError:
+        return 1
+
+
+def _decode(data: Any, precision: int, path: str) -> Tuple[_DataList, _array]:
+    """
+    The function `_decode` returns the items of a decoded budget file with their amounts in minor
+    units. Version 2 files hold integer minor units, converted if they were saved with another
+    precision. Files written before that, a bare list of items with float amounts, are converted as
+    they are read, which is lossless for amounts with no more decimal digits than the precision;
+    the number of amounts that had to be rounded is logged.
+
+    @param data The `data` parameter is the decoded JSON.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit.
+    @param path The `path` parameter is the path of the file, for messages.
+
+    @return The function returns the list of items and the `array('q')` of their amounts.
+
+    @raise ValueError If the file is of an unknown format or version.
+    """
+    if isinstance(data, list):
+        scale: int = _money.scale(precision)
+        units: _array = _array("q", [round(item["amount"] * scale) for item in data])
+        rounded: int = sum(u / scale != item["amount"] for item, u in zip(data, units))
+        if rounded:
+            logger.info(
+                f"Rounded {rounded} amount(s) of {path} to {precision} decimals."
+            )
+        return data, units
+    if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+        version: Any = data.get("version") if isinstance(data, dict) else None
+        raise ValueError(f"{path} has unsupported budget format version {version}.")
+    items: _DataList = data["items"]
+    saved: int = int(data["precision"])
+    if saved == precision:
+        return items, _array("q", [item["amount"] for item in items])
+    if saved > precision:
+        logger.info(f"Rounding the amounts of {path} to {precision} decimals.")
+    rescale: Callable[[int, int, int], int] = _money.rescale
+    return items, _array(
+        "q", [rescale(item["amount"], saved, precision) for item in items]
+    )
+
+
+def _read_checked(path: str) -> Any:
+    """
+    The function `_read_checked` reads a budget file and checks it against the CRC-32 it ends with,
+    if any; files written before checksums were added have none.
+
+    @param path The `path` parameter is the path of the file.
+
+    @return The function returns the decoded JSON.
+
+    @raise FileNotFoundError If the file does not exist.
+    @raise ValueError If the file is not valid JSON or does not match its checksum.
+    """
+    with open(path, "rb") as f:
+        raw: bytes = f.read()
+    try:
+        data: Any = _json.loads(raw)
+    except (_json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"{path} is corrupted: {e}") from e
+    if isinstance(data, dict) and "crc32" in data:
+        end: int = raw.rfind(_CHECKSUM_KEY)
+        if _zlib.crc32(raw[:end]) != data["crc32"]:
+            raise ValueError(f"{path} does not match its checksum.")
+    return data
+
+
+def _read(path: str) -> Any:
+    """
+    The function `_read` reads a budget file with `_read_checked`. If it is corrupted, it is renamed
+    with `_CORRUPT_SUFFIX`, so it is kept for inspection but never becomes the backup, and the
+    backup kept by `durable.replace` is read instead. The backup is also read if the file is missing,
+    as a crash between the two renames of a save leaves only the backup.
+
+    @param path The `path` parameter is the path of the file.
+
+    @return The function returns the decoded JSON, or an empty list if neither the file nor its
+    backup exists.
+
+    @raise ValueError If the file is corrupted and its backup is missing or corrupted too.
+    """
+    backup: str = path + durable.BACKUP_SUFFIX
+    try:
+        return _read_checked(path)
+    except FileNotFoundError:
+        if not _os.path.exists(backup):
+            return []
+        logger.info(f"{path} is missing, reading its backup {backup}.")
+    except ValueError as e:
+        if not _os.path.exists(backup):
+            raise ValueError(f"{e} There is no backup to fall back to.") from e
+        logger.exc(f"{e} Falling back to the backup {backup}.")
+        _os.replace(path, path + _CORRUPT_SUFFIX)
+    try:
+        return _read_checked(backup)
+    except ValueError as e:
+        raise ValueError(f"{e} Neither {path} nor its backup can be read.") from e
+
+
+def _load_shard(path: str, precision: int) -> _Columns:
+    """
+    The function `_load_shard` reads a shard file into columns. It runs in worker processes, so it
+    only returns the columns, which are much cheaper to send back than the decoded objects.
+
+    @param path The `path` parameter is the path of the shard file.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit.
+
+    @return The function returns the (names, amounts, categories) columns, with the amounts in minor
+    units, empty if the file does not exist.
+    """
+    items, units = _decode(_read(path), precision, path)
+    return (
+        [str(item["name"]) for item in items],
+        units,
+        [str(item.get("category") or "") for item in items],
+    )
+
+
+def _write_items(
+    path: str,
+    names: Sequence[str],
+    units: Sequence[int],
+    categories: Sequence[str],
+    precision: int,
+) -> None:
+    """
+    The function `_write_items` writes items in the version 2 format: a JSON object with the
+    "version", the "precision", the "items", a list of {"name", "amount"} objects with the amount
+    in minor units and a "category" key only for items that have one, and last the "crc32" of the
+    bytes before it. Items are serialized in chunks straight from the columns, without building the
+    list of dictionaries first. The file is replaced with `durable.replace`, as `var.durability`
+    requires, keeping the previous version as a backup.
+
+    @param path The `path` parameter is the path of the file to write.
+    @param names The `names` parameter is the column of item names.
+    @param units The `units` parameter is the column of amounts in minor units, sharing positions
+    with `names`.
+    @param categories The `categories` parameter is the column of categories.
+    @param precision The `precision` parameter is the number of decimal digits of the minor unit.
+    """
+    encode: Callable[[str], str] = _encode_string
+    with durable.replace(path) as f:
+        # Strings are ASCII-encoded, so the text is written as bytes to compute its checksum.
+        chunk: bytes = (
+            f'{{"version":{FORMAT_VERSION},"precision":{precision},"items":['
+        ).encode()
+        f.write(chunk)
+        checksum: int = _zlib.crc32(chunk)
+        for start in range(0, len(names), _SAVE_CHUNK):
+            end: int = start + _SAVE_CHUNK
+            chunk = (
+                ("," if start else "")
+                + ",".join(
+                    (
+                        f'{{"name":{encode(name)},"amount":{amount},'
+                        f'"category":{encode(category)}}}'
+                        if category
+                        else f'{{"name":{encode(name)},"amount":{amount}}}'
+                    )
+                    for name, amount, category in zip(
+                        names[start:end], units[start:end], categories[start:end]
+                    )
+                )
+            ).encode()
+            f.write(chunk)
+            checksum = _zlib.crc32(chunk, checksum)
+        f.write(b"]" + _CHECKSUM_KEY + str(_zlib.crc32(b"]", checksum)).encode() + b"}")
+
+
+class JsonStorage(Storage):
+    """
+    The class `JsonStorage` keeps the whole budget in memory, indexed by name, and persists it as
+    `const.JSON_FILE`, optionally with the append-only journal in `const.JOURNAL_FILE`. Items are
+    held in columns (a list of names, an `array('q')` of amounts in integer minor units of
+    `var.precision` decimals, see `src.money`, and a list of interned categories, sharing positions)
+    rather than in one dictionary per item, so the total is an exact integer sum. The JSON file
+    holds the version, the precision and the list of {"name", "amount"} objects, with the amount in
+    minor units and a "category" key only for items that have one (see `_write_items`); files in the
+    previous format, with float amounts, are converted when they are read.
+
+    The budget can also be split by a hash of the item names into shard files in the same format
+    (see `reshard`), which are read in parallel and only rewritten when one of their items changed.
+
+    Several processes may share the files: writes hold `const.LOCK_FILE`, and a version stamp kept in
+    it tells whether another process wrote the budget in between, in which case the budget is read
+    again and the pending changes are merged into it instead of overwriting the other changes.
+    """
+
+    def __init__(self) -> None:
+        "Loads the snapshot, builds the name index and replays the journal."
+        self.__precision: int = var.precision
+        self.__scale: int = _money.scale(self.__precision)
+        self.__names: List[str] = []
+        self.__amounts: _array = _array("q")
+        self.__categories: List[str] = []
+        self.__index: _DataIndex = {}
+        self.__pending: List[_Record] = []
+        self.__lock: FileLock = FileLock(const.ensure_parent(const.LOCK_FILE))
+        with self.__lock:
+            self.__load()
+            self.__version: int = self.__lock.version()
+
+    def __load_data(self) -> Any:
+        """
+        The method __load_data loads the JSON file, or its backup if it is missing or corrupted (see
+        `_read`).
+
+        @return The method __load_data returns the decoded JSON file, or an empty list if there is no
+        budget yet.
+
+        @raise ValueError If the file and its backup are corrupted, rather than losing the budget.
+        """
+        logger.was_called(self.__load_data)
+        return _read(const.JSON_FILE)
+
+    def __save_data(self) -> None:
+        """
+        The method __save_data saves the items to the JSON file or, if the budget is sharded, rewrites
+        the shard files holding items changed since they were last written.
+        """
+        logger.was_called(self.__save_data)
+        if self.__shard_count == 1:
+            _write_items(
+                const.JSON_FILE,
+                self.__names,
+                self.__amounts,
+                self.__categories,
+                self.__precision,
+            )
+            return
+        shards: _array = self.__shard_column()
+        positions: Dict[int, List[int]] = {shard: [] for shard in self.__dirty_shards}
+        for position, shard in enumerate(shards):
+            if shard in positions:
+                positions[shard].append(position)
+        for shard, members in positions.items():
+            _write_items(
+                _shard_file(shard, self.__shard_count),
+                [self.__names[i] for i in members],
+                [self.__amounts[i] for i in members],
+                [self.__categories[i] for i in members],
+                self.__precision,
+            )
+        self.__dirty_shards.clear()
+
+    def __load_shards(self) -> List[_Columns]:
+        """
+        The method __load_shards reads every shard file, in parallel worker processes when there is
+        enough to read and more than one core.
+
+        @return The method __load_shards returns the columns of every shard, in shard order.
+        """
+        logger.was_called(self.__load_shards)
+        paths: List[str] = [
+            _shard_file(shard, self.__shard_count)
+            for shard in range(self.__shard_count)
+        ]
+        size: int = sum(_os.path.getsize(p) for p in paths if _os.path.exists(p))
+        workers: int = min(self.__shard_count, _os.cpu_count() or 1)
+        if workers == 1 or size < _PARALLEL_BYTES:
+            return [_load_shard(path, self.__precision) for path in paths]
+        # Imported here as it is slow to import and unsharded budgets never need it.
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(workers) as pool:
+            return list(pool.map(_load_shard, paths, [self.__precision] * len(paths)))
+
+    def __shard_column(self) -> _array:
+        """
+        The method __shard_column returns the shard of every item, sharing positions with the other
+        columns, hashing the names the first time it is needed.
+
+        @return The method __shard_column returns the column of shard numbers.
+        """
+        if self.__shards is None:
+            count: int = self.__shard_count
+            self.__shards = _array("H", (_shard(name, count) for name in self.__names))
+        return self.__shards
+
+    def __fill(self, rows: Iterable[Tuple[str, int, str]]) -> None:
+        """
+        The method __fill replaces the columns and the name index with the given items. Items sharing
+        a name are collapsed into a single one (the first position keeps the last amount and
+        category).
+
+        @param rows The rows parameter is an iterable of (name, amount in minor units, category)
+        tuples.
+        """
+        logger.was_called(self.__fill)
+        names: List[str] = []
+        amounts: _array = _array("q")
+        categories: List[str] = []
+        index: _DataIndex = {}
+        intern: Callable[[str], str] = _sys.intern
+        duplicated: int = 0
+        for name, amount, category in rows:
+            position: int | None = index.get(name)
+            if position is not None:
+                amounts[position] = amount
+                categories[position] = intern(category)
+                duplicated += 1
+                continue
+            index[name] = len(names)
+            names.append(name)
+            amounts.append(amount)
+            categories.append(intern(category))
+        if duplicated:
+            logger.info(f"Collapsed {duplicated} duplicated item name(s).")
+        self.__names, self.__amounts, self.__index = names, amounts, index
+        self.__categories = categories
+
+    def __load(self) -> None:
+        """
+        The method __load reads the snapshot, or its shards, and the journal into the columns. The
+        lock must be held.
+        """
+        self.__shard_count: int = _shard_count()
+        self.__shards: _array | None = None
+        self.__dirty_shards: Set[int] = set()
+        if self.__shard_count == 1:
+            items, units = _decode(
+                self.__load_data(), self.__precision, const.JSON_FILE
+            )
+            self.__fill(
+                (str(item["name"]), amount, str(item.get("category") or ""))
+                for item, amount in zip(items, units)
+            )
+        else:
+            columns: List[_Columns] = self.__load_shards()
+            self.__fill(
+                _itertools.chain.from_iterable(zip(*shard) for shard in columns)
+            )
+            if len(self.__names) == sum(len(names) for names, _, _ in columns):
+                # Nothing was collapsed, so the items are still grouped by shard, in order.
+                self.__shards = _array("H")
+                for shard, (names, _, _) in enumerate(columns):
+                    self.__shards.extend([shard] * len(names))
+        self.__replay_journal()
+
+    def __apply(self, record: _Record) -> bool:
+        """
+        The method __apply applies a single mutation record to the columns and the name index.
+
+        @param record The record parameter is the mutation to apply.
+
+        @return The method __apply returns True if the record changed the data, otherwise False.
+
+        @raise ValueError If the amount is out of range, in which case nothing was changed.
+        """
+        op: str = record["op"]
+        name: str = record["name"]
+        position: int | None = self.__index.get(name)
+        if position is None and op != "register":
+            return False
+        units: int = 0
+        if op != "delete":
+            # Computed before any column changes, so that a rejected amount leaves them aligned.
+            units = _money.check_units(
+                round(record["amount"] * self.__scale), self.__precision
+            )
+        if self.__shard_count > 1:
+            self.__dirty_shards.add(_shard(name, self.__shard_count))
+        if position is None:
+            self.__index[name] = len(self.__names)
+            self.__names.append(name)
+            self.__amounts.append(units)
+            self.__categories.append(_sys.intern(record.get("category") or ""))
+            if self.__shards is not None:
+                self.__shards.append(_shard(name, self.__shard_count))
+            return True
+        if op == "delete":
+            # Move the last item into the freed position instead of shifting the columns.
+            del self.__index[name]
+            last_name: str = self.__names.pop()
+            last_amount: int = self.__amounts.pop()
+            last_category: str = self.__categories.pop()
+            last_shard: int = self.__shards.pop() if self.__shards is not None else 0
+            if position < len(self.__names):
+                self.__names[position] = last_name
+                self.__amounts[position] = last_amount
+                self.__categories[position] = last_category
+                if self.__shards is not None:
+                    self.__shards[position] = last_shard
+                self.__index[last_name] = position
+            return True
+        self.__amounts[position] = units
+        if record.get("category") is not None:
+            self.__categories[position] = _sys.intern(record["category"])
+        return True
+
+    def __compact(self) -> None:
+        """
+        The method __compact writes the in-memory data as a new snapshot and empties the journal.
+        """
+        logger.was_called(self.__compact)
+        self.__save_data()
+        journal.reset()
+
+    def __replay_journal(self) -> None:
+        """
+        The method __replay_journal applies the records left in the journal on top of the snapshot.
+        If journaling is disabled, the replayed records are folded into a new snapshot right away.
+        """
+        logger.was_called(self.__replay_journal)
+        for record in journal.replay():
+            self.__apply(record)
+        if journal.records() and not var.journal:
+            self.__compact()
+
+    def __journal_full(self, extra: int = 0) -> bool:
+        """
+        The method __journal_full checks whether the journal, grown by `extra` records, went past the
+        `var.journal_max_ratio` records per item or `var.journal_max_bytes` thresholds.
+
+        @param extra The extra parameter is the number of records about to be appended.
+
+        @return The method __journal_full returns True if the journal should be compacted.
+        """
+        return (
+            journal.records() + extra
+            > var.journal_max_ratio * max(len(self.__names), 1)
+            or journal.size() > var.journal_max_bytes
+        )
+
+    def __write(self, records: List[_Record]) -> None:
+        """
+        The method __write makes applied mutations durable while holding `const.LOCK_FILE`. In journal
+        mode the records are appended to the journal with a single write, and the journal is compacted
+        once it exceeds `var.journal_max_bytes` or holds more than `var.journal_max_ratio` records per
+        item; otherwise the whole snapshot is rewritten.
+
+        The version stamp kept in the lock file is checked first: if another process wrote the budget
+        since it was read, the budget is read again and the records are applied on top of it before
+        writing, so the changes of both processes are kept. As records are idempotent, a register of
+        an item the other process created updates it, and an edit or a delete of an item it deleted
+        does nothing.
+
+        @param records The records parameter is the list of mutations that were applied.
+        """
+        with self.__lock:
+            if self.__lock.version() != self.__version:
+                logger.info("The budget was changed by another process, merging.")
+                self.__load()
+                for record in records:
+                    self.__apply(record)
+                self.generation += 1
+            if not var.journal or self.__journal_full(len(records)):
+                self.__compact()
+            elif len(records) == 1:
+                journal.append(records[0])
+            else:
+                journal.extend(records)
+            self.__version = self.__lock.bump()
+
+    def __persist(self, record: _Record) -> None:
+        """
+        The method __persist writes an applied mutation right away, or, while `var.autosave` is
+        disabled, keeps it until `save()` is called.
+
+        @param record The record parameter is the mutation that was just applied.
+        """
+        if var.autosave:
+            self.__write([record])
+        else:
+            self.__pending.append(record)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__index
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+    def get(self, name: str) -> float | None:
+        position: int | None = self.__index.get(name)
+        if position is None:
+            return None
+        return self.__amounts[position] / self.__scale
+
+    def items(self) -> Iterator[_Item]:
+        return zip(self.__names, map(self.__scale.__rtruediv__, self.__amounts))
+
+    def category(self, name: str) -> str | None:
+        position: int | None = self.__index.get(name)
+        if position is None:
+            return None
+        return self.__categories[position]
+
+    def rows(self) -> Iterator[_Row]:
+        return zip(
+            self.__names,
+            map(self.__scale.__rtruediv__, self.__amounts),
+            self.__categories,
+        )
+
+    def columns(self) -> Tuple[List[str], _array]:
+        return self.__names, _array("d", map(self.__scale.__rtruediv__, self.__amounts))
+
+    def units(self) -> _array:
+        if self.__precision != var.precision:
+            return super().units()
+        return self.__amounts
+
+    def apply(self, record: _Record) -> bool:
+        if not self.__apply(record):
+            return False
+        self.__persist(record)
+        return True
+
+    def checkpoint(self) -> int:
+        return len(self.__pending)
+
+    def discard(self, checkpoint: int) -> None:
+        del self.__pending[checkpoint:]
+
+    def replace(self, rows: Iterable[_Row]) -> int:
+        scale: int = self.__scale
+        self.__fill((name, round(amount * scale), c) for name, amount, c in rows)
+        self.__pending.clear()
+        self.__shards = None
+        self.__dirty_shards = set(range(self.__shard_count))
+        with self.__lock:
+            self.__compact()
+            self.__version = self.__lock.bump()
+        return len(self.__names)
+
+    def reshard(self, count: int) -> None:
+        """
+        The method `reshard` splits the budget into `count` shard files by a hash of the item names,
+        or merges the shards back into `const.JSON_FILE` if `count` is 1. Pending changes are written
+        too. The new files are written before the number of shards is switched, and the old ones are
+        only removed afterwards.
+
+        @param count The `count` parameter is the number of shards.
+        """
+        logger.was_called(self.reshard, count)
+        count = min(max(count, 1), 999)
+        with self.__lock:
+            if self.__lock.version() != self.__version:
+                self.__load()
+                for record in self.__pending:
+                    self.__apply(record)
+            previous: int = self.__shard_count
+            self.__shard_count, self.__shards = count, None
+            self.__dirty_shards = set(range(count))
+            self.__compact()
+            self.__pending.clear()
+            if count == 1:
+                if _os.path.exists(_manifest_file()):
+                    _os.remove(_manifest_file())
+            else:
+                with durable.replace(_manifest_file(), backup=False) as f:
+                    f.write(str(count).encode("ascii"))
+                if previous == 1:
+                    durable.remove(const.JSON_FILE)
+            if previous != count:
+                for shard in range(previous if previous > 1 else 0):
+                    durable.remove(_shard_file(shard, previous))
+            self.__version = self.__lock.bump()
+
+    def save(self) -> bool:
+        """
+        The method `save` writes the changes kept in memory while `var.autosave` is disabled, either
+        as a single append to the journal or, if they do not fit in it, as a single new snapshot.
+
+        @return The method returns True if there were pending changes to write, otherwise False.
+        """
+        logger.was_called(self.save)
+        if not self.__pending:
+            return False
+        self.__write(self.__pending)
+        self.__pending.clear()
+        return True
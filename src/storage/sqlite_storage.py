@@ -0,0 +1,219 @@
+__all__ = ["SqliteStorage"]
+
+import sqlite3 as _sqlite3
+from array import array as _array
+from typing import Any, Dict, Iterable, Iterator, Sequence, Tuple
+
+import src.const as const
+import src.money as _money
+from src.var import var
+from src.logger import logger as logger
+from . import Storage
+
+_Record = Dict[str, Any]
+_Item = Tuple[str, float]
+_Row = Tuple[str, float, str]
+
+# Statements are kept as constants so sqlite3 reuses its prepared statements between calls.
+# Amounts are integer minor units of the precision kept in the settings table (see `src.money`).
+_SCHEMA: str = (
+    "CREATE TABLE IF NOT EXISTS items ("
+    "id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, amount INTEGER NOT NULL,"
+    " category TEXT NOT NULL DEFAULT '')"
+)
+_SETTINGS: str = (
+    "CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value NOT NULL)"
+)
+_SELECT_PRECISION: str = "SELECT value FROM settings WHERE key = 'precision'"
+_SET_PRECISION: str = "INSERT OR REPLACE INTO settings VALUES ('precision', ?)"
+# Databases created before categories existed lack the column.
+_ADD_CATEGORY: str = "ALTER TABLE items ADD COLUMN category TEXT NOT NULL DEFAULT ''"
+# Databases created before amounts were minor units hold them as REAL; the table is rebuilt.
+_OLD_ITEMS: str = "ALTER TABLE items RENAME TO old_items"
+_COPY_ITEMS: str = (
+    "INSERT INTO items (id, name, amount, category)"
+    " SELECT id, name, to_units(amount), category FROM old_items"
+)
+_DROP_OLD_ITEMS: str = "DROP TABLE old_items"
+_RESCALE: str = "UPDATE items SET amount = rescale(amount)"
+_STATEMENTS: Dict[str, str] = {
+    "register": "INSERT OR IGNORE INTO items (name, amount, category)"
+    " VALUES (:name, :amount, COALESCE(:category, ''))",
+    "edit": "UPDATE items SET amount = :amount, category = COALESCE(:category, category)"
+    " WHERE name = :name",
+    "delete": "DELETE FROM items WHERE name = :name",
+}
+_SELECT_AMOUNT: str = "SELECT amount FROM items WHERE name = ?"
+_SELECT_CATEGORY: str = "SELECT category FROM items WHERE name = ?"
+_SELECT_ITEMS: str = "SELECT name, amount FROM items ORDER BY id"
+_SELECT_ROWS: str = "SELECT name, amount, category FROM items ORDER BY id"
+_SELECT_UNITS: str = "SELECT amount FROM items ORDER BY id"
+_COUNT: str = "SELECT COUNT(*) FROM items"
+# SQLite's own synchronous setting matching each level of `var.durability`.
+_SYNCHRONOUS: Dict[str, str] = {"none": "OFF", "flush": "NORMAL", "fsync": "FULL"}
+
+
+class SqliteStorage(Storage):
+    """
+    The class `SqliteStorage` keeps the budget in the SQLite database `const.SQLITE_FILE`, indexed by
+    name, so opening it does not read any item and every operation only touches the rows involved.
+    Amounts are stored as integer minor units, as `JsonStorage` does, and converted when they are
+    read. Each mutation runs in its own transaction; while `var.autosave` is disabled the transaction
+    is kept open until `save()` commits every mutation at once.
+    """
+
+    def __init__(self) -> None:
+        "Opens the database in WAL mode and creates or upgrades the items table if needed."
+        logger.was_called(SqliteStorage)
+        # Transactions may be committed by whichever thread leads a group commit.
+        self.__db: _sqlite3.Connection = _sqlite3.connect(
+            const.ensure_parent(const.SQLITE_FILE),
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        # Savepoints created by `checkpoint`, numbered to tell them apart.
+        self.__savepoints: int = 0
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute(f"PRAGMA synchronous={_SYNCHRONOUS[var.durability]}")
+        self.__precision: int = var.precision
+        self.__scale: int = _money.scale(self.__precision)
+        self.__db.execute("BEGIN IMMEDIATE")
+        try:
+            self.__upgrade()
+            self.__db.execute("COMMIT")
+        except BaseException:
+            self.__db.execute("ROLLBACK")
+            raise
+
+    def __upgrade(self) -> None:
+        """
+        The method __upgrade creates the tables, adds the category column to databases created
+        before it existed, and converts the amounts to minor units of `var.precision` decimals: REAL
+        amounts of databases created before minor units are rounded once, and units saved with
+        another precision are rescaled. It runs in the transaction opened by `__init__`.
+        """
+        db: _sqlite3.Connection = self.__db
+        db.execute(_SETTINGS)
+        types: Dict[str, str] = {
+            row[1]: str(row[2]).upper()
+            for row in db.execute("PRAGMA table_info(items)")
+        }
+        if types and "category" not in types:
+            db.execute(_ADD_CATEGORY)
+        if types.get("amount") == "REAL":
+            logger.info(
+                f"Converting the amounts of {const.SQLITE_FILE} to minor units."
+            )
+            db.create_function(
+                "to_units",
+                1,
+                lambda a: _money.to_units(a, self.__precision),
+                deterministic=True,
+            )
+            db.execute(_OLD_ITEMS)
+            db.execute(_SCHEMA)
+            db.execute(_COPY_ITEMS)
+            db.execute(_DROP_OLD_ITEMS)
+            db.execute(_SET_PRECISION, (self.__precision,))
+        db.execute(_SCHEMA)
+        row: Tuple[Any] | None = db.execute(_SELECT_PRECISION).fetchone()
+        saved: int = self.__precision if row is None else int(row[0])
+        if saved != self.__precision:
+            if saved > self.__precision:
+                logger.info(
+                    f"Rounding the amounts of {const.SQLITE_FILE} to {self.__precision} decimals."
+                )
+            db.create_function(
+                "rescale",
+                1,
+                lambda units: _money.rescale(units, saved, self.__precision),
+                deterministic=True,
+            )
+            db.execute(_RESCALE)
+        if row is None or saved != self.__precision:
+            db.execute(_SET_PRECISION, (self.__precision,))
+
+    def __begin(self) -> None:
+        if not self.__db.in_transaction:
+            self.__db.execute("BEGIN")
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __len__(self) -> int:
+        return int(self.__db.execute(_COUNT).fetchone()[0])
+
+    def get(self, name: str) -> float | None:
+        row: Tuple[int] | None = self.__db.execute(_SELECT_AMOUNT, (name,)).fetchone()
+        return None if row is None else row[0] / self.__scale
+
+    def items(self) -> Iterator[_Item]:
+        scale: int = self.__scale
+        for name, units in self.__db.execute(_SELECT_ITEMS):
+            yield str(name), units / scale
+
+    def category(self, name: str) -> str | None:
+        row: Tuple[str] | None = self.__db.execute(_SELECT_CATEGORY, (name,)).fetchone()
+        return None if row is None else str(row[0])
+
+    def rows(self) -> Iterator[_Row]:
+        scale: int = self.__scale
+        for name, units, category in self.__db.execute(_SELECT_ROWS):
+            yield str(name), units / scale, str(category)
+
+    def units(self) -> Sequence[int]:
+        return _array("q", [units for units, in self.__db.execute(_SELECT_UNITS)])
+
+    def __units(self, amount: float | None) -> int | None:
+        "Converts an amount to the minor units stored, None being kept for deletions."
+        return None if amount is None else round(amount * self.__scale)
+
+    def apply(self, record: _Record) -> bool:
+        self.__begin()
+        changed: bool = (
+            self.__db.execute(
+                _STATEMENTS[record["op"]],
+                {
+                    "name": record["name"],
+                    "amount": self.__units(record.get("amount")),
+                    "category": record.get("category"),
+                },
+            ).rowcount
+            > 0
+        )
+        if var.autosave:
+            self.__db.execute("COMMIT")
+        return changed
+
+    def checkpoint(self) -> int:
+        self.__begin()
+        self.__savepoints += 1
+        self.__db.execute(f"SAVEPOINT checkpoint{self.__savepoints}")
+        return self.__savepoints
+
+    def discard(self, checkpoint: int) -> None:
+        self.__db.execute(f"ROLLBACK TO checkpoint{checkpoint}")
+        self.__db.execute(f"RELEASE checkpoint{checkpoint}")
+
+    def replace(self, rows: Iterable[_Row]) -> int:
+        logger.was_called(self.replace)
+        self.__begin()
+        self.__db.execute("DELETE FROM items")
+        scale: int = self.__scale
+        self.__db.executemany(
+            "INSERT OR REPLACE INTO items (name, amount, category) VALUES (?, ?, ?)",
+            ((name, round(amount * scale), c) for name, amount, c in rows),
+        )
+        self.__db.execute("COMMIT")
+        return len(self)
+
+    def save(self) -> bool:
+        logger.was_called(self.save)
+        if not self.__db.in_transaction:
+            return False
+        self.__db.execute("COMMIT")
+        return True
+
+    def close(self) -> None:
+        self.save()
+        self.__db.close()
@@ -0,0 +1,334 @@
+__all__ = ["Transaction", "statistics"]
+
+import math as _math
+import threading as _threading
+from typing import Any, Dict, List, Tuple
+
+import src.money as _money
+from src.var import var
+from src.logger import logger as logger
+from src.messages import *
+from src.selector_handler.functions import (
+    checkpoint,
+    delete,
+    edit,
+    lookup,
+    register,
+    revert,
+    save,
+)
+
+_Record = Dict[str, Any]
+_State = Tuple[float, str]
+# (name, state before, state after) of an item changed by a transaction.
+_Step = Tuple[str, _State | None, _State | None]
+
+# Most failed operations listed in the error of a rejected transaction.
+_REPORTED: int = 10
+
+
+class _Group:
+    """
+    The class `_Group` keeps the transactions waiting to be committed and tells whether a thread is
+    committing a group of them, so that transactions committed while it writes are grouped into
+    the next write.
+    """
+
+    condition: _threading.Condition = _threading.Condition()
+    # Held while a group is committed, so that staging never reads the budget mid-save.
+    storage: _threading.Lock = _threading.Lock()
+    queue: List["Transaction"] = []
+    flushing: bool = False
+    commits: int = 0
+    flushes: int = 0
+
+
+def statistics() -> Tuple[int, int]:
+    """
+    The function `statistics` tells how well commits were grouped.
+
+    @return The function returns the number of transactions committed and the number of writes
+    they took.
+    """
+    with _Group.condition:
+        return _Group.commits, _Group.flushes
+
+
+class Transaction:
+    """
+    The class `Transaction` stages registrations, edits and deletions and commits them atomically:
+    either every one of them is applied and written with a single save, or none is. Operations are
+    checked as they are staged, against the budget and the operations staged before them, and
+    checked again when committing, as the budget may have changed in between.
+
+    Threads committing at the same time are grouped: the first one commits every transaction
+    queued until then with a single save while the others wait, and the transactions queued
+    meanwhile are committed together by the next one. A transaction rejected by its checks does
+    not prevent the others of its group from being committed.
+
+    Used as a context manager, the transaction is committed when the block ends, or discarded if it
+    raised an exception.
+    """
+
+    def __init__(self) -> None:
+        "Creates an empty transaction."
+        self.__operations: List[_Record] = []
+        # Whether each item touched by the staged operations exists after them.
+        self.__exists: Dict[str, bool] = {}
+        self.__done: bool = False
+        self.__persist: bool = True
+        self.__error: BaseException | None = None
+        # Changes made by the operations while they were applied, to revert them on failure.
+        self.__steps: List[_Step] = []
+        self.warnings: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.__operations)
+
+    def __enter__(self) -> "Transaction":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> bool:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    def __stage(self, record: _Record, exists: bool) -> None:
+        """
+        Checks an operation against the budget and the staged operations, then stages it.
+
+        @param record The `record` parameter is the operation.
+        @param exists The `exists` parameter tells whether the item must exist.
+
+        @raise ValueError If the name is empty, the amount is not a finite number or out of range or
+        the item does (not) exist.
+        """
+        name: str = record["name"]
+        if not name:
+            raise ValueError(PRT_INIT_TRANSACTION_INVALID_NAME)
+        amount: Any = record.get("amount", 0.0)
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+            raise ValueError(PRT_INIT_TRANSACTION_INVALID_AMOUNT(name))
+        if not _math.isfinite(amount):
+            raise ValueError(PRT_INIT_TRANSACTION_INVALID_AMOUNT(name))
+        _money.quantize(amount)
+        if name in self.__exists:
+            found: bool = self.__exists[name]
+        else:
+            with _Group.storage:
+                found = lookup(name) is not None
+        if found != exists:
+            raise ValueError(
+                PRT_INIT_ITEM_ALREADY_EXISTS(name)
+                if found
+                else PRT_INIT_ITEM_NOT_FOUND(name)
+            )
+        self.__exists[name] = record["op"] != "delete"
+        self.__operations.append(record)
+
+    def register(self, name: str, amount: float, category: str = "") -> None:
+        """
+        Stages the registration of a new item.
+
+        @param name The `name` parameter is the name of the item, which must not exist.
+        @param amount The `amount` parameter is the amount of the item.
+        @param category The `category` parameter is the optional category of the item.
+
+        @raise ValueError If the operation is invalid (see `Transaction`).
+        """
+        self.__stage(
+            {"op": "register", "name": name, "amount": amount, "category": category},
+            exists=False,
+        )
+
+    def edit(self, name: str, amount: float, category: str | None = None) -> None:
+        """
+        Stages the edit of an item.
+
+        @param name The `name` parameter is the name of the item, which must exist.
+        @param amount The `amount` parameter is the new amount of the item.
+        @param category The `category` parameter is the new category of the item; None keeps the
+        current one and "" removes it.
+
+        @raise ValueError If the operation is invalid (see `Transaction`).
+        """
+        self.__stage(
+            {"op": "edit", "name": name, "amount": amount, "category": category},
+            exists=True,
+        )
+
+    def delete(self, name: str) -> None:
+        """
+        Stages the deletion of an item.
+
+        @param name The `name` parameter is the name of the item, which must exist.
+
+        @raise ValueError If the operation is invalid (see `Transaction`).
+        """
+        self.__stage({"op": "delete", "name": name}, exists=True)
+
+    def discard(self) -> None:
+        "Forgets the staged operations."
+        self.__operations = []
+        self.__exists = {}
+
+    def commit(self, persist: bool = True) -> List[str]:
+        """
+        Commits the staged operations, with the transactions committed by other threads meanwhile.
+        The transaction is empty afterwards, whether it was committed or not.
+
+        @param persist The `persist` parameter tells whether to save the changes; with False they
+        are applied and left for the caller to save, e.g. with the other requests of a server batch.
+
+        @return The warnings of the budget rules the operations exceeded.
+
+        @raise ValueError If an operation is no longer valid, in which case nothing was changed.
+        @raise OSError If the changes could not be written.
+        """
+        logger.was_called(self.commit, len(self.__operations))
+        if not self.__operations:
+            return []
+        self.__done, self.__error, self.warnings = False, None, []
+        self.__persist = persist
+        group: List[Transaction] = []
+        with _Group.condition:
+            _Group.queue.append(self)
+            while _Group.flushing and not self.__done:
+                _Group.condition.wait()
+            if not self.__done:
+                group, _Group.queue = _Group.queue, []
+                _Group.flushing = True
+        if group:
+            try:
+                with _Group.storage:
+                    Transaction.__flush(group)
+            finally:
+                with _Group.condition:
+                    _Group.flushing = False
+                    _Group.condition.notify_all()
+        self.discard()
+        if self.__error is not None:
+            raise self.__error
+        return self.warnings
+
+    def __check(self) -> List[str]:
+        """
+        Checks the staged operations against the budget as it is when committing.
+
+        @return The errors of the operations that are no longer valid, empty if there are none.
+        """
+        exists: Dict[str, bool] = {}
+        errors: List[str] = []
+        for number, record in enumerate(self.__operations, 1):
+            name: str = record["name"]
+            found: bool = exists[name] if name in exists else lookup(name) is not None
+            if found != (record["op"] != "register"):
+                errors.append(
+                    PRT_INIT_TRANSACTION_OPERATION(
+                        (
+                            number,
+                            (
+                                PRT_INIT_ITEM_ALREADY_EXISTS(name)
+                                if found
+                                else PRT_INIT_ITEM_NOT_FOUND(name)
+                            ),
+                        )
+                    )
+                )
+            exists[name] = record["op"] != "delete"
+        return errors
+
+    def __apply(self) -> None:
+        """
+        Applies the staged operations, keeping the changes they made, even if one of them raised, and
+        the warnings of the budget rules they exceeded.
+        """
+        self.__steps = []
+        for record in self.__operations:
+            name: str = record["name"]
+            before: _State | None = lookup(name)
+            try:
+                if record["op"] == "register":
+                    register(name, record["amount"], record["category"])
+                elif record["op"] == "edit":
+                    edit(name, record["amount"], record["category"])
+                else:
+                    delete(name)
+            finally:
+                after: _State | None = lookup(name)
+                if after != before:
+                    self.__steps.append((name, before, after))
+            self.warnings.extend(var.extra_message.split("\n")[1:])
+
+    @staticmethod
+    def __revert(transactions: List["Transaction"], start: int) -> None:
+        """
+        Reverts the changes of transactions that failed, so that nothing of them is left in memory
+        or saved later.
+
+        @param transactions The `transactions` parameter is the list of transactions, in the order
+        they were applied.
+        @param start The `start` parameter is the `checkpoint` taken before they were applied.
+        """
+        try:
+            revert([step for t in transactions for step in t.__steps], start)
+        except Exception:
+            logger.exc(c=Transaction.__revert, default=True)
+
+    @staticmethod
+    def __flush(group: List["Transaction"]) -> None:
+        """
+        Commits a group of transactions: the valid ones are applied in the order they were queued
+        and written with a single save, while `var.autosave` is disabled. The save is skipped if no
+        transaction of the group asked for it. A transaction whose operations raise is reverted, and
+        if the save raises, every transaction of the group is, so a failed commit never leaves part
+        of its changes in memory, to be saved with later ones.
+
+        @param group The `group` parameter is the list of transactions.
+        """
+        logger.was_called(Transaction.__flush, len(group))
+        persist: bool = any(transaction.__persist for transaction in group)
+        autosave: bool = var.autosave
+        var.autosave = False
+        applied: List[Transaction] = []
+        try:
+            start: int = checkpoint()
+            for transaction in group:
+                errors: List[str] = transaction.__check()
+                if errors:
+                    transaction.__error = ValueError(
+                        PRT_INIT_TRANSACTION_REJECTED(
+                            (len(errors), "\n".join(errors[:_REPORTED]))
+                        )
+                    )
+                    continue
+                mark: int = checkpoint()
+                try:
+                    transaction.__apply()
+                except Exception as e:
+                    logger.exc(c=Transaction.__flush, default=True)
+                    Transaction.__revert([transaction], mark)
+                    transaction.__error = e
+                    continue
+                applied.append(transaction)
+            if persist and applied:
+                try:
+                    save()
+                except Exception:
+                    Transaction.__revert(applied, start)
+                    applied = []
+                    raise
+        except Exception as e:
+            logger.exc(c=Transaction.__flush, default=True)
+            for transaction in group:
+                if transaction.__error is None:
+                    transaction.__error = e
+        finally:
+            var.autosave = autosave
+            with _Group.condition:
+                _Group.commits += len(applied)
+                _Group.flushes += bool(persist and applied)
+                for transaction in group:
+                    transaction.__done = True
@@ -0,0 +1,160 @@
+__all__ = ["OperationLog"]
+
+import json as _json
+import os as _os
+from collections import deque as _deque
+from typing import Any, Deque, Dict, List, Tuple
+
+import src.const as const
+from src.logger import logger as logger
+
+# (amount, category) of an item, or None when it does not exist.
+_State = Tuple[float, str] | None
+# (name, state before, state after)
+_Step = Tuple[str, _State, _State]
+
+
+def _state(value: Any) -> _State:
+    "Converts a state read from JSON back into a tuple."
+    return None if value is None else (float(value[0]), str(value[1]))
+
+
+class OperationLog:
+    """
+    The class `OperationLog` keeps the last mutations as (name, before, after) steps, so each can be
+    undone by moving the item back to its previous state and redone by moving it forward again. Only
+    the states of the item involved are kept, never copies of the budget. The log is bounded: once
+    `depth` steps are held the oldest is dropped, and any new mutation clears the steps to redo.
+    """
+
+    def __init__(self, depth: int):
+        """
+        Creates an empty log.
+
+        @param depth The `depth` parameter is the maximum number of steps that can be undone.
+        """
+        logger.was_called(OperationLog, depth)
+        self.__undo: Deque[_Step] = _deque(maxlen=max(depth, 0))
+        self.__redo: List[_Step] = []
+        self.dirty: bool = False
+
+    def push(self, name: str, before: _State, after: _State) -> None:
+        """
+        Records a mutation.
+
+        @param name The `name` parameter is the name of the item.
+        @param before The `before` parameter is the state of the item before the mutation.
+        @param after The `after` parameter is the state of the item after the mutation.
+        """
+        if self.__undo.maxlen == 0:
+            return
+        self.__undo.append((name, before, after))
+        self.__redo.clear()
+        self.dirty = True
+
+    def undo(self) -> _Step | None:
+        """
+        Moves the latest step to the redo list. The caller must apply its `before` state.
+
+        @return The step, or None if there is nothing to undo.
+        """
+        if not self.__undo:
+            return None
+        step: _Step = self.__undo.pop()
+        self.__redo.append(step)
+        self.dirty = True
+        return step
+
+    def redo(self) -> _Step | None:
+        """
+        Moves the latest undone step back to the undo list. The caller must apply its `after` state.
+
+        @return The step, or None if there is nothing to redo.
+        """
+        if not self.__redo:
+            return None
+        step: _Step = self.__redo.pop()
+        self.__undo.append(step)
+        self.dirty = True
+        return step
+
+    def cancel(self, undone: bool) -> None:
+        """
+        Reverts the last call to `undo` (or `redo`) when its step could not be applied.
+
+        @param undone The `undone` parameter tells whether the last call was `undo`.
+        """
+        if undone:
+            self.__undo.append(self.__redo.pop())
+        else:
+            self.__redo.append(self.__undo.pop())
+
+    def drop(self, step: _Step) -> None:
+        """
+        Forgets the latest step if it is `step`, after its mutation was reverted without `undo`.
+
+        @param step The `step` parameter is the (name, before, after) step of the mutation.
+        """
+        if self.__undo and self.__undo[-1] == step:
+            self.__undo.pop()
+            self.dirty = True
+
+    def mark(self) -> Tuple[List[_Step], List[_Step]]:
+        """
+        Copies the steps to undo and redo, so that the log can be brought back to them with
+        `restore`.
+
+        @return A (undo, redo) tuple of lists.
+        """
+        return list(self.__undo), list(self.__redo)
+
+    def restore(self, mark: Tuple[List[_Step], List[_Step]]) -> None:
+        """
+        Brings the log back to the steps copied by `mark`, after the mutations made since were
+        reverted.
+
+        @param mark The `mark` parameter is the value `mark` returned.
+        """
+        self.__undo.clear()
+        self.__undo.extend(mark[0])
+        self.__redo = list(mark[1])
+        self.dirty = True
+
+    def sizes(self) -> Tuple[int, int]:
+        """
+        Returns how many steps can be undone and redone.
+
+        @return A (undo, redo) tuple.
+        """
+        return len(self.__undo), len(self.__redo)
+
+    def save(self) -> None:
+        "Writes the log to `const.UNDO_FILE`."
+        logger.was_called(self.save)
+        with open(const.ensure_parent(const.UNDO_FILE), "w", encoding="utf-8") as f:
+            _json.dump(
+                {"undo": list(self.__undo), "redo": self.__redo},
+                f,
+                separators=(",", ":"),
+            )
+        self.dirty = False
+
+    def load(self) -> None:
+        "Reads the log written by `save`, if any. An unreadable file is logged and ignored."
+        logger.was_called(self.load)
+        if not _os.path.exists(const.UNDO_FILE):
+            return
+        try:
+            with open(const.UNDO_FILE, "r", encoding="utf-8") as f:
+                data: Dict[str, List[Any]] = _json.load(f)
+            steps: Dict[str, List[_Step]] = {
+                key: [(str(n), _state(b), _state(a)) for n, b, a in data[key]]
+                for key in ("undo", "redo")
+            }
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            logger.exc(c=self.load, default=True)
+            return
+        self.__undo.extend(steps["undo"])
+        redo: List[_Step] = steps["redo"]
+        self.__redo = redo[max(len(redo) - (self.__undo.maxlen or 0), 0) :]
+        self.dirty = False
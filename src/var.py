@@ -1,13 +1,29 @@
 __all__ = ["var"]
 
-import ctypes
+import functools
 import random
 import time
 import sys
+from typing import Any
 
 from src.const import SHARED_FILE
 
 
+@functools.lru_cache(maxsize=None)
+def _random64_lib() -> Any:
+    """
+    The function `_random64_lib` loads the shared library `random64` once and caches it.
+
+    @return The function `_random64_lib` returns the loaded library, with the return type of
+    `random64` set to float.
+    """
+    import ctypes
+
+    random64_lib = ctypes.CDLL(SHARED_FILE)
+    random64_lib.random64.restype = ctypes.c_float
+    return random64_lib
+
+
 def _random64() -> float:
     """
     The function `_random64` generates a random number using the shared library `random64`. If an
@@ -18,11 +34,8 @@ def _random64() -> float:
     library or generated locally using Python's built-in modules.
     """
     try:
-        # Load the shared library.
-        random64_lib = ctypes.CDLL(SHARED_FILE)
-        # Define the return type to float.
-        random64_lib.random64.restype = ctypes.c_float
-        return random64_lib.random64()
+        # Load the shared library (once).
+        return _random64_lib().random64()
     except:
         MAX_UNICODE: int = sys.maxunicode
         # Seed the random number generator with current time.
@@ -39,7 +52,44 @@ def _random64() -> float:
 
 class __Var:
     extra_message: str = "Good looking!"
-    limit: float = _random64()
+    # Persist every mutation as it happens. When disabled, changes are kept in memory until `save()`.
+    autosave: bool = True
+    # Storage backend, one of `src.storage.STORAGES` ("json", "sqlite" or "binary").
+    storage: str = "json"
+    # Number of results per page of the Find Item menu.
+    search_page_size: int = 10
+    # Number of largest items listed by the Summary menu and the `summary` command.
+    summary_top: int = 5
+    # Number of changes that can be undone, and whether they survive a restart (`const.UNDO_FILE`).
+    undo_depth: int = 100
+    undo_persist: bool = False
+    # Append mutations to `const.JOURNAL_FILE` instead of rewriting the whole JSON file.
+    journal: bool = False
+    # Compact the journal into a new snapshot once it grows past either threshold.
+    journal_max_bytes: int = 4 * 1024 * 1024
+    journal_max_ratio: float = 0.5
+    # How durable saves are, one of `src.durable.LEVELS`: "none", "flush" (survives a crash of the
+    # process) or "fsync" (survives a power loss), set by --durability.
+    durability: str = "flush"
+    # Decimal digits of the minor unit amounts are kept in, as integers (2: cents), set by
+    # --precision. Budgets saved with another precision are converted when they are read.
+    precision: int = 2
+    # Check the checksum of `const.BINARY_FILE` when opening it, which reads the whole file; by
+    # default only its header and size are checked.
+    snapshot_verify: bool = False
+    # Rows `import` reads and parses at a time, reporting its progress after each chunk.
+    import_chunk: int = 10_000
+    # Bytes of rows `export` sorts in memory; larger exports are sorted in runs on disk and merged.
+    export_memory: int = 64 * 1024 * 1024
+    # Record the call count and latency of the operations (see `src.stats`), set by `--profile`,
+    # and the file cProfile statistics are dumped to ("" for none).
+    profile: bool = False
+    profile_file: str = ""
+
+    @functools.cached_property
+    def limit(self) -> float:
+        "Sentinel returned by `numeric_only` for invalid input, drawn on first use."
+        return _random64()
 
 
-var = __Var
+var = __Var()
@@ -0,0 +1,44 @@
+import os
+from typing import Iterator, List
+
+import pytest
+
+import src.const as const
+from src.selector_handler import functions
+from src.var import var
+
+# Storage files pointed at the temporary directory of each test, so none touches the real budget.
+_FILES: List[str] = [
+    "JSON_FILE",
+    "JOURNAL_FILE",
+    "LOCK_FILE",
+    "SQLITE_FILE",
+    "BINARY_FILE",
+    "HISTORY_FILE",
+    "UNDO_FILE",
+    "STATS_FILE",
+    "RULES_FILE",
+]
+
+# Settings a test may change, restored after it.
+_SETTINGS: List[str] = [
+    "autosave",
+    "storage",
+    "journal",
+    "durability",
+    "snapshot_verify",
+    "extra_message",
+]
+
+
+@pytest.fixture(autouse=True)
+def budget(tmp_path, monkeypatch) -> Iterator[str]:
+    "Gives each test an empty budget in its own directory, with the default settings."
+    functions.close()
+    for name in _FILES:
+        path: str = getattr(const, name)
+        monkeypatch.setattr(const, name, os.path.join(tmp_path, os.path.basename(path)))
+    for name in _SETTINGS:
+        monkeypatch.setattr(var, name, getattr(var, name))
+    yield str(tmp_path)
+    functions.close()
@@ -0,0 +1,168 @@
+import asyncio
+import os
+from typing import List, Set, Tuple
+
+import pytest
+
+import src.const as const
+import src.durable as durable
+import src.server as server
+from src.journal import Journal
+from src.selector_handler import functions
+from src.storage import Storage, open_storage
+from src.transaction import Transaction
+from src.var import var
+
+NAMES: List[str] = [f"item-{i:02d}" for i in range(20)]
+
+
+def _saved(kind: str, *amounts: float) -> None:
+    "Saves the budget once with every item at each of `amounts`, so the backup holds the one before."
+    storage: Storage = open_storage(kind)
+    try:
+        for amount in amounts:
+            storage.replace((name, amount, "") for name in NAMES)
+    finally:
+        storage.close()
+
+
+def _amounts(kind: str) -> Tuple[int, Set[float]]:
+    "Opens the budget as a new process would and returns its size and the set of its amounts."
+    storage: Storage = open_storage(kind)
+    try:
+        return len(storage), {amount for _, amount, _ in storage.rows()}
+    finally:
+        storage.close()
+
+
+def _truncate(path: str, size: int) -> None:
+    "Cuts a file to `size` bytes, as a crash in the middle of writing it would."
+    with open(path, "r+b") as f:
+        f.truncate(size)
+
+
+def _fail() -> bool:
+    "Stands in for `save` when the disk is full."
+    raise OSError("injected save failure")
+
+
+def test_torn_journal_tail_is_cut_before_appending(budget):
+    journal: Journal = Journal(os.path.join(budget, "test.journal"))
+    journal.append({"op": "edit", "name": "a", "amount": 1.0})
+    journal.extend([{"op": "edit", "name": "b", "amount": 2.0}])
+    journal.close()
+    whole: int = journal.size()
+    with open(journal.path, "ab") as f:
+        f.write(b'{"op":"batch","records":[{"op":"edit","na')
+
+    assert [record["name"] for record in journal.replay()] == ["a", "b"]
+    assert journal.size() == whole
+    journal.append({"op": "edit", "name": "c", "amount": 3.0})
+    journal.close()
+    assert [record["name"] for record in Journal(journal.path).replay()] == [
+        "a",
+        "b",
+        "c",
+    ]
+
+
+def test_torn_journal_batch_is_ignored_as_a_whole():
+    _saved("json", 1.0)
+    var.journal, var.autosave = True, False
+    storage: Storage = open_storage("json")
+    try:
+        for name in NAMES[:5]:
+            storage.apply({"op": "edit", "name": name, "amount": 2.0})
+        storage.save()
+    finally:
+        storage.close()
+    _truncate(const.JOURNAL_FILE, os.path.getsize(const.JOURNAL_FILE) - 10)
+
+    assert _amounts("json") == (len(NAMES), {1.0})
+    storage = open_storage("json")
+    try:
+        storage.apply({"op": "edit", "name": NAMES[0], "amount": 3.0})
+        storage.save()
+    finally:
+        storage.close()
+    assert _amounts("json") == (len(NAMES), {1.0, 3.0})
+
+
+@pytest.mark.parametrize("kind", ["json", "binary"])
+def test_corrupted_file_falls_back_to_backup(kind):
+    var.storage = kind
+    path: str = const.JSON_FILE if kind == "json" else const.BINARY_FILE
+    _saved(kind, 1.0, 2.0)
+    _truncate(path, os.path.getsize(path) // 2)
+
+    assert _amounts(kind) == (len(NAMES), {1.0})
+    assert os.path.exists(path + ".corrupt")
+
+
+def test_missing_file_falls_back_to_backup():
+    _saved("json", 1.0, 2.0)
+    os.remove(const.JSON_FILE)
+
+    assert _amounts("json") == (len(NAMES), {1.0})
+
+
+def test_corrupted_file_and_backup_are_not_replaced():
+    _saved("json", 1.0, 2.0)
+    _truncate(const.JSON_FILE, os.path.getsize(const.JSON_FILE) // 2)
+    backup: str = const.JSON_FILE + durable.BACKUP_SUFFIX
+    _truncate(backup, os.path.getsize(backup) // 2)
+    size: int = os.path.getsize(backup)
+
+    with pytest.raises(ValueError):
+        open_storage("json")
+    assert os.path.exists(const.JSON_FILE + ".corrupt")
+    assert os.path.getsize(backup) == size
+
+
+def test_failed_write_leaves_the_file_as_it_was():
+    _saved("json", 1.0, 2.0)
+    with pytest.raises(OSError):
+        with durable.replace(const.JSON_FILE) as f:
+            f.write(b'{"version":2,')
+            raise OSError("injected write failure")
+
+    assert _amounts("json") == (len(NAMES), {2.0})
+    assert not os.path.exists(const.JSON_FILE + ".tmp")
+
+
+def test_failed_commit_is_rolled_back(monkeypatch):
+    functions.register("a", 1.0)
+    monkeypatch.setattr("src.transaction.save", _fail)
+    transaction: Transaction = Transaction()
+    transaction.edit("a", 5.0)
+    transaction.register("b", 2.0)
+
+    with pytest.raises(OSError):
+        transaction.commit()
+    assert functions.lookup("a")[0] == 1.0
+    assert functions.lookup("b") is None
+    # Nothing of the failed commit is written by the next save either.
+    functions.save()
+    functions.reload()
+    assert functions.lookup("a")[0] == 1.0
+    assert functions.lookup("b") is None
+
+
+def test_failed_server_save_rolls_back_the_batch(monkeypatch):
+    functions.register("a", 1.0)
+    var.autosave = False
+    monkeypatch.setattr(server, "save", _fail)
+
+    async def edit() -> dict:
+        writer = server._Writer()
+        task: asyncio.Task = asyncio.ensure_future(writer.run())
+        try:
+            return await writer.submit(
+                {"id": 1, "op": "edit", "name": "a", "amount": 5.0}
+            )
+        finally:
+            task.cancel()
+
+    response: dict = asyncio.run(edit())
+    assert response["ok"] is False
+    assert functions.lookup("a")[0] == 1.0